@@ -0,0 +1,103 @@
+import csv
+
+import pytest
+from pretend import stub
+
+from vladiate.inputs import LocalFile, MultiFile, S3File, Stdin, String
+
+
+def _fake_boto(contents):
+    def get_contents_as_string(headers=None):
+        if headers:
+            start, end = headers["Range"][len("bytes=") :].split("-")
+            return contents[int(start) : int(end) + 1]
+        return contents
+
+    key = stub(get_contents_as_string=get_contents_as_string, size=len(contents))
+    bucket = stub(new_key=lambda name: key, get_key=lambda name: key)
+    return stub(connect_s3=lambda: stub(get_bucket=lambda name: bucket))
+
+
+def _sources(path):
+    with open(path) as f:
+        contents = f.read()
+
+    def s3file():
+        source = S3File("s3://bucket/key.csv")
+        source.boto = _fake_boto(contents.encode("utf-8"))
+        return source
+
+    return {
+        "LocalFile": lambda: LocalFile(path),
+        "String": lambda: String(contents),
+        "S3File": s3file,
+    }
+
+
+def _factory(path, name):
+    if name == "S3File":
+        pytest.importorskip("boto")
+    return _sources(path)[name]
+
+
+def _read_all(source):
+    return sum(1 for _ in csv.DictReader(source.open()))
+
+
+@pytest.mark.parametrize("name", ["LocalFile", "String", "S3File"])
+def test_open(measure, csv_files, name):
+    path, kwargs = csv_files["narrow_clean"]
+    factory = _factory(path, name)
+    measure(_read_all, kwargs["rows"], setup=lambda: ((factory(),), {}))
+
+
+@pytest.mark.parametrize("name", ["LocalFile", "String", "S3File"])
+def test_read_head(measure, csv_files, name):
+    path, _ = csv_files["wide_clean"]
+    factory = _factory(path, name)
+    measure(
+        lambda source: source.read_head(4096),
+        1,
+        setup=lambda: ((factory(),), {}),
+        rounds=50,
+    )
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "cp1252", "utf-16"])
+def test_open_encoded(measure, csv_files, tmp_path, encoding):
+    path, kwargs = csv_files["narrow_clean"]
+    encoded = tmp_path / "encoded.csv"
+    with open(path) as f:
+        encoded.write_bytes(f.read().encode(encoding))
+    measure(
+        _read_all,
+        kwargs["rows"],
+        setup=lambda: ((LocalFile(str(encoded), encoding=encoding),), {}),
+    )
+
+
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_open_multi_file(measure, csv_files, tmp_path, prefetch):
+    path, kwargs = csv_files["narrow_clean"]
+    with open(path) as f:
+        header, *lines = f.readlines()
+    parts = 10
+    for i in range(parts):
+        with open(str(tmp_path / "part-{:05}.csv".format(i)), "w") as f:
+            f.write(header)
+            f.writelines(lines[i::parts])
+    measure(
+        _read_all,
+        kwargs["rows"],
+        setup=lambda: ((MultiFile.glob(str(tmp_path), prefetch=prefetch),), {}),
+    )
+
+
+def test_open_stdin(measure, csv_files):
+    path, kwargs = csv_files["narrow_clean"]
+    # A pipe, read as the data comes rather than all at once
+    measure(
+        _read_all,
+        kwargs["rows"],
+        setup=lambda: ((Stdin(open(path, "rb", buffering=65536)),), {}),
+    )
@@ -0,0 +1,104 @@
+import pytest
+
+from benchmarks.generators import write_csv
+from vladiate import exits
+from vladiate.main import main
+
+VLADFILE = """
+from vladiate import Vlad
+from vladiate.inputs import LocalFile
+from vladiate.validators import FloatValidator, IntValidator, NotEmptyValidator
+
+{classes}
+"""
+
+VLAD = """
+class Vlad{i}(Vlad):
+    source = LocalFile({path!r})
+    validators = {{
+        "int_0": [IntValidator()],
+        "float_1": [FloatValidator()],
+        "set_2": [NotEmptyValidator()],
+        "text_3": [NotEmptyValidator()],
+    }}
+"""
+
+SOURCES = 4
+ROWS = 10000
+
+
+@pytest.fixture(scope="module")
+def vladfile(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("vladfile")
+    classes = [
+        VLAD.format(i=i, path=str(write_csv(directory / "{}.csv".format(i), rows=ROWS)))
+        for i in range(SOURCES)
+    ]
+    path = directory / "bench_vladfile.py"
+    path.write_text(VLADFILE.format(classes="".join(classes)))
+    return str(path)
+
+
+@pytest.mark.parametrize("processes", [1, 2, 4])
+def test_main(measure, monkeypatch, vladfile, processes):
+    # Pool workers parse the command line again, so patch it rather than
+    # `parse_args`
+    monkeypatch.setattr(
+        "sys.argv", ["vladiate", "-f", vladfile, "-p", str(processes), "-q"]
+    )
+
+    def run():
+        assert main() == exits.OK
+
+    measure(run, SOURCES * ROWS, rounds=3)
+
+
+@pytest.mark.parametrize("processes", [1, 4])
+def test_main_sources(measure, monkeypatch, vladfile, tmp_path, processes):
+    # Many small files in a single run, rather than a run per file
+    manifest = tmp_path / "manifest.txt"
+    paths = [
+        str(write_csv(tmp_path / "{}.csv".format(i), rows=100)) for i in range(500)
+    ]
+    manifest.write_text("\n".join(paths) + "\n")
+    monkeypatch.setattr(
+        "sys.argv",
+        ["vladiate", "-f", vladfile, "-p", str(processes), "-q"]
+        + ["--sources", str(manifest), "Vlad0"],
+    )
+
+    def run():
+        assert main() == exits.OK
+
+    measure(run, len(paths) * 100, rounds=3)
+
+
+@pytest.fixture(scope="module")
+def skewed_vladfile(tmp_path_factory):
+    # One large source next to many small ones
+    directory = tmp_path_factory.mktemp("skewed")
+    classes = [
+        VLAD.format(i=0, path=str(write_csv(directory / "0.csv", rows=ROWS * 8)))
+    ]
+    classes += [
+        VLAD.format(
+            i=i, path=str(write_csv(directory / "{}.csv".format(i), rows=ROWS // 10))
+        )
+        for i in range(1, 16)
+    ]
+    path = directory / "bench_skewed_vladfile.py"
+    path.write_text(VLADFILE.format(classes="".join(classes)))
+    return str(path)
+
+
+@pytest.mark.parametrize("processes", ["1", "4"])
+def test_main_skewed(measure, monkeypatch, skewed_vladfile, processes):
+    monkeypatch.setattr(
+        "sys.argv", ["vladiate", "-f", skewed_vladfile, "-p", processes, "-q"]
+    )
+    monkeypatch.setattr("vladiate.scheduling.MIN_CHUNK_SIZE", 1024 * 1024)
+
+    def run():
+        assert main() == exits.OK
+
+    measure(run, ROWS * 8 + 15 * (ROWS // 10), rounds=3)
@@ -0,0 +1,106 @@
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from vladiate import exits
+
+# Each round runs the command line in a new interpreter, the same way the
+# `vladiate` console script is run, so this measures cold-start time
+COMMAND = [
+    sys.executable,
+    "-c",
+    "import sys; from vladiate.main import main; sys.exit(main())",
+]
+
+# Budgets for `import vladiate.main`: its cumulative import time in
+# microseconds (with cached bytecode), and the number of modules it imports.
+# Heavy modules should only be imported by the code paths which need them
+IMPORT_BUDGET = 45000
+MODULE_BUDGET = 45
+
+VLADFILE = """
+from vladiate import Vlad
+from vladiate.inputs import LocalFile, S3File
+from vladiate.validators import IntValidator
+
+{classes}
+"""
+
+VLAD = """
+class Vlad{i}(Vlad):
+    source = {source}
+    validators = {{"int_0": [IntValidator()]}}
+"""
+
+
+@pytest.fixture(scope="module")
+def vladfile(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("startup")
+    classes = [
+        VLAD.format(
+            i=i,
+            source=(
+                "S3File('s3://bucket/{}.csv')".format(i)
+                if i % 2
+                else "LocalFile('{}.csv')".format(i)
+            ),
+        )
+        for i in range(20)
+    ]
+    path = directory / "vladfile.py"
+    path.write_text(VLADFILE.format(classes="".join(classes)))
+    return str(path)
+
+
+@pytest.mark.parametrize("args", [["--version"], ["--help"], ["--list"]])
+def test_startup(benchmark, vladfile, args):
+    command = COMMAND + ["-f", vladfile] + args
+    expected = exits.OK if args != ["--help"] else 0
+
+    def run():
+        assert subprocess.call(command, stdout=subprocess.DEVNULL) == expected
+
+    benchmark.pedantic(run, rounds=10, iterations=1)
+
+
+IMPORT = (
+    "import sys; before = set(sys.modules); import vladiate.main; "
+    "print(len(set(sys.modules) - before))"
+)
+
+
+def _import(env):
+    """Return the import time of vladiate.main and the number of modules"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    for line in process.stderr.decode().splitlines():
+        fields = line.split("|")
+        if fields[-1].strip() == "vladiate.main":
+            return int(fields[1]), int(process.stdout)
+    raise AssertionError("vladiate.main wasn't imported")
+
+
+def test_import_budget(benchmark):
+    # Installed packages have their bytecode cached, so measure with it cached
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    _, modules = _import(env)
+    times = []
+
+    def run():
+        times.append(_import(env)[0])
+
+    benchmark.pedantic(run, rounds=10, iterations=1)
+    import_time = statistics.median(times)
+    benchmark.extra_info["import_time_us"] = import_time
+    benchmark.extra_info["modules"] = modules
+    assert modules <= MODULE_BUDGET
+    assert import_time < IMPORT_BUDGET
@@ -0,0 +1,206 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from vladiate.exceptions import ValidationException
+from vladiate.inputs import String
+from vladiate.validators import (
+    DateTimeValidator,
+    DateValidator,
+    DistinctCountValidator,
+    EmptyValidator,
+    FloatValidator,
+    ForeignKeyValidator,
+    Ignore,
+    IntValidator,
+    MaxValidator,
+    MonotonicValidator,
+    NotEmptyValidator,
+    NullRatioValidator,
+    RangeValidator,
+    RegexValidator,
+    RowLengthValidator,
+    SetValidator,
+    SumValidator,
+    UniqueValidator,
+)
+
+ROWS = 50000
+
+
+def _values(kind, dirty):
+    rng = random.Random(0)
+    values = []
+    for i in range(ROWS):
+        if dirty and rng.random() < dirty:
+            values.append("bad value")
+        elif kind == "int":
+            values.append(str(rng.randrange(100)))
+        elif kind == "float":
+            values.append(str(rng.random() * 100))
+        elif kind == "set":
+            values.append(rng.choice(["Vampire", "Not A Vampire"]))
+        elif kind == "unique":
+            values.append(str(i))
+        elif kind == "empty":
+            values.append("")
+        elif kind == "date":
+            # Dates repeat a lot in real data, e.g. one per day in a log
+            day = date(2020, 1, 1) + timedelta(days=rng.randrange(3650))
+            values.append(day.isoformat())
+        elif kind == "dmy":
+            day = date(2020, 1, 1) + timedelta(days=rng.randrange(3650))
+            values.append(day.strftime("%d/%m/%Y"))
+        elif kind == "datetime":
+            values.append(
+                (
+                    datetime(2020, 1, 1) + timedelta(seconds=rng.randrange(10**8))
+                ).isoformat()
+            )
+    return values
+
+
+class _StrptimeValidator(object):
+    """The naive way to validate dates, as a baseline"""
+
+    def __init__(self, format):
+        self.format = format
+
+    def validate(self, field, row={}):
+        try:
+            return datetime.strptime(field, self.format)
+        except ValueError as e:
+            raise ValidationException(e)
+
+
+# The referenced source of `ForeignKeyValidator`, with every "int" value
+KEYS = String("id\n" + "".join("{}\n".format(i) for i in range(100)))
+
+
+VALIDATORS = [
+    ("IntValidator", lambda: IntValidator(), "int"),
+    ("FloatValidator", lambda: FloatValidator(), "float"),
+    (
+        "FloatValidator(thousands, decimal)",
+        lambda: FloatValidator(thousands=" ", decimal="."),
+        "float",
+    ),
+    ("DateValidator", lambda: DateValidator(), "date"),
+    ("DateValidator(format)", lambda: DateValidator("%d/%m/%Y"), "dmy"),
+    ("DateValidator(strptime)", lambda: _StrptimeValidator("%Y-%m-%d"), "date"),
+    ("DateTimeValidator", lambda: DateTimeValidator(), "datetime"),
+    (
+        "DateTimeValidator(strptime)",
+        lambda: _StrptimeValidator("%Y-%m-%dT%H:%M:%S"),
+        "datetime",
+    ),
+    ("SetValidator", lambda: SetValidator(["Vampire", "Not A Vampire"]), "set"),
+    (
+        "SetValidator(ignore_case)",
+        lambda: SetValidator(["vampire", "not a vampire"], ignore_case=True),
+        "set",
+    ),
+    ("UniqueValidator", lambda: UniqueValidator(), "unique"),
+    (
+        "UniqueValidator(unique_with)",
+        lambda: UniqueValidator(unique_with=["other"]),
+        "unique",
+    ),
+    ("ForeignKeyValidator", lambda: ForeignKeyValidator(KEYS, "id"), "int"),
+    ("RegexValidator", lambda: RegexValidator(r"\d+"), "int"),
+    ("RegexValidator(full)", lambda: RegexValidator(r"\d+", full=True), "int"),
+    ("RangeValidator", lambda: RangeValidator(0, 100), "float"),
+    ("EmptyValidator", lambda: EmptyValidator(), "empty"),
+    ("NotEmptyValidator", lambda: NotEmptyValidator(), "set"),
+    ("Ignore", lambda: Ignore(), "set"),
+]
+
+
+def _validate_all(validator, values, row):
+    for value in values:
+        try:
+            validator.validate(value, row=row)
+        except ValidationException:
+            pass
+
+
+@pytest.mark.parametrize("dirty", [0.0, 0.1], ids=["clean", "dirty"])
+@pytest.mark.parametrize(
+    "factory, kind", [v[1:] for v in VALIDATORS], ids=[v[0] for v in VALIDATORS]
+)
+def test_validator(measure, factory, kind, dirty):
+    values = _values(kind, dirty)
+    row = {"other": "x"}
+    measure(
+        _validate_all,
+        ROWS,
+        setup=lambda: ((factory(), values, row), {}),
+    )
+
+
+@pytest.mark.parametrize("dirty", [0.0, 0.1], ids=["clean", "dirty"])
+@pytest.mark.parametrize(
+    "factory, kind",
+    [
+        (lambda: IntValidator(), "int"),
+        (lambda: FloatValidator(), "float"),
+        (lambda: FloatValidator(low=0, high=100), "float"),
+        (lambda: SetValidator(["Vampire", "Not A Vampire"]), "set"),
+    ],
+    ids=["IntValidator", "FloatValidator", "FloatValidator(low, high)", "SetValidator"],
+)
+def test_validate_batch(measure, factory, kind, dirty):
+    values = _values(kind, dirty)
+    rows = [{"other": "x"}] * len(values)
+    measure(
+        lambda validator: validator.validate_batch(values, rows),
+        ROWS,
+        setup=lambda: ((factory(),), {}),
+    )
+
+
+@pytest.mark.parametrize("dirty", [0.0, 0.1], ids=["clean", "dirty"])
+def test_row_length_validator(measure, dirty):
+    rng = random.Random(0)
+    good = {"A": "1", "B": "2"}
+    rows = [
+        {"A": "1", "B": None} if rng.random() < dirty else good for _ in range(ROWS)
+    ]
+
+    def validate_rows(validator):
+        for row in rows:
+            try:
+                validator.validate(row)
+            except ValidationException:
+                pass
+
+    measure(validate_rows, ROWS, setup=lambda: ((RowLengthValidator(),), {}))
+
+
+@pytest.mark.parametrize(
+    "factory",
+    [
+        lambda: SumValidator("A"),
+        lambda: MaxValidator("A"),
+        lambda: MonotonicValidator("B"),
+        lambda: DistinctCountValidator("A"),
+        lambda: NullRatioValidator("A"),
+    ],
+    ids=[
+        "SumValidator",
+        "MaxValidator",
+        "MonotonicValidator",
+        "DistinctCountValidator",
+        "NullRatioValidator",
+    ],
+)
+def test_aggregate_validator(measure, factory):
+    rows = [{"A": value, "B": str(i)} for i, value in enumerate(_values("int", 0.1))]
+
+    def validate_rows(validator):
+        for row in rows:
+            validator.validate(row)
+        validator.finish()
+
+    measure(validate_rows, ROWS, setup=lambda: ((factory(),), {}))
@@ -0,0 +1,132 @@
+import copy
+
+import pytest
+
+from benchmarks.generators import column_names
+from vladiate import structure
+from vladiate.inputs import LocalFile, String
+from vladiate.validators import (
+    FloatValidator,
+    IntValidator,
+    NotEmptyValidator,
+    RangeValidator,
+    RegexValidator,
+    RowLengthValidator,
+    SetValidator,
+)
+from vladiate.vlad import Vlad
+
+
+def _validators(columns, cardinality):
+    validators = {}
+    for name in column_names(columns):
+        kind = name.split("_")[0]
+        if kind == "int":
+            validators[name] = [IntValidator()]
+        elif kind == "float":
+            validators[name] = [FloatValidator()]
+        elif kind == "set" and cardinality <= 1000:
+            values = ["value-{}".format(i) for i in range(cardinality)]
+            validators[name] = [SetValidator(values)]
+        elif kind == "set":
+            validators[name] = [RegexValidator(r"value-\d+", full=True)]
+        else:
+            validators[name] = [NotEmptyValidator()]
+    return validators
+
+
+@pytest.mark.parametrize("batch_size", [None, 1000], ids=["rows", "batches"])
+@pytest.mark.parametrize(
+    "shape",
+    ["narrow_clean", "narrow_dirty", "wide_clean", "high_cardinality", "multiline"],
+)
+def test_validate(measure, csv_files, shape, batch_size):
+    path, kwargs = csv_files[shape]
+    columns = kwargs.get("columns", 4)
+    cardinality = kwargs.get("cardinality", 10)
+
+    def setup():
+        vlad = Vlad(
+            source=LocalFile(path),
+            validators=_validators(columns, cardinality),
+            row_validators=[RowLengthValidator()],
+            quiet=True,
+            batch_size=batch_size,
+        )
+        return (vlad,), {}
+
+    measure(lambda vlad: vlad.validate(), kwargs["rows"], setup=setup)
+
+
+def test_validate_stacked_validators(measure, csv_files):
+    path, kwargs = csv_files["narrow_clean"]
+
+    def setup():
+        validators = _validators(4, 10)
+        validators["int_0"].append(RangeValidator(0, 10**6))
+        validators["float_1"].append(RangeValidator(0, 10**6))
+        vlad = Vlad(source=LocalFile(path), validators=validators, quiet=True)
+        return (vlad,), {}
+
+    measure(lambda vlad: vlad.validate(), kwargs["rows"], setup=setup)
+
+
+def test_validate_with_failure_threshold(measure, csv_files):
+    path, kwargs = csv_files["narrow_clean"]
+
+    def setup():
+        vlad = Vlad(
+            source=LocalFile(path),
+            validators=_validators(4, 10),
+            file_validation_failure_threshold=0.5,
+            quiet=True,
+        )
+        return (vlad,), {}
+
+    measure(lambda vlad: vlad.validate(), kwargs["rows"], setup=setup)
+
+
+def test_check_schema(measure, csv_files):
+    path, _ = csv_files["wide_clean"]
+
+    def setup():
+        vlad = Vlad(source=LocalFile(path), validators=_validators(64, 10), quiet=True)
+        return (vlad,), {}
+
+    measure(lambda vlad: vlad.check_schema(), 1, setup=setup, rounds=50)
+
+
+@pytest.mark.parametrize(
+    "shape",
+    ["narrow_clean", "narrow_dirty", "wide_clean", "high_cardinality", "multiline"],
+)
+def test_structure_scan(measure, csv_files, shape):
+    path, kwargs = csv_files[shape]
+    measure(lambda: structure.scan(LocalFile(path)), kwargs["rows"])
+
+
+@pytest.mark.parametrize("compiled", [False, True], ids=["deepcopy", "plan"])
+def test_validate_many_small_sources(measure, compiled):
+    # Setting up the validators of each run matters when sources are small
+    columns = column_names(4)
+    rows = ["1,2.5,value-{0},x".format(i % 10) for i in range(20)]
+    data = ",".join(columns) + "\n" + "\n".join(rows) + "\n"
+    sources = [String(data) for _ in range(200)]
+
+    class Small(Vlad):
+        validators = _validators(4, 1000)
+
+    plan = Small.compile(quiet=True)
+
+    def run():
+        for source in sources:
+            if compiled:
+                plan.run(source)
+            else:
+                Small(
+                    source=source,
+                    validators=copy.deepcopy(Small.validators),
+                    quiet=True,
+                ).validate()
+
+    measure(run, len(sources) * len(rows))
@@ -0,0 +1,66 @@
+import tracemalloc
+
+import pytest
+
+from benchmarks.generators import write_csv
+
+_results = []
+
+
+@pytest.fixture
+def measure(benchmark, request):
+    """Benchmark `target`, recording rows/sec and peak memory
+
+    `setup` is called before each round and returns the `(args, kwargs)` to
+    call `target` with, so that each round gets fresh validator state.
+    """
+
+    def _measure(target, rows, setup=None, rounds=5):
+        result = benchmark.pedantic(target, setup=setup, rounds=rounds, iterations=1)
+
+        args, kwargs = setup() if setup else ((), {})
+        tracemalloc.start()
+        try:
+            target(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        benchmark.extra_info["rows"] = rows
+        benchmark.extra_info["peak_memory_bytes"] = peak
+        if benchmark.stats:
+            rows_per_sec = rows / benchmark.stats.stats.mean
+            benchmark.extra_info["rows_per_sec"] = rows_per_sec
+            _results.append((request.node.nodeid, rows_per_sec, peak))
+        return result
+
+    return _measure
+
+
+@pytest.fixture(scope="session")
+def csv_files(tmp_path_factory):
+    """Generated CSV files of different shapes, by name"""
+    directory = tmp_path_factory.mktemp("csv")
+    shapes = {
+        "narrow_clean": dict(rows=20000),
+        "narrow_dirty": dict(rows=20000, dirty=0.05),
+        "wide_clean": dict(rows=2000, columns=64),
+        "high_cardinality": dict(rows=20000, cardinality=10**9),
+        "multiline": dict(rows=20000, multiline=True),
+    }
+    return {
+        name: (str(write_csv(directory / (name + ".csv"), **kwargs)), kwargs)
+        for name, kwargs in shapes.items()
+    }
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("throughput")
+    for nodeid, rows_per_sec, peak in _results:
+        terminalreporter.write_line(
+            "{:>14,.0f} rows/sec {:>10,.0f} KiB peak  {}".format(
+                rows_per_sec, peak / 1024, nodeid
+            )
+        )
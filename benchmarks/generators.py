@@ -0,0 +1,68 @@
+"""Generators for synthetic CSV files to benchmark against"""
+
+import csv
+import io
+import random
+
+NARROW = 4
+WIDE = 64
+
+
+def _value(rng, column, cardinality, dirty, multiline):
+    if dirty and rng.random() < dirty:
+        return rng.choice(["", "n/a", "1,2", "x" * 20])
+    if column % 4 == 0:
+        return str(rng.randrange(cardinality))
+    if column % 4 == 1:
+        return "{:.3f}".format(rng.randrange(cardinality) / 7)
+    if column % 4 == 2:
+        return "value-{}".format(rng.randrange(cardinality))
+    if multiline:
+        return 'line one, with a comma\nline "two" {}'.format(rng.randrange(10))
+    return "text {}".format(rng.randrange(cardinality))
+
+
+def generate_csv(
+    rows=10000,
+    columns=NARROW,
+    dirty=0.0,
+    cardinality=10,
+    multiline=False,
+    delimiter=",",
+    seed=0,
+):
+    """Return a CSV document as a string
+
+    Columns cycle through int, float, low-entropy string and free text
+    values, named `int_0`, `float_1`, `set_2`, `text_3`, `int_4`, ...
+
+    :param rows: number of data rows
+    :param columns: number of columns (see `NARROW` and `WIDE`)
+    :param dirty: the fraction of cells which get an invalid value
+    :param cardinality: how many distinct values each column can have
+    :param multiline: whether text columns contain quoted newlines
+    """
+    rng = random.Random(seed)
+    output = io.StringIO()
+    writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(column_names(columns))
+    for _ in range(rows):
+        writer.writerow(
+            [
+                _value(rng, column, cardinality, dirty, multiline)
+                for column in range(columns)
+            ]
+        )
+    return output.getvalue()
+
+
+def column_names(columns):
+    kinds = ["int", "float", "set", "text"]
+    return ["{}_{}".format(kinds[i % 4], i) for i in range(columns)]
+
+
+def write_csv(path, **kwargs):
+    """Write a generated CSV document to `path` and return the path"""
+    with open(str(path), "w") as f:
+        f.write(generate_csv(**kwargs))
+    return path
@@ -37,7 +37,7 @@ setup(
     url="http://github.com/di/vladiate",
     license="MIT",
     long_description=readme(),
-    packages=find_packages(exclude=["examples", "tests"]),
+    packages=find_packages(exclude=["benchmarks", "examples", "tests"]),
     include_package_data=True,
     zip_safe=False,
     install_requires=[],
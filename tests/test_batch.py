@@ -0,0 +1,116 @@
+import io
+
+import pytest
+
+from vladiate import batch
+from vladiate.inputs import LocalFile, S3File
+from vladiate.validators import IntValidator, SetValidator, UniqueValidator
+from vladiate.vlad import Vlad
+
+
+class Vampires(Vlad):
+    source = LocalFile("vladiate/examples/vampires.csv")
+    validators = {
+        "Column A": [UniqueValidator()],
+        "Column B": [SetValidator(["Vampire", "Not A Vampire"])],
+    }
+
+
+class Numbers(Vlad):
+    source = LocalFile("numbers.csv", encoding="latin-1")
+    validators = {"Number": [IntValidator()]}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    good = tmp_path / "good.csv"
+    good.write_text("Column A,Column B\nVlad,Vampire\nIgor,Not A Vampire\n")
+    bad = tmp_path / "bad.csv"
+    bad.write_text("Column A,Column B\nVlad,Vampire\nVlad,Maybe A Vampire\n")
+    big = tmp_path / "big.csv"
+    big.write_text(
+        "Column A,Column B\n"
+        + "".join("Vlad {},Vampire\n".format(i) for i in range(100))
+    )
+    return [str(good), str(bad), str(big)]
+
+
+def test_read_manifest(tmp_path, sources, monkeypatch):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(
+        "# Today's files\n{}\n\n  {}  \ns3://bucket/key.csv\n".format(
+            sources[0], str(tmp_path / "b*.csv")
+        )
+    )
+    expected = [sources[0], sources[1], sources[2], "s3://bucket/key.csv"]
+
+    assert batch.read_manifest(str(manifest)) == expected
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(manifest.read_text()))
+    assert batch.read_manifest("-") == expected
+
+
+def test_read_manifest_glob(tmp_path, sources):
+    assert batch.read_manifest(str(tmp_path)) == sorted(sources)
+    assert batch.read_manifest(str(tmp_path / "b*.csv")) == sorted(sources[1:])
+    with pytest.raises(ValueError):
+        batch.read_manifest(str(tmp_path / "*.txt"))
+
+
+def test_make_source():
+    source = batch.make_source("numbers-2.csv", Numbers.source)
+    assert isinstance(source, LocalFile)
+    assert source.filename == "numbers-2.csv"
+    assert source.encoding == "latin-1"
+
+    source = batch.make_source("s3://bucket/key.csv")
+    assert isinstance(source, S3File)
+    assert (source.bucket, source.key) == ("bucket", "/key.csv")
+
+
+def test_schedule(sources):
+    assert batch.schedule(sources + ["missing.csv"]) == [
+        sources[2],
+        sources[1],
+        sources[0],
+        "missing.csv",
+    ]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_run(sources, processes):
+    specs = sources + ["missing.csv"]
+    summaries = batch.run({"Vampires": Vampires.compile()}, specs, processes)
+
+    assert [summary["source"] for summary in summaries] == [
+        repr(LocalFile(spec)) for spec in specs
+    ]
+    assert [summary["passed"] for summary in summaries] == [True, False, True, False]
+    assert [summary["rows"] for summary in summaries] == [2, 2, 100, 0]
+    assert summaries[1]["failures"] == [
+        {"validator": "UniqueValidator", "field": "Column A", "count": 1},
+        {"validator": "SetValidator", "field": "Column B", "count": 1},
+    ]
+    assert summaries[3]["error"].startswith("FileNotFoundError")
+    # Validators aren't shared between sources
+    assert Vampires.validators["Column A"][0].fail_count == 0
+
+
+def test_run_several_vlads(sources):
+    plans = {"Vampires": Vampires.compile(), "Numbers": Numbers.compile()}
+    summaries = batch.run(plans, sources[:1])
+
+    assert [(summary["vlad"], summary["passed"]) for summary in summaries] == [
+        ("Numbers", False),
+        ("Vampires", True),
+    ]
+    assert summaries[0]["missing_validators"] == ["Column A", "Column B"]
+
+
+def test_report(sources, caplog):
+    summaries = batch.run({"Vampires": Vampires.compile()}, sources)
+
+    assert not batch.report(summaries)
+    assert "  UniqueValidator failed 1 time(s) on field: 'Column A'" in caplog.messages
+    assert "\n3 validation(s): 2 passed, 1 failed" in caplog.messages
+    assert batch.report([summaries[0]])
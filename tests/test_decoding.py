@@ -0,0 +1,107 @@
+import codecs
+
+import pytest
+
+from vladiate import decoding
+from vladiate.decoding import DecodedLines, ascii_compatible, resolve
+
+
+@pytest.mark.parametrize(
+    "encoding, head, expected",
+    [
+        (None, b"a,b", ("utf-8", 0)),
+        (None, codecs.BOM_UTF8 + b"a", ("utf-8", 3)),
+        (None, codecs.BOM_UTF16_LE + b"a\x00", ("utf-16-le", 2)),
+        (None, codecs.BOM_UTF16_BE + b"\x00a", ("utf-16-be", 2)),
+        (None, codecs.BOM_UTF32_LE + b"a\x00\x00\x00", ("utf-32-le", 4)),
+        ("utf-8-sig", codecs.BOM_UTF8 + b"a", ("utf-8", 3)),
+        ("utf-8-sig", b"a", ("utf-8", 0)),
+        ("UTF16", codecs.BOM_UTF16_BE + b"\x00a", ("utf-16-be", 2)),
+        # A BOM of another encoding is just data
+        ("utf-16", codecs.BOM_UTF32_LE, ("utf-16-le", 2)),
+        ("latin-1", codecs.BOM_UTF8 + b"a", ("iso8859-1", 0)),
+    ],
+)
+def test_resolve(encoding, head, expected):
+    assert resolve(encoding, head) == expected
+
+
+def test_ascii_compatible():
+    assert ascii_compatible("utf-8")
+    assert ascii_compatible("cp1252")
+    assert not ascii_compatible("utf-16-le")
+    assert not ascii_compatible("no-such-codec")
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 1024])
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "latin-1"])
+def test_decoded_lines(encoding, block_size):
+    text = 'Name,Note\r\nDracula,Vampire\r\n"Vlad\rTepes",Impaler\nÉlisabeth,x'
+    data = text.encode(encoding)
+    blocks = [data[i : i + block_size] for i in range(0, len(data), block_size)]
+
+    lines = DecodedLines(blocks, None if encoding.startswith("utf") else encoding)
+
+    assert list(lines) == [
+        "Name,Note\r\n",
+        "Dracula,Vampire\r\n",
+        '"Vlad\r',
+        'Tepes",Impaler\n',
+        "Élisabeth,x",
+    ]
+    assert lines.invalid_count == 0
+
+
+@pytest.mark.parametrize("block_size", [2, 1024])
+def test_decoded_lines_reports_invalid_bytes(block_size):
+    data = b"a,b\n1,\xff\xfe\n2,3\n\xe9t\xc3"
+    blocks = [data[i : i + block_size] for i in range(0, len(data), block_size)]
+
+    lines = DecodedLines(blocks)
+
+    assert list(lines) == ["a,b\n", "1,��\n", "2,3\n", "�t�"]
+    assert lines.invalid == [
+        (2, "Invalid UTF-8: invalid start byte"),
+        (2, "Invalid UTF-8: invalid start byte"),
+        (4, "Invalid UTF-8: invalid continuation byte"),
+        (4, "Invalid UTF-8: unexpected end of data"),
+    ]
+    assert lines.invalid_count == 4
+
+
+def test_decoded_lines_caps_reports():
+    lines = DecodedLines([b"\xff\n" * 10], max_errors=3)
+
+    assert len(list(lines)) == 10
+    assert lines.invalid == [
+        (i, "Invalid UTF-8: invalid start byte") for i in (1, 2, 3)
+    ]
+    assert lines.invalid_count == 10
+
+
+def test_decoded_lines_reports_lines_of_utf_16():
+    data = "a\nb\n".encode("utf-16-le") + b"\x00\xd8" + "\nc\n".encode("utf-16-le")
+
+    lines = DecodedLines([data], "utf-16-le")
+
+    assert list(lines) == ["a\n", "b\n", "�\n", "c\n"]
+    assert lines.invalid == [(3, "Invalid UTF-16-LE: illegal UTF-16 surrogate")]
+
+
+@pytest.mark.parametrize("errors, expected", [("replace", "�x\n"), ("ignore", "x\n")])
+def test_decoded_lines_error_handlers(errors, expected):
+    lines = DecodedLines([b"\xffx\n"], errors=errors)
+
+    assert list(lines) == [expected]
+    assert lines.invalid_count == 0
+
+
+def test_decoded_lines_error_handler_raises():
+    with pytest.raises(UnicodeDecodeError):
+        list(DecodedLines([b"\xffx\n"], errors="surrogatepass"))
+
+
+def test_invalid_sequences():
+    found = decoding.invalid_sequences(b"a\xffb\xfe", "utf-8")
+
+    assert found == [(1, 2, "invalid start byte"), (3, 4, "invalid start byte")]
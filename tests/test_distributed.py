@@ -0,0 +1,361 @@
+import multiprocessing
+import multiprocessing.dummy
+import socket
+from base64 import b64decode
+
+import pytest
+from pretend import call_recorder, stub
+
+from vladiate.distributed import (
+    Coordinator,
+    Worker,
+    _receive,
+    _send,
+    combine,
+    fresh,
+    parse_address,
+    run_task,
+)
+from vladiate.inputs import LocalFile, MultiFile
+from vladiate.validators import (
+    DistinctCountValidator,
+    IntValidator,
+    MonotonicValidator,
+    NotEmptyValidator,
+    RowLengthValidator,
+    SetValidator,
+    SumValidator,
+    UniqueValidator,
+    deserialize_state,
+)
+from vladiate.vlad import Vlad
+
+
+@pytest.fixture
+def vlads(tmp_path):
+    path = tmp_path / "numbers.csv"
+    lines = ["Number,Kind,Note"]
+    for i in range(3000):
+        kind = "odd" if i % 2 else "even"
+        if i % 100 == 0:
+            kind = "neither"
+        lines.append("{},{},{}".format(i % 2500, kind, "x" if i % 700 else ""))
+    lines.append("1,even")
+    path.write_text("\n".join(lines) + "\n")
+
+    class Numbers(Vlad):
+        source = LocalFile(str(path))
+        validators = {
+            "Number": [UniqueValidator(), IntValidator()],
+            "Kind": [SetValidator(["odd", "even"])],
+            "Note": [NotEmptyValidator()],
+        }
+        row_validators = [
+            RowLengthValidator(),
+            # Only the sum of every shard is too large
+            SumValidator("Number", high=3000000),
+            MonotonicValidator("Number"),
+            DistinctCountValidator("Number", high=2000),
+        ]
+
+    class Vampires(Vlad):
+        source = LocalFile("vladiate/examples/vampires.csv")
+        validators = {
+            "Column A": [UniqueValidator()],
+            "Column B": [SetValidator(["Vampire", "Not A Vampire"])],
+        }
+
+    return {"Numbers": Numbers, "Vampires": Vampires}
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [("localhost:1234", ("localhost", 1234)), (":1234", ("127.0.0.1", 1234))],
+)
+def test_parse_address(address, expected):
+    assert parse_address(address) == expected
+
+
+def test_fresh_copies_validators(vlads):
+    first = fresh(vlads["Vampires"])
+    second = fresh(vlads["Vampires"])
+    assert first.validators["Column A"][0] is not second.validators["Column A"][0]
+    assert first.validators["Column A"][0] is not (
+        vlads["Vampires"].validators["Column A"][0]
+    )
+
+
+def test_plan_splits_large_sources(vlads):
+    coordinator = Coordinator(vlads, chunk_size=4096, quiet=True)
+    tasks = coordinator.plan()
+    coordinator.server.server_close()
+
+    numbers = [task for task in tasks if task["vlad"] == "Numbers"]
+    vampires = [task for task in tasks if task["vlad"] == "Vampires"]
+    assert len(numbers) > 1
+    assert numbers[0]["start"] == numbers[0]["header_end"] == len("Number,Kind,Note\n")
+    assert all(a["end"] == b["start"] for a, b in zip(numbers, numbers[1:]))
+    assert numbers[-1]["end"] == vlads["Numbers"].source.size()
+    assert [task["start"] for task in vampires] == [None]
+
+
+def test_plan_splits_between_records(tmp_path):
+    path = tmp_path / "notes.csv"
+    rows = ['{},"a note\n{}\nover lines"'.format(i, i) for i in range(500)]
+    path.write_text("id,Note\n" + "\n".join(rows) + "\n")
+
+    class Notes(Vlad):
+        source = LocalFile(str(path))
+        validators = {
+            "id": [IntValidator(), UniqueValidator()],
+            "Note": [NotEmptyValidator()],
+        }
+
+    coordinator = Coordinator({"Notes": Notes}, chunk_size=1000, quiet=True)
+    coordinator.server.server_close()
+    assert len(coordinator.tasks) > 10
+    while True:
+        task = coordinator.next_task()
+        if task is None or task["type"] == "wait":
+            break
+        coordinator.complete(run_task({"Notes": Notes}, task))
+    # No chunk starts inside a quoted field
+    assert all(result["passed"] for result in coordinator.results.values())
+    assert sum(result["rows"] for result in coordinator.results.values()) == 500
+    assert coordinator.report()
+
+
+def _work(vlads, address):
+    Worker(vlads, address).run()
+
+
+def test_coordinator_and_workers(vlads):
+    expected = fresh(vlads["Numbers"], quiet=True)
+    assert not expected.validate()
+
+    coordinator = Coordinator(vlads, chunk_size=4096, quiet=True)
+    workers = [
+        multiprocessing.Process(target=_work, args=(vlads, coordinator.address))
+        for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        assert not coordinator.serve()
+    finally:
+        for worker in workers:
+            worker.join(10)
+
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert len(coordinator.results) == len(coordinator.tasks)
+    rows = sum(
+        result["rows"]
+        for result in coordinator.results.values()
+        if coordinator.tasks[result["id"]]["vlad"] == "Numbers"
+    )
+    assert rows == expected.line_count
+
+
+def test_report_merges_state_across_tasks(monkeypatch, vlads):
+    expected = fresh(vlads["Numbers"], quiet=True)
+    expected.validate()
+
+    coordinator = Coordinator(vlads, chunk_size=4096, quiet=True)
+    coordinator.server.server_close()
+    while True:
+        task = coordinator.next_task()
+        if task is None or task["type"] == "wait":
+            break
+        coordinator.complete(run_task(vlads, task))
+
+    reported = {}
+
+    def capture(self):
+        reported[self.__class__.__name__] = self
+
+    monkeypatch.setattr(Vlad, "_log_validator_failures", capture)
+    assert not coordinator.report()
+
+    vlad = reported["Numbers"]
+    assert vlad.line_count == expected.line_count
+    for field_name, validators in expected.validators.items():
+        for merged, validator in zip(vlad.validators[field_name], validators):
+            assert merged.fail_count == validator.fail_count
+            assert merged.bad == validator.bad
+    assert vlad.row_validators[0].fail_count == 1
+    for merged, validator in zip(vlad.row_validators, expected.row_validators):
+        assert merged.fail_count == validator.fail_count
+        assert merged.bad == validator.bad
+    assert [validator.fail_count for validator in vlad.row_validators] == [1, 1, 2, 1]
+    assert "Vampires" not in reported
+
+
+def test_parts_are_separate_tasks(tmp_path):
+    for part in range(3):
+        rows = "".join("{}\n".format(part * 10 + i) for i in range(20))
+        (tmp_path / "part-{}.csv".format(part)).write_text("Number\n" + rows)
+
+    class Parts(Vlad):
+        source = MultiFile.glob(str(tmp_path))
+        validators = {"Number": [UniqueValidator()]}
+        row_validators = [SumValidator("Number", high=1000)]
+
+    expected = fresh(Parts, quiet=True)
+    assert not expected.validate()
+    coordinator = Coordinator({"Parts": Parts}, chunk_size=40, quiet=True)
+    coordinator.server.server_close()
+
+    # Large parts are split into chunks in turn
+    parts = [task["part"] for task in coordinator.tasks.values()]
+    assert parts == sorted(parts) and set(parts) == {0, 1, 2} and len(parts) > 3
+    while True:
+        task = coordinator.next_task()
+        if task is None or task["type"] == "wait":
+            break
+        coordinator.complete(run_task({"Parts": Parts}, task))
+    assert not coordinator.report()
+    assert sum(result["rows"] for result in coordinator.results.values()) == 60
+    # Duplicates across parts are only caught once their state is merged
+    assert all(result["passed"] for result in coordinator.results.values())
+    merged = fresh(Parts, quiet=True)
+    for task_id in sorted(coordinator.results):
+        merged.merge(
+            deserialize_state(b64decode(coordinator.results[task_id]["state"]))
+        )
+    merged.finish()
+    assert merged.validators["Number"][0].bad == expected.validators["Number"][0].bad
+    assert merged.row_validators[0].fail_count == 1
+
+
+def test_disconnected_worker_task_is_requeued(vlads):
+    coordinator = Coordinator({"Vampires": vlads["Vampires"]}, quiet=True)
+    server = multiprocessing.dummy.Process(target=coordinator.serve)
+    server.start()
+
+    connection = socket.create_connection(coordinator.address)
+    f = connection.makefile("rwb")
+    _send(f, {"type": "request"})
+    assert _receive(f)["vlad"] == "Vampires"
+    f.close()
+    connection.close()
+
+    assert Worker({"Vampires": vlads["Vampires"]}, coordinator.address).run() == 1
+    server.join(10)
+    assert list(coordinator.results) == [0]
+
+
+def test_worker_waits_for_outstanding_tasks(vlads):
+    coordinator = Coordinator({"Vampires": vlads["Vampires"]}, quiet=True)
+    coordinator.server.server_close()
+    task = coordinator.next_task()
+    assert coordinator.next_task() == {"type": "wait"}
+    coordinator.complete(run_task(vlads, task))
+    assert coordinator.next_task() is None
+    assert coordinator.finished.is_set()
+
+
+def test_no_tasks():
+    coordinator = Coordinator({}, quiet=True)
+    assert coordinator.serve()
+
+
+def test_run_task_with_a_plan(vlads):
+    task = {"id": 0, "vlad": "Vampires", "start": None}
+    result = run_task({"Vampires": vlads["Vampires"].compile()}, task)
+    expected = run_task(vlads, task)
+    assert result.pop("elapsed") >= 0
+    expected.pop("elapsed")
+    assert result == expected
+    assert result["passed"]
+
+
+def test_failed_task_is_done(vlads):
+    class Broken(Vlad):
+        source = vlads["Vampires"].source
+        validators = {
+            "Column A": [UniqueValidator(unique_with=["zzz"])],
+            "Column B": [NotEmptyValidator()],
+        }
+
+    coordinator = Coordinator({"Broken": Broken}, quiet=True)
+    coordinator.logger = stub(error=call_recorder(lambda message: None))
+    worker = multiprocessing.Process(
+        target=_work, args=({"Broken": Broken}, coordinator.address)
+    )
+    worker.start()
+    try:
+        assert not coordinator.serve()
+    finally:
+        worker.join(10)
+
+    # The worker survived the task, which wasn't handed out again
+    assert worker.exitcode == 0
+    (result,) = coordinator.results.values()
+    assert not result["passed"]
+    assert result["state"] is None
+    assert result["error"].startswith("BadValidatorException")
+    (message,) = coordinator.logger.error.calls[0].args
+    assert message.startswith("Task 0 of Broken failed: BadValidatorException")
+
+
+def test_missing_source_fails(tmp_path):
+    class Missing(Vlad):
+        source = LocalFile(str(tmp_path / "missing.csv"))
+        validators = {"Number": [IntValidator()]}
+
+    coordinator = Coordinator({"Missing": Missing}, chunk_size=40, quiet=True)
+    coordinator.server.server_close()
+    coordinator.logger = stub(error=call_recorder(lambda message: None))
+
+    task = coordinator.next_task()
+    assert task["start"] is None
+    coordinator.complete(run_task({"Missing": Missing}, task))
+    assert coordinator.results[0]["error"].startswith("FileNotFoundError")
+    assert not coordinator.report()
+
+
+def _run_tasks(vlads, chunk_size):
+    coordinator = Coordinator(vlads, chunk_size=chunk_size, quiet=True)
+    coordinator.server.server_close()
+    while True:
+        task = coordinator.next_task()
+        if task is None or task["type"] == "wait":
+            break
+        coordinator.complete(run_task(vlads, task))
+    return [result for _, result in sorted(coordinator.results.items())]
+
+
+def test_combine_keeps_read_errors(monkeypatch, tmp_path):
+    path = tmp_path / "numbers.csv"
+    rows = [b"\xff\n" if i % 100 == 0 else b"1\n" for i in range(1000)]
+    path.write_bytes(b"Number\n" + b"".join(rows))
+
+    class Numbers(Vlad):
+        source = LocalFile(str(path))
+        validators = {"Number": [NotEmptyValidator()]}
+
+    expected = fresh(Numbers, quiet=True)
+    assert not expected.validate()
+    results = _run_tasks({"Numbers": Numbers}, 500)
+    logged = []
+    monkeypatch.setattr(Vlad, "_log_read_errors", lambda self: logged.append(self))
+    assert len(results) > 1
+    vlad = combine("Numbers", Numbers, results, quiet=True)
+    assert not vlad.passed
+    assert logged == [vlad]
+    assert vlad.read_error_count == expected.read_error_count == 10
+    assert all("(in Chunk(" in message for _, message in vlad.read_errors)
+
+
+def test_combine_keeps_missing_fields(monkeypatch, vlads):
+    class Vampires(Vlad):
+        source = vlads["Vampires"].source
+        validators = dict(vlads["Vampires"].validators, Bats=[NotEmptyValidator()])
+
+    results = _run_tasks({"Vampires": Vampires}, 4096)
+    logged = []
+    monkeypatch.setattr(Vlad, "_log_missing_fields", lambda self: logged.append(self))
+    vlad = combine("Vampires", Vampires, results, quiet=True)
+    assert not vlad.passed
+    assert logged == [vlad]
+    assert vlad.missing_fields == {"Bats"}
@@ -0,0 +1,58 @@
+from pretend import stub
+
+from vladiate.exceptions import ValidationException
+from vladiate.failures import FailureLog
+
+
+def test_failure_log():
+    log = FailureLog()
+    field_validator, row_validator = stub(), stub()
+    assert not log
+
+    log.add(3, "Foo", field_validator, ValidationException("'x' is bad"))
+    log.add(3, None, row_validator, "Row is bad")
+    log.add(5, "Foo", field_validator, "'x' is bad")
+    log.add(None, None, row_validator, "Rows are bad")
+
+    assert len(log) == 4
+    assert list(log) == [
+        (3, "Foo", field_validator, "'x' is bad"),
+        (3, None, row_validator, "Row is bad"),
+        (5, "Foo", field_validator, "'x' is bad"),
+        (None, None, row_validator, "Rows are bad"),
+    ]
+    assert log.by_field() == {"Foo": {3: ["'x' is bad"], 5: ["'x' is bad"]}}
+    assert log.by_line() == {3: ["Row is bad"], None: ["Rows are bad"]}
+    # Repeated messages and validators are only kept once
+    assert len(log.templates) == 3
+    assert len(log.validators) == 2
+
+
+def test_failure_log_templates():
+    log = FailureLog()
+    validator = stub()
+    for line, field in enumerate(["x", "{y}", "z"]):
+        log.add(line, "Foo", validator, ValidationException("'{}' is bad", field))
+    log.add(3, "Foo", validator, ValidationException("'{}' after '{}'", "b", "a"))
+    log.add(4, "Foo", validator, ValidationException("'{}' is bad"))
+
+    assert [message for _, _, _, message in log] == [
+        "'x' is bad",
+        "'{y}' is bad",
+        "'z' is bad",
+        "'b' after 'a'",
+        "'{}' is bad",
+    ]
+    # Failures of the same template only keep their value
+    assert len(log.templates) == 3
+    assert log.values[:3] == ["x", "{y}", "z"]
+
+
+def test_failure_log_many_validators():
+    log = FailureLog()
+    validators = [stub() for _ in range(70000)]
+    for i, validator in enumerate(validators):
+        log.add(i, "Foo", validator, "bad")
+
+    assert log.validator_ids[-1] == 69999
+    assert list(log)[-1] == (69999, "Foo", validators[-1], "bad")
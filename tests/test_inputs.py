@@ -1,8 +1,22 @@
+import io
+import threading
+import time
+
 import pytest
 from pretend import stub, call, call_recorder
 
 from vladiate.exceptions import MissingExtraException
-from vladiate.inputs import S3File, StringIO, String, VladInput
+from vladiate.inputs import (
+    Chunk,
+    LocalFile,
+    MultiFile,
+    S3File,
+    S3Prefix,
+    Stdin,
+    StringIO,
+    String,
+    VladInput,
+)
 from vladiate.vlad import Vlad
 
 
@@ -30,7 +44,9 @@ def mock_boto(result):
 )
 def test_s3_input_works(kwargs):
     mock_boto(lambda: stub())
-    S3File(**kwargs)
+    s3file = S3File(**kwargs)
+
+    assert s3file.path == "s3://some.bucket/some/s3/key.csv"
 
 
 @pytest.mark.parametrize(
@@ -77,7 +93,246 @@ def test_open_s3file():
 
     assert new_key.calls == [call("/some/s3/key.csv")]
 
-    assert result.readlines() == [b"contents"]
+    assert list(result) == ["contents"]
+
+
+def test_read_head_s3file():
+    get_contents_as_string = call_recorder(lambda *args, **kwargs: b"Column A,")
+    new_key = call_recorder(
+        lambda *args, **kwargs: stub(get_contents_as_string=get_contents_as_string)
+    )
+    get_bucket = call_recorder(lambda *args, **kwargs: stub(new_key=new_key))
+
+    s3file = S3File("s3://some.bucket/some/s3/key.csv")
+    s3file.boto = stub(connect_s3=lambda: stub(get_bucket=get_bucket))
+
+    assert s3file.read_head(9) == b"Column A,"
+    assert get_contents_as_string.calls == [call(headers={"Range": "bytes=0-8"})]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        LocalFile("vladiate/examples/vampires.csv"),
+        String("Column A,Column B\nVlad the Impaler,Not A Vampire\n"),
+    ],
+)
+def test_read_head(source):
+    assert source.read_head(10) == b"Column A,C"
+    assert source.read_head(10000).startswith(b"Column A,Column B\n")
+
+
+def test_base_class_read_head():
+    class LinesInput(VladInput):
+        def __init__(self):
+            pass
+
+        def open(self):
+            return ["Column A,Column B\n", "Dracula,Vampire\n"]
+
+    assert LinesInput().read_head(4) == b"Colu"
+    assert LinesInput().read_head(1000) == b"Column A,Column B\nDracula,Vampire\n"
+
+
+@pytest.mark.parametrize("encoding", [None, "utf-8-sig", "utf-16", "cp1252"])
+def test_localfile_encodings(tmp_path, encoding):
+    path = tmp_path / "source.csv"
+    path.write_bytes("Name\r\nÉlisabeth\r\n".encode(encoding or "utf-8-sig"))
+
+    lines = LocalFile(str(path), encoding=encoding).open()
+
+    assert list(lines) == ["Name\r\n", "Élisabeth\r\n"]
+
+
+def test_localfile_reports_invalid_bytes(tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_bytes(b"Name\nx\n\xe9lisabeth\n")
+
+    lines = LocalFile(str(path)).open()
+
+    assert list(lines)[2] == "\ufffdlisabeth\n"
+    assert lines.invalid == [(3, "Invalid UTF-8: invalid continuation byte")]
+    assert list(LocalFile(str(path), errors="ignore").open())[2] == "lisabeth\n"
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"encoding": "no-such-encoding"}, {"errors": "no-such-handler"}]
+)
+def test_unknown_encodings_fail_early(kwargs):
+    with pytest.raises(LookupError):
+        LocalFile("foo.csv", **kwargs)
+    with pytest.raises(LookupError):
+        S3File("s3://some.bucket/key.csv", **kwargs)
+
+
+def test_chunk_decodes_like_its_source(tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_bytes("Name\nÉlisabeth\nZoë\n".encode("utf-8-sig"))
+    source = LocalFile(str(path))
+    header_end = len("\ufeffName\n".encode("utf-8"))
+    middle = header_end + len("Élisabeth\n".encode("utf-8"))
+
+    chunks = [
+        Chunk(source, header_end, header_end, middle),
+        Chunk(source, header_end, middle, source.size()),
+    ]
+
+    assert [list(chunk.open()) for chunk in chunks] == [
+        ["Name\n", "Élisabeth\n"],
+        ["Name\n", "Zoë\n"],
+    ]
+
+
+@pytest.fixture
+def parts(tmp_path):
+    contents = [
+        b"A,B\r\n1,2\r\n",
+        b"A,B\n3,\xff\n4,5\n",
+        b"A,C\n6,7\n",
+        b"A,B\n8,9",
+    ]
+    for i, data in enumerate(contents):
+        (tmp_path / "part-{}.csv".format(i)).write_bytes(data)
+    (tmp_path / "notes.txt").write_text("not a part")
+    return tmp_path
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 4])
+def test_multi_file(parts, prefetch):
+    source = MultiFile.glob(str(parts), prefetch=prefetch)
+
+    lines = source.open()
+
+    assert list(lines) == ["A,B\r\n", "1,2\r\n", "3,\ufffd\n", "4,5\n", "8,9"]
+    part = "LocalFile('{}')".format(parts / "part-{}.csv")
+    assert lines.invalid == [
+        (3, part.format(1) + ": line 2: Invalid UTF-8: invalid start byte"),
+        (5, part.format(2) + ": header differs from the first part's"),
+    ]
+    assert lines.invalid_count == 2
+
+
+def test_multi_file_prefetch_is_bounded():
+    read = []
+
+    def open_part(rows):
+        yield "A\n"
+        for i in range(rows):
+            read.append(i)
+            yield "{}\n".format(i)
+
+    threads = threading.active_count()
+    source = MultiFile([stub(open=lambda: open_part(100000))] * 3, prefetch=2)
+    lines = iter(source.open())
+    assert next(lines) == "A\n"
+    time.sleep(0.2)
+    # Parts are read a few batches ahead, rather than in full
+    assert 0 < len(read) < 3 * 10000
+
+    lines.close()
+    deadline = time.monotonic() + 5
+    while threading.active_count() > threads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert threading.active_count() == threads
+
+
+def test_multi_file_attributes(parts):
+    source = MultiFile.glob(str(parts / "part-[01].csv"))
+    files = [LocalFile(str(parts / "part-{}.csv".format(i))) for i in range(3)]
+
+    assert repr(source) == "MultiFile('{}')".format(parts / "part-[01].csv")
+    assert source.parts[1].filename == files[1].filename
+    assert source.read_head(5) == b"A,B\r\n"
+    assert source.size() == files[0].size() + files[1].size()
+    assert source.fingerprint() == MultiFile(files[:2]).fingerprint()
+    assert source.fingerprint() != MultiFile(files[1:]).fingerprint()
+    assert MultiFile([files[0], String("A,B\n")]).size() is None
+    assert repr(MultiFile(files[:2])) == "MultiFile({!r}, {!r})".format(*files[:2])
+    assert repr(MultiFile(files)).endswith(", ... 3 parts)")
+    with pytest.raises(ValueError):
+        MultiFile.glob(str(parts / "*.json"))
+
+
+def test_s3_prefix():
+    contents = {"feed/part-1.csv": b"A\n2\n", "feed/part-0.csv": b"A\n1\n"}
+    keys = [stub(name=name) for name in ["feed/", *contents]]
+    list_keys = call_recorder(lambda prefix: keys)
+    bucket = stub(
+        list=list_keys,
+        new_key=lambda key: stub(get_contents_as_string=lambda: contents[key[1:]]),
+    )
+    mock_boto(lambda: stub(connect_s3=lambda: stub(get_bucket=lambda name: bucket)))
+
+    source = S3Prefix("s3://some.bucket/feed/", prefetch=0)
+
+    assert repr(source) == "S3Prefix('s3://some.bucket/feed/')"
+    assert list_keys.calls == []
+    assert list(source.open()) == ["A\n", "1\n", "2\n"]
+    assert [part.path for part in source.parts] == [
+        "s3://some.bucket/feed/part-0.csv",
+        "s3://some.bucket/feed/part-1.csv",
+    ]
+    assert list_keys.calls == [call(prefix="feed/")]
+
+
+def test_size_and_read_range_s3file():
+    get_contents_as_string = call_recorder(lambda *args, **kwargs: b"A,B")
+    new_key = lambda *args, **kwargs: stub(
+        get_contents_as_string=get_contents_as_string
+    )
+    get_key = call_recorder(lambda *args, **kwargs: stub(size=1234))
+    bucket = stub(new_key=new_key, get_key=get_key)
+
+    s3file = S3File("s3://some.bucket/some/s3/key.csv")
+    s3file.boto = stub(connect_s3=lambda: stub(get_bucket=lambda name: bucket))
+
+    assert s3file.size() == 1234
+    assert get_key.calls == [call("/some/s3/key.csv")]
+    assert s3file.read_range(10, 13) == b"A,B"
+    assert s3file.read_range(10, 10) == b""
+    assert get_contents_as_string.calls == [call(headers={"Range": "bytes=10-12"})]
+
+
+def test_size_and_read_range_localfile():
+    source = LocalFile("vladiate/examples/vampires.csv")
+    with open("vladiate/examples/vampires.csv", "rb") as f:
+        contents = f.read()
+
+    assert source.size() == len(contents)
+    assert source.read_range(9, 17) == contents[9:17]
+    assert String("foo").size() is None
+
+
+def test_fingerprint(tmp_path):
+    path = tmp_path / "foo.csv"
+    path.write_text("A,B\n1,2\n")
+    source = LocalFile(str(path))
+    fingerprint = source.fingerprint()
+
+    assert source.fingerprint() == fingerprint
+    assert Chunk(source, 4, 4, 8).fingerprint() == fingerprint + ":4:8"
+    path.write_text("A,B\n1,2\n3,4\n")
+    assert source.fingerprint() != fingerprint
+
+    assert String("foo").fingerprint() == String("foo").fingerprint()
+    assert String("foo").fingerprint() != String("bar").fingerprint()
+
+
+def test_fingerprint_s3file():
+    bucket = stub(get_key=lambda key: stub(etag='"abc"'))
+    s3file = S3File("s3://some.bucket/some/s3/key.csv")
+    s3file.boto = stub(connect_s3=lambda: stub(get_bucket=lambda name: bucket))
+
+    assert s3file.fingerprint() == '"abc"'
+
+
+def test_base_class_fingerprint():
+    class LinesInput(VladInput):
+        def __init__(self):
+            pass
+
+    assert LinesInput().fingerprint() is None
+    assert Chunk(LinesInput(), 0, 0, 0).fingerprint() is None
 
 
 def test_repr_s3file():
@@ -105,6 +360,43 @@ def test_s3file_raises_when_no_boto():
         raise ImportError
 
     mock_boto(import_result)
+    s3file = S3File("s3://some.bucket/some/s3/key.csv")
 
     with pytest.raises(MissingExtraException):
-        S3File()
+        s3file.open()
+
+
+def test_stdin():
+    stream = io.BytesIO(b"Column A,Column B\nVlad,Vampire\n")
+    stdin = Stdin(stream)
+
+    assert stdin.read_head(4) == b"Colu"
+    assert stdin.read_head(10) == b"Column A,C"
+    assert stdin.codec() == ("utf-8", 0)
+    assert list(stdin.open()) == ["Column A,Column B\n", "Vlad,Vampire\n"]
+    assert stream.closed
+    with pytest.raises(ValueError):
+        stdin.open()
+    with pytest.raises(ValueError):
+        stdin.read_head(4)
+    assert stdin.size() is None
+    assert stdin.fingerprint() is None
+    assert repr(stdin) == "Stdin()"
+
+
+def test_stdin_defaults_to_standard_input(monkeypatch):
+    stream = io.BytesIO(b"\xef\xbb\xbfA,B\n\xe9,1\n")
+    monkeypatch.setattr("sys.stdin", stub(buffer=stream))
+    stdin = Stdin(encoding="latin-1")
+
+    assert stdin.stream is stream
+    assert list(stdin.open()) == ["\xef\xbb\xbfA,B\n", "\xe9,1\n"]
+
+
+def test_stdin_closes_the_stream_when_stopped():
+    stream = io.BytesIO(b"A\n" + b"1\n" * 10)
+    lines = Stdin(stream).open()
+
+    assert next(iter(lines)) == "A\n"
+    lines.close()
+    assert stream.closed
@@ -1,4 +1,7 @@
+import io
+import json
 import os
+import subprocess
 import sys
 import inspect
 
@@ -8,7 +11,7 @@ from pretend import stub, call, call_recorder
 from vladiate import exits
 from vladiate.examples import vladfile
 from vladiate.examples.vladfile import YourFirstFailingValidator
-from vladiate.inputs import String
+from vladiate.inputs import LocalFile, String
 from vladiate.main import (
     parse_args,
     is_vlad,
@@ -19,9 +22,31 @@ from vladiate.main import (
     run,
     _is_package,
 )
+from vladiate.validators import (
+    IntValidator,
+    MonotonicValidator,
+    NotEmptyValidator,
+    UniqueValidator,
+)
 from vladiate.vlad import Vlad
 
 
+def _summary(**kwargs):
+    summary = {
+        "vlad": "Something",
+        "source": "String('...')",
+        "input": "String",
+        "passed": None,
+        "rows": 3,
+        "bytes": 42,
+        "elapsed": 0.1,
+        "fetch_time": 0.01,
+        "failures": [{"validator": "EmptyValidator", "field": "Foo", "count": 1}],
+    }
+    summary.update(kwargs)
+    return summary
+
+
 def test_parse_args():
     options = parse_args()
 
@@ -87,7 +112,10 @@ def test_vladiate(monkeypatch):
 
     _vladiate(TestVlad)
 
-    assert put.calls == [call(validate_result)]
+    assert len(put.calls) == 1
+    summary = put.calls[0].args[0]
+    assert summary["vlad"] == "TestVlad"
+    assert summary["passed"] is validate_result
 
 
 def test_run(monkeypatch):
@@ -108,7 +136,11 @@ def test_run(monkeypatch):
 
 
 @pytest.mark.parametrize(
-    "get, expected", [(lambda: True, exits.OK), (lambda: False, exits.DATAERR)]
+    "get, expected",
+    [
+        (lambda: _summary(passed=True), exits.OK),
+        (lambda: _summary(passed=False), exits.DATAERR),
+    ],
 )
 def test_main_with_multiprocess(monkeypatch, get, expected):
     monkeypatch.setattr(
@@ -120,11 +152,25 @@ def test_main_with_multiprocess(monkeypatch, get, expected):
             vlads=["Something"],
             processes=2,
             quiet=False,
+            schema_only=False,
+            progress=None,
+            progress_interval=1.0,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
         ),
     )
     monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
-    vlad = call_recorder(lambda *args, **kwargs: stub(validate=lambda: stub()))
-    vlad.source = stub()
+    vlad = call_recorder(
+        lambda *args, **kwargs: stub(validate=lambda: stub(), summary=_summary)
+    )
+    vlad.source = stub(size=lambda: None)
 
     monkeypatch.setattr(
         "vladiate.main.load_vladfile",
@@ -132,17 +178,13 @@ def test_main_with_multiprocess(monkeypatch, get, expected):
     )
 
     Pool = call_recorder(
-        lambda *args, **kwargs: stub(map=lambda *args, **kwargs: stub())
+        lambda *args, **kwargs: stub(
+            map=lambda *args, **kwargs: stub(), close=lambda: None, join=lambda: None
+        )
     )
-    monkeypatch.setattr("vladiate.main.Pool", Pool)
+    monkeypatch.setattr("vladiate.main._pool", Pool)
 
-    def empty(calls=[]):
-        if calls:
-            return True
-        calls.append(None)
-        return False
-
-    result_queue = stub(get=get, empty=empty)
+    result_queue = stub(get=get)
     monkeypatch.setattr("vladiate.main.result_queue", result_queue)
 
     assert main() is expected
@@ -158,10 +200,24 @@ def test_main_with_vlads_in_args(monkeypatch):
             vlads=["Something"],
             processes=1,
             quiet=False,
+            schema_only=False,
+            progress=None,
+            progress_interval=1.0,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
         ),
     )
     monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
-    vlad = call_recorder(lambda *args, **kwargs: stub(validate=lambda: stub()))
+    vlad = call_recorder(
+        lambda *args, **kwargs: stub(validate=lambda: stub(), summary=_summary)
+    )
     vlad.source = stub()
 
     monkeypatch.setattr(
@@ -181,11 +237,25 @@ def test_main_no_vlads_in_args(monkeypatch):
             vlads=[],
             processes=1,
             quiet=False,
+            schema_only=False,
+            progress=None,
+            progress_interval=1.0,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
         ),
     )
     monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
 
-    vlad = call_recorder(lambda *args, **kwargs: stub(validate=lambda: stub()))
+    vlad = call_recorder(
+        lambda *args, **kwargs: stub(validate=lambda: stub(), summary=_summary)
+    )
     vlad.source = stub()
     monkeypatch.setattr(
         "vladiate.main.load_vladfile",
@@ -253,3 +323,457 @@ def test_main_no_vladfile(monkeypatch):
 )
 def test_is_package(path, expected):
     assert _is_package(path) == expected
+
+
+def test_main_schema_only(monkeypatch):
+    monkeypatch.setattr(
+        "vladiate.main.parse_args",
+        lambda: stub(
+            list_commands=False,
+            show_version=False,
+            vladfile=stub(),
+            vlads=["Something"],
+            processes=1,
+            quiet=False,
+            schema_only=True,
+            progress=None,
+            progress_interval=1.0,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
+        ),
+    )
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+    validate = call_recorder(lambda: True)
+    check_schema = call_recorder(lambda: False)
+    vlad = call_recorder(
+        lambda *args, **kwargs: stub(
+            validate=validate, check_schema=check_schema, summary=_summary
+        )
+    )
+    vlad.source = stub()
+
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {"Something": vlad}),
+    )
+    assert main() is exits.DATAERR
+    assert check_schema.calls == [call()]
+    assert validate.calls == []
+
+
+def test_main_with_multiprocess_progress(monkeypatch):
+    import queue
+
+    monkeypatch.setattr(
+        "vladiate.main.parse_args",
+        lambda: stub(
+            list_commands=False,
+            show_version=False,
+            vladfile=stub(),
+            vlads=["Something"],
+            processes=2,
+            quiet=False,
+            schema_only=False,
+            progress="json",
+            progress_interval=0,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
+        ),
+    )
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+    vlad = stub(source=stub(size=lambda: None))
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {"Something": vlad}),
+    )
+
+    progress_queue = queue.Queue()
+    result_queue = queue.Queue()
+    monkeypatch.setattr("vladiate.main.progress_queue", progress_queue)
+    monkeypatch.setattr("vladiate.main.result_queue", result_queue)
+
+    def fake_map(func, vlads, chunksize=None):
+        progress_queue.put(
+            {
+                "vlad": "Something",
+                "source": "...",
+                "rows": 10,
+                "bytes": 0,
+                "total_bytes": None,
+                "elapsed": 1.0,
+                "rows_per_sec": 10.0,
+                "eta": None,
+                "failures": {},
+                "done": True,
+            }
+        )
+        result_queue.put(_summary(passed=True))
+
+    monkeypatch.setattr(
+        "vladiate.main._pool",
+        lambda *args: stub(map=fake_map, close=lambda: None, join=lambda: None),
+    )
+    reports = []
+    monkeypatch.setattr("vladiate.main.make_reporter", lambda kind: reports.append)
+
+    assert main() is exits.OK
+    assert [report["rows"] for report in reports] == [10, 10]
+    assert reports[-1]["done"]
+
+
+def test_main_writes_metrics(monkeypatch, tmp_path):
+    metrics_file = tmp_path / "vladiate.prom"
+    monkeypatch.setattr(
+        "vladiate.main.parse_args",
+        lambda: stub(
+            list_commands=False,
+            show_version=False,
+            vladfile=stub(),
+            vlads=["Something"],
+            processes=1,
+            quiet=False,
+            schema_only=False,
+            progress=None,
+            progress_interval=1.0,
+            metrics_file=str(metrics_file),
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
+        ),
+    )
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+
+    class Something(Vlad):
+        source = String("Foo\n1\n2")
+        validators = {"Foo": []}
+
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {"Something": Something}),
+    )
+
+    assert main() is exits.DATAERR
+    text = metrics_file.read_text()
+    assert 'vladiate_validations_total{result="failed",vlad="Something"} 1' in text
+    assert 'vladiate_rows_processed_total{vlad="Something"} 2' in text
+    assert (
+        'vladiate_validator_failures_total{field="Foo",validator="EmptyValidator",'
+        'vlad="Something"} 2'
+    ) in text
+
+
+def test_import_is_lazy():
+    # Heavy modules are only imported by the code paths which need them
+    modules = [
+        "multiprocessing",
+        "importlib.metadata",
+        "http.server",
+        "boto",
+        "concurrent.futures",
+        "glob",
+        "hashlib",
+        "mmap",
+        "pickle",
+        "random",
+        "tempfile",
+        "zlib",
+        "vladiate.index",
+        "vladiate.sampling",
+        "vladiate.structure",
+    ]
+    code = "import sys, vladiate.main; print([m for m in {!r} if m in sys.modules])"
+    output = subprocess.check_output([sys.executable, "-c", code.format(modules)])
+
+    assert output.strip() == b"[]"
+
+
+def test_main_with_sources(monkeypatch, tmp_path):
+    good = tmp_path / "good.csv"
+    good.write_text("Foo\n\n")
+    bad = tmp_path / "bad.csv"
+    bad.write_text("Foo\n1\n")
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("{}\n{}\n".format(good, bad))
+    arguments = dict(
+        list_commands=False,
+        show_version=False,
+        vladfile=stub(),
+        vlads=["Something"],
+        processes=1,
+        quiet=True,
+        metrics_file=None,
+        metrics_port=None,
+        worker=None,
+        coordinator=None,
+        sources=str(manifest),
+        serve=None,
+        stdin=False,
+        fail_fast=False,
+        history=None,
+    )
+    monkeypatch.setattr("vladiate.main.parse_args", lambda: stub(**arguments))
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+
+    class Something(Vlad):
+        source = String("Foo\n1")
+        validators = {"Foo": []}
+
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {"Something": Something}),
+    )
+
+    assert main() is exits.DATAERR
+
+    manifest.write_text("{}\n".format(good))
+    assert main() is exits.OK
+
+    arguments["sources"] = str(tmp_path / "*.txt.csv")
+    assert main() is exits.NOINPUT
+
+
+def test_main_with_stdin(monkeypatch):
+    arguments = dict(
+        list_commands=False,
+        show_version=False,
+        vladfile=stub(),
+        vlads=["Something"],
+        processes=1,
+        quiet=True,
+        progress=None,
+        progress_interval=1.0,
+        schema_only=False,
+        metrics_file=None,
+        metrics_port=None,
+        worker=None,
+        coordinator=None,
+        sources=None,
+        serve=None,
+        stdin=True,
+        fail_fast=True,
+        history=None,
+    )
+    monkeypatch.setattr("vladiate.main.parse_args", lambda: stub(**arguments))
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+
+    class Something(Vlad):
+        source = String("Foo\n")
+        validators = {"Foo": [IntValidator()]}
+
+    class SomethingElse(Something):
+        pass
+
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (
+            None,
+            {"Something": Something, "SomethingElse": SomethingElse},
+        ),
+    )
+
+    monkeypatch.setattr("sys.stdin", stub(buffer=io.BytesIO(b"Foo\n1\n2\n")))
+    assert main() is exits.OK
+
+    monkeypatch.setattr("sys.stdin", stub(buffer=io.BytesIO(b"Foo\n1\nx\n3\n")))
+    assert main() is exits.DATAERR
+
+    arguments["vlads"] = []
+    assert main() is exits.UNAVAILABLE
+
+
+class Numbers(Vlad):
+    source = None
+    validators = {"Foo": [UniqueValidator()]}
+
+
+def test_main_splits_large_sources(monkeypatch, tmp_path):
+    path = tmp_path / "numbers.csv"
+    # The duplicate is in another chunk than the original
+    path.write_text("Foo\n" + "".join("{}\n".format(i) for i in range(3000)) + "5\n")
+    history = tmp_path / "history.json"
+    arguments = dict(
+        list_commands=False,
+        show_version=False,
+        vladfile=stub(),
+        vlads=["Numbers"],
+        processes="auto",
+        quiet=True,
+        progress=None,
+        progress_interval=1.0,
+        schema_only=False,
+        metrics_file=None,
+        metrics_port=None,
+        worker=None,
+        coordinator=None,
+        sources=None,
+        serve=None,
+        stdin=False,
+        fail_fast=False,
+        history=str(history),
+    )
+    monkeypatch.setattr("vladiate.main.parse_args", lambda: stub(**arguments))
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+    monkeypatch.setattr("vladiate.scheduling.MIN_CHUNK_SIZE", 1024)
+    monkeypatch.setattr("vladiate.scheduling.auto_processes", lambda: 3)
+
+    # The chunks are validated in other processes, which need to find the class
+    monkeypatch.setattr(Numbers, "source", LocalFile(str(path)))
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {"Numbers": Numbers}),
+    )
+
+    assert main() is exits.DATAERR
+    entries = json.loads(history.read_text())
+    entry = entries["Numbers LocalFile('{}')".format(path)]
+    # Each of the 3 chunks was read with the header
+    assert entry["bytes"] == path.stat().st_size + 2 * len("Foo\n")
+    assert entry["seconds"] > 0
+
+
+class Increasing(Vlad):
+    source = None
+    validators = {"Foo": [UniqueValidator()]}
+    row_validators = [MonotonicValidator("Foo", strict=True, parser=int)]
+
+
+class Notes(Vlad):
+    source = None
+    validators = {
+        "Foo": [IntValidator(), UniqueValidator()],
+        "Note": [NotEmptyValidator()],
+    }
+
+
+@pytest.mark.parametrize(
+    "vlad, rows",
+    [
+        # Enough unique values for the state of a chunk not to fit in a pipe
+        (Increasing, ["{}\n".format(i) for i in range(40000)]),
+        # Chunks don't start inside quoted fields
+        (Notes, ['{},"a\nnote"\n'.format(i) for i in range(5000)]),
+    ],
+)
+def test_main_validates_chunks_like_whole_sources(monkeypatch, tmp_path, vlad, rows):
+    path = tmp_path / "source.csv"
+    header = "Foo,Note\n" if vlad is Notes else "Foo\n"
+    path.write_text(header + "".join(rows))
+    monkeypatch.setattr(
+        "vladiate.main.parse_args",
+        lambda: stub(
+            list_commands=False,
+            show_version=False,
+            vladfile=stub(),
+            vlads=[vlad.__name__],
+            processes=4,
+            quiet=True,
+            progress=None,
+            progress_interval=1.0,
+            schema_only=False,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=False,
+            history=None,
+        ),
+    )
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+    monkeypatch.setattr("vladiate.scheduling.MIN_CHUNK_SIZE", 16 * 1024)
+    monkeypatch.setattr(vlad, "source", LocalFile(str(path)))
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {vlad.__name__: vlad}),
+    )
+
+    assert main() is exits.OK
+
+
+class Integers(Vlad):
+    source = None
+    validators = {"Foo": [IntValidator()]}
+
+
+def test_main_fails_chunks_fast(monkeypatch, capsys, tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_text("Foo\n" + "x\n" * 40000)
+    monkeypatch.setattr(
+        "vladiate.main.parse_args",
+        lambda: stub(
+            list_commands=False,
+            show_version=False,
+            vladfile=stub(),
+            vlads=["Integers"],
+            processes=4,
+            quiet=True,
+            progress="json",
+            progress_interval=1.0,
+            schema_only=False,
+            metrics_file=None,
+            metrics_port=None,
+            worker=None,
+            coordinator=None,
+            sources=None,
+            serve=None,
+            stdin=False,
+            fail_fast=True,
+            history=None,
+        ),
+    )
+    monkeypatch.setattr("vladiate.main.find_vladfile", lambda *args, **kwargs: stub())
+    monkeypatch.setattr("vladiate.scheduling.MIN_CHUNK_SIZE", 16 * 1024)
+    monkeypatch.setattr(Integers, "source", LocalFile(str(path)))
+    monkeypatch.setattr(
+        "vladiate.main.load_vladfile",
+        lambda *args, **kwargs: (None, {"Integers": Integers}),
+    )
+
+    assert main() is exits.DATAERR
+    snapshots = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    # The progress of every chunk is reported, and each one stopped at its
+    # first invalid row
+    assert snapshots[-1]["done"]
+    assert snapshots[-1]["vlad"] == "4 vlad(s)"
+    assert snapshots[-1]["rows"] == 4
+
+
+@pytest.mark.parametrize("value, expected", [("4", 4), ("auto", "auto")])
+def test_processes_argument(monkeypatch, value, expected):
+    monkeypatch.setattr("sys.argv", ["vladiate", "-p", value])
+    assert parse_args().processes == expected
+
+
+@pytest.mark.parametrize(
+    "option", [["--schema-only"], ["--progress"], ["--history", "history.json"]]
+)
+def test_sources_rejects_options(monkeypatch, capsys, option):
+    monkeypatch.setattr("sys.argv", ["vladiate", "--sources", "manifest.txt"] + option)
+
+    with pytest.raises(SystemExit) as excinfo:
+        parse_args()
+    assert excinfo.value.code == 2
+    assert "{} can't be used with --sources".format(option[0]) in (
+        capsys.readouterr().err
+    )
@@ -0,0 +1,96 @@
+from urllib.request import urlopen
+
+from vladiate.inputs import String
+from vladiate.metrics import (
+    CONTENT_TYPE,
+    Counter,
+    Histogram,
+    Registry,
+    serve,
+    write_textfile,
+)
+from vladiate.validators import EmptyValidator, RowLengthValidator
+from vladiate.vlad import Vlad
+
+
+def test_counter():
+    counter = Counter("things_total", "Things.")
+    counter.inc(vlad="A")
+    counter.inc(2, vlad="A")
+    counter.inc(vlad='"B"\n')
+
+    assert counter.render() == [
+        "# HELP things_total Things.",
+        "# TYPE things_total counter",
+        'things_total{vlad="\\"B\\"\\n"} 1',
+        'things_total{vlad="A"} 3',
+    ]
+
+
+def test_histogram():
+    histogram = Histogram("took_seconds", "Time.", buckets=(1, 5))
+    histogram.observe(0.5, vlad="A")
+    histogram.observe(3.0, vlad="A")
+    histogram.observe(10.0, vlad="A")
+
+    assert histogram.render() == [
+        "# HELP took_seconds Time.",
+        "# TYPE took_seconds histogram",
+        'took_seconds_bucket{vlad="A",le="1"} 1',
+        'took_seconds_bucket{vlad="A",le="5"} 2',
+        'took_seconds_bucket{vlad="A",le="+Inf"} 3',
+        'took_seconds_sum{vlad="A"} 13.5',
+        'took_seconds_count{vlad="A"} 3',
+    ]
+
+
+def _registry():
+    vlad = Vlad(
+        source=String("Foo,Bar\n1,\n,"),
+        validators={"Foo": [EmptyValidator()], "Bar": []},
+        row_validators=[RowLengthValidator()],
+        quiet=True,
+    )
+    vlad.validate()
+    registry = Registry()
+    registry.record(vlad.summary())
+    return registry
+
+
+def test_registry_record():
+    text = _registry().render()
+
+    assert 'vladiate_validations_total{result="failed",vlad="Vlad"} 1' in text
+    assert 'vladiate_rows_processed_total{vlad="Vlad"} 2' in text
+    assert 'vladiate_bytes_read_total{vlad="Vlad"} 12' in text
+    assert (
+        'vladiate_validator_failures_total{field="Foo",validator="EmptyValidator",'
+        'vlad="Vlad"} 1'
+    ) in text
+    assert (
+        'vladiate_validator_failures_total{field="",validator="RowLengthValidator",'
+        'vlad="Vlad"} 0'
+    ) in text
+    assert 'vladiate_validation_seconds_count{vlad="Vlad"} 1' in text
+    assert 'vladiate_input_fetch_seconds_count{input="String",vlad="Vlad"} 1' in text
+
+
+def test_write_textfile(tmp_path):
+    path = tmp_path / "vladiate.prom"
+    registry = _registry()
+
+    write_textfile(registry, str(path))
+
+    assert path.read_text() == registry.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["vladiate.prom"]
+
+
+def test_serve():
+    registry = _registry()
+    server = serve(registry, 0)
+    try:
+        response = urlopen("http://127.0.0.1:{}/metrics".format(server.server_port))
+        assert response.headers["Content-Type"] == CONTENT_TYPE
+        assert response.read().decode("utf-8") == registry.render()
+    finally:
+        server.shutdown()
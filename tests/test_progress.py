@@ -0,0 +1,207 @@
+import io
+import json
+
+import pytest
+
+from vladiate.exceptions import MissingExtraException
+from vladiate.inputs import LocalFile, String
+from vladiate.progress import (
+    Aggregator,
+    JSONReporter,
+    Progress,
+    QueueReporter,
+    TerminalReporter,
+    failure_counts,
+    format_snapshot,
+    make_reporter,
+)
+from vladiate.validators import EmptyValidator, RowLengthValidator, UniqueValidator
+from vladiate.vlad import Vlad
+
+
+def _snapshot(**kwargs):
+    snapshot = {
+        "vlad": "TestVlad",
+        "source": "String('...')",
+        "rows": 1000,
+        "bytes": 2000,
+        "total_bytes": 8000,
+        "elapsed": 2.0,
+        "rows_per_sec": 500.0,
+        "eta": 6.0,
+        "failures": {"EmptyValidator on field: 'Foo'": 3},
+        "done": False,
+    }
+    snapshot.update(kwargs)
+    return snapshot
+
+
+def test_validate_reports_progress():
+    snapshots = []
+    source = LocalFile("vladiate/examples/vampires.csv")
+    validators = {"Column A": [UniqueValidator()], "Column B": [EmptyValidator()]}
+    vlad = Vlad(
+        source=source,
+        validators=validators,
+        progress=snapshots.append,
+        progress_interval=0,
+    )
+
+    assert not vlad.validate()
+
+    snapshot = snapshots[-1]
+    assert snapshot["done"]
+    assert snapshot["vlad"] == "Vlad"
+    assert snapshot["rows"] == 3
+    assert snapshot["bytes"] == snapshot["total_bytes"] == source.size()
+    assert snapshot["eta"] is None
+    assert snapshot["failures"] == {
+        "UniqueValidator on field: 'Column A'": 0,
+        "EmptyValidator on field: 'Column B'": 3,
+    }
+
+
+def test_progress_counts_bytes_of_the_source(tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_bytes(("Name\n" + "Élisabeth\n" * 1000).encode("utf-16"))
+    snapshots = []
+    vlad = Vlad(
+        source=LocalFile(str(path)),
+        validators={"Name": [UniqueValidator()]},
+        progress=snapshots.append,
+        progress_interval=0,
+    )
+
+    assert not vlad.validate()
+    assert snapshots[-1]["bytes"] == snapshots[-1]["total_bytes"] == path.stat().st_size
+
+
+@pytest.mark.parametrize(
+    "error", [NotImplementedError, OSError, MissingExtraException()]
+)
+def test_progress_of_sources_of_unknown_size(error):
+    def size():
+        raise error
+
+    vlad = Vlad(source=String("Foo\n"), validators={"Foo": []})
+    vlad.source.size = size
+    assert Progress(vlad, lambda snapshot: None).total_bytes is None
+
+
+def test_progress_is_rate_limited():
+    snapshots = []
+    vlad = Vlad(source=String("Foo\n" + "\n" * 10), validators={"Foo": []})
+    progress = Progress(vlad, snapshots.append, interval=0)
+    progress.update()
+    assert len(snapshots) == 1
+
+    progress = Progress(vlad, snapshots.append, interval=60)
+    progress.update()
+    assert len(snapshots) == 1
+    progress.finish()
+    assert len(snapshots) == 2
+    assert snapshots[-1]["total_bytes"] is None
+
+
+def test_progress_eta():
+    vlad = Vlad(source=LocalFile("vladiate/examples/vampires.csv"), validators={})
+    progress = Progress(vlad, lambda snapshot: None)
+    vlad.bytes_read, progress.total_bytes = 1000, 4000
+
+    snapshot = progress.snapshot(progress.started + 10)
+
+    assert snapshot["elapsed"] == 10
+    assert snapshot["eta"] == pytest.approx(30)
+
+
+def test_failure_counts():
+    row_validator = RowLengthValidator()
+    row_validator.fail_count = 2
+    vlad = Vlad(
+        source=String("Foo"),
+        validators={"Foo": [EmptyValidator()]},
+        row_validators=[row_validator],
+    )
+    assert failure_counts(vlad) == {
+        "RowLengthValidator": 2,
+        "EmptyValidator on field: 'Foo'": 0,
+    }
+
+
+@pytest.mark.parametrize(
+    "snapshot, expected",
+    [
+        (
+            _snapshot(),
+            "TestVlad: 1,000 rows, 2.0 KB of 8.0 KB (25.0%), 500 rows/s, "
+            "3 failures, ETA 0:00:06",
+        ),
+        (
+            _snapshot(bytes=0, total_bytes=None, eta=None),
+            "TestVlad: 1,000 rows, 500 rows/s, 3 failures",
+        ),
+        (
+            _snapshot(eta=None, done=True, elapsed=3725),
+            "TestVlad: 1,000 rows, 2.0 KB of 8.0 KB (25.0%), 500 rows/s, "
+            "3 failures, done in 1:02:05",
+        ),
+    ],
+)
+def test_format_snapshot(snapshot, expected):
+    assert format_snapshot(snapshot) == expected
+
+
+def test_terminal_reporter():
+    stream = io.StringIO()
+    reporter = TerminalReporter(stream)
+    reporter(_snapshot())
+    reporter(_snapshot(done=True))
+
+    lines = stream.getvalue().split("\r\033[K")
+    assert lines[1].startswith("TestVlad: 1,000 rows")
+    assert lines[2].endswith("\n")
+
+
+def test_json_reporter():
+    stream = io.StringIO()
+    JSONReporter(stream)(_snapshot())
+    assert json.loads(stream.getvalue()) == _snapshot()
+
+
+def test_queue_reporter():
+    queue = []
+    QueueReporter(type("Queue", (), {"put": queue.append})())(_snapshot())
+    assert queue == [_snapshot()]
+
+
+def test_aggregator():
+    reports = []
+    aggregator = Aggregator(reports.append, interval=0)
+    aggregator(_snapshot(vlad="A"))
+    aggregator(_snapshot(vlad="B", rows=3000, elapsed=3.0))
+    aggregator(_snapshot(vlad="A", rows=2000, bytes=4000, done=True))
+
+    combined = reports[-1]
+    assert combined["vlad"] == "2 vlad(s)"
+    assert combined["rows"] == 5000
+    assert combined["bytes"] == 6000
+    assert combined["total_bytes"] == 16000
+    assert combined["elapsed"] == 3.0
+    assert combined["eta"] == pytest.approx(5.0)
+    assert combined["failures"] == {
+        "A: EmptyValidator on field: 'Foo'": 3,
+        "B: EmptyValidator on field: 'Foo'": 3,
+    }
+    assert not combined["done"]
+
+    aggregator(_snapshot(vlad="B", total_bytes=None, done=True))
+    aggregator.finish()
+    assert reports[-1]["done"]
+    assert reports[-1]["total_bytes"] is None
+
+
+def test_make_reporter():
+    assert isinstance(make_reporter("terminal"), TerminalReporter)
+    assert isinstance(make_reporter("json"), JSONReporter)
+    with pytest.raises(ValueError):
+        make_reporter("nope")
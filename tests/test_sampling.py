@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+from vladiate.inputs import LocalFile
+from vladiate.sampling import (
+    RANDOM,
+    STRATIFIED,
+    reservoir_sample,
+    sample_offsets,
+    seek_sample,
+    to_row,
+    wilson_interval,
+)
+
+
+@pytest.mark.parametrize(
+    "failures, total, expected",
+    [
+        (0, 0, (0.0, 1.0)),
+        (0, 100, (0.0, 0.037)),
+        (50, 100, (0.404, 0.596)),
+        (100, 100, (0.963, 1.0)),
+    ],
+)
+def test_wilson_interval(failures, total, expected):
+    low, high = wilson_interval(failures, total)
+    assert low == pytest.approx(expected[0], abs=0.001)
+    assert high == pytest.approx(expected[1], abs=0.001)
+
+
+def test_wilson_interval_narrows_with_confidence():
+    low_90, high_90 = wilson_interval(10, 100, confidence=0.9)
+    low_99, high_99 = wilson_interval(10, 100, confidence=0.99)
+    assert low_99 < low_90 < 0.1 < high_90 < high_99
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        (["1", "2"], {"A": "1", "B": "2"}),
+        (["1"], {"A": "1", "B": None}),
+        (["1", "2", "3"], {"A": "1", "B": "2", None: ["3"]}),
+    ],
+)
+def test_to_row(values, expected):
+    assert to_row(["A", "B"], values) == expected
+
+
+def test_sample_offsets_stratified():
+    offsets = sample_offsets(100, 1100, 10, STRATIFIED, random.Random(0))
+    assert [offset // 100 for offset in offsets] == list(range(1, 11))
+
+
+def test_sample_offsets_random():
+    offsets = sample_offsets(100, 1100, 10, RANDOM, random.Random(0))
+    assert offsets == sorted(offsets)
+    assert all(100 <= offset < 1100 for offset in offsets)
+
+
+def test_sample_offsets_unknown_method():
+    with pytest.raises(ValueError):
+        sample_offsets(0, 10, 1, "nope", random.Random(0))
+
+
+@pytest.mark.parametrize("method", [RANDOM, STRATIFIED])
+def test_seek_sample(tmp_path, method):
+    path = tmp_path / "numbers.csv"
+    header = "Number,Square\n"
+    path.write_text(header + "".join("{},{}\n".format(i, i * i) for i in range(5000)))
+
+    rows = seek_sample(
+        LocalFile(str(path)),
+        ["Number", "Square"],
+        len(header),
+        50,
+        method,
+        random.Random(1),
+        {"delimiter": ","},
+    )
+
+    assert 0 < len(rows) <= 50
+    for row in rows:
+        assert int(row["Number"]) ** 2 == int(row["Square"])
+
+
+def test_seek_sample_picks_the_first_row(tmp_path):
+    path = tmp_path / "numbers.csv"
+    header = "Number,{}\n".format("Note" * 25)
+    path.write_text(header + "".join("{},{}\n".format(i, "x" * 100) for i in range(10)))
+
+    rows = seek_sample(
+        LocalFile(str(path)),
+        ["Number", "Note" * 25],
+        len(header),
+        100,
+        RANDOM,
+        random.Random(0),
+        {"delimiter": ","},
+    )
+
+    # Each row is picked once, the first one too
+    assert sorted(int(row["Number"]) for row in rows) == list(range(10))
+
+
+def test_seek_sample_empty(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("Number\n")
+    source = LocalFile(str(path))
+    assert seek_sample(source, ["Number"], 7, 10, RANDOM, random.Random(), {}) == []
+
+
+def test_reservoir_sample():
+    sample = reservoir_sample(iter(range(1000)), 10, random.Random(0))
+    assert len(sample) == 10
+    assert len(set(sample)) == 10
+    assert reservoir_sample(iter(range(3)), 10, random.Random(0)) == [0, 1, 2]
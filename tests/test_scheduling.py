@@ -0,0 +1,135 @@
+import json
+import math
+
+import pytest
+from pretend import stub
+
+from vladiate import scheduling
+from vladiate.inputs import LocalFile, String
+from vladiate.scheduling import History, auto_processes, schedule
+from vladiate.validators import IntValidator, UniqueValidator
+from vladiate.vlad import Vlad
+
+
+@pytest.mark.parametrize(
+    "cpus, memory, expected",
+    [(8, None, 8), (8, 1024**3, 4), (8, 10**6, 1), (2, 64 * 1024**3, 2)],
+)
+def test_auto_processes(monkeypatch, cpus, memory, expected):
+    monkeypatch.setattr("vladiate.scheduling.cpu_count", lambda: cpus)
+    monkeypatch.setattr("vladiate.scheduling.available_memory", lambda: memory)
+    assert auto_processes() == expected
+
+
+def test_available_memory():
+    memory = scheduling.available_memory()
+    assert memory is None or memory > 0
+    assert scheduling.cpu_count() >= 1
+
+
+def test_history(tmp_path):
+    path = str(tmp_path / "history.json")
+    history = History(path)
+    assert history.throughput() == scheduling.DEFAULT_THROUGHPUT
+    assert history.estimate("Vampires", String("...")) is None
+
+    source = LocalFile("vampires.csv")
+    history.record(
+        {"vlad": "Vampires", "source": repr(source), "elapsed": 2.0, "bytes": 400}
+    )
+    history.save()
+
+    history = History(path)
+    assert history.estimate("Vampires", source) == 2.0
+    assert history.throughput() == 200
+    assert history.estimate("Bats", LocalFile("bats.csv"), size=1000) == 5.0
+    with open(path) as f:
+        assert json.load(f) == {
+            "Vampires LocalFile('vampires.csv')": {"seconds": 2.0, "bytes": 400}
+        }
+
+
+def test_history_corrupt(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text("{")
+    assert History(str(path)).entries == {}
+
+
+def _vlad(name, size):
+    return type(
+        name,
+        (Vlad,),
+        {"source": stub(size=lambda: size), "validators": {}},
+    )
+
+
+def test_schedule_longest_first():
+    vlads = {
+        "Small": _vlad("Small", 10),
+        "Large": _vlad("Large", 1000),
+        "Unknown": _vlad("Unknown", None),
+        "Medium": _vlad("Medium", 100),
+    }
+    assert schedule(vlads, 2) == [
+        vlads["Large"],
+        vlads["Unknown"],
+        vlads["Medium"],
+        vlads["Small"],
+    ]
+
+    # How long a validation took last time beats its size
+    history = History()
+    history.entries[History.key("Small", repr(vlads["Small"].source))] = {
+        "seconds": 60.0,
+        "bytes": 10**6,
+    }
+    assert schedule(vlads, 2, history)[0] is vlads["Small"]
+
+
+@pytest.fixture
+def numbers(tmp_path):
+    path = tmp_path / "numbers.csv"
+    path.write_text("Number\n" + "".join("{}\n".format(i) for i in range(3000)))
+
+    class Numbers(Vlad):
+        source = LocalFile(str(path))
+        validators = {"Number": [IntValidator(), UniqueValidator()]}
+
+    return Numbers
+
+
+def test_schedule_splits_large_sources(monkeypatch, numbers):
+    monkeypatch.setattr("vladiate.scheduling.MIN_CHUNK_SIZE", 1024)
+    small = _vlad("Small", 10)
+    jobs = schedule({"Numbers": numbers, "Small": small}, 4)
+
+    chunks = [job for job in jobs if isinstance(job, tuple)]
+    assert len(chunks) == 4
+    assert jobs[-1] is small
+    tasks = sorted((task for _, task in chunks), key=lambda task: task["start"])
+    assert tasks[0]["start"] == tasks[0]["header_end"] == len("Number\n")
+    assert all(a["end"] == b["start"] for a, b in zip(tasks, tasks[1:]))
+    assert tasks[-1]["end"] == numbers.source.size()
+
+    assert schedule({"Numbers": numbers}, 1) == [numbers]
+    assert schedule({"Numbers": numbers}, 4, split=False) == [numbers]
+
+
+def test_schedule_scans_with_map(monkeypatch, numbers):
+    monkeypatch.setattr("vladiate.scheduling.MIN_CHUNK_SIZE", 1024)
+    mapped = []
+
+    def recording_map(function, jobs):
+        mapped.append(jobs)
+        return map(function, jobs)
+
+    jobs = schedule(
+        {"Numbers": numbers, "Small": _vlad("Small", 10)}, 4, map=recording_map
+    )
+    # Only the large source is scanned, in a single call
+    assert mapped == [[(numbers, math.ceil(numbers.source.size() / 4))]]
+    assert len([job for job in jobs if isinstance(job, tuple)]) == 4
+
+    mapped = []
+    schedule({"Small": _vlad("Small", 10)}, 4, map=recording_map)
+    assert mapped == []
@@ -0,0 +1,162 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from vladiate.inputs import LocalFile
+from vladiate.server import Server, parse_address
+from vladiate.validators import SetValidator, UniqueValidator
+from vladiate.vlad import Vlad
+
+
+class Vampires(Vlad):
+    source = LocalFile("vladiate/examples/vampires.csv")
+    validators = {
+        "Column A": [UniqueValidator()],
+        "Column B": [SetValidator(["Vampire", "Not A Vampire"])],
+    }
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        http.client.HTTPConnection.__init__(self, "localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def serve(address=("127.0.0.1", 0), **kwargs):
+        server = Server({"Vampires": Vampires.compile()}, address, quiet=True, **kwargs)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        servers.append((server, thread))
+        if isinstance(server.address, str):
+            return server, lambda: _UnixConnection(server.address)
+        return server, lambda: http.client.HTTPConnection(*server.address)
+
+    yield serve
+    for server, thread in servers:
+        server.shutdown()
+        thread.join()
+
+
+def _request(connection, method, path, body=None):
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [("unix:/run/vladiate.sock", "/run/vladiate.sock"), (":1234", ("127.0.0.1", 1234))],
+)
+def test_parse_address(address, expected):
+    assert parse_address(address) == expected
+
+
+def test_validate_path(serve):
+    _, connect = serve()
+    connection = connect()
+
+    status, summary = _request(
+        connection,
+        "POST",
+        "/validate?vlad=Vampires&path=vladiate/examples/vampires.csv",
+    )
+    assert status == 200
+    assert summary["passed"]
+    assert summary["rows"] == 3
+
+    # The connection is kept alive, and validators aren't shared between jobs
+    status, summary = _request(
+        connection,
+        "POST",
+        "/validate?vlad=Vampires&path=vladiate/examples/vampires.csv",
+    )
+    assert status == 200
+    assert summary["passed"]
+
+
+def test_validate_body(serve, tmp_path):
+    _, connect = serve(str(tmp_path / "vladiate.sock"))
+    body = b"Column A,Column B\nVlad,Vampire\nVlad,Maybe A Vampire\n"
+
+    status, summary = _request(connect(), "POST", "/validate?vlad=Vampires", body)
+    assert status == 200
+    assert not summary["passed"]
+    assert summary["source"] == "request body"
+    assert summary["failures"] == [
+        {"validator": "UniqueValidator", "field": "Column A", "count": 1},
+        {"validator": "SetValidator", "field": "Column B", "count": 1},
+    ]
+
+    connection = connect()
+    connection.request("GET", "/metrics")
+    metrics = connection.getresponse().read().decode("utf-8")
+    assert 'vladiate_validations_total{result="failed",vlad="Vampires"} 1' in metrics
+
+
+@pytest.mark.parametrize(
+    "method, path, body, status",
+    [
+        ("GET", "/vlads", None, 200),
+        ("GET", "/nothing", None, 404),
+        ("POST", "/validate?vlad=Bats&path=bats.csv", None, 404),
+        ("POST", "/validate?vlad=Vampires", None, 400),
+        ("POST", "/validate?vlad=Vampires", b"x" * 100, 413),
+        ("POST", "/validate?vlad=Vampires&path=missing.csv", None, 200),
+    ],
+)
+def test_requests(serve, method, path, body, status):
+    _, connect = serve(max_body_size=10)
+    response_status, response = _request(connect(), method, path, body)
+    assert response_status == status
+    if path == "/vlads":
+        assert response == {"vlads": ["Vampires"]}
+    elif status == 200:
+        assert not response["passed"]
+        assert response["error"].startswith("FileNotFoundError")
+
+
+def test_backpressure(serve):
+    server, connect = serve(max_queue=0)
+    with server.slot() as acquired:
+        assert acquired
+        connection = connect()
+        status, response = _request(
+            connection, "POST", "/validate?vlad=Vampires&path=vampires.csv"
+        )
+        assert status == 503
+        assert response == {"error": "Too many jobs waiting"}
+        assert connection.sock is not None
+    with server.slot() as acquired:
+        assert acquired
+
+
+def test_replaces_stale_socket(serve, tmp_path):
+    path = str(tmp_path / "vladiate.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    _, connect = serve(path)
+    status, _ = _request(connect(), "GET", "/vlads")
+    assert status == 200
+
+
+def test_refuses_to_replace_other_files(tmp_path):
+    path = tmp_path / "vladiate.sock"
+    path.write_text("Not a socket")
+
+    with pytest.raises(ValueError, match="isn't a socket"):
+        Server({"Vampires": Vampires.compile()}, str(path), quiet=True)
+    assert path.read_text() == "Not a socket"
@@ -0,0 +1,143 @@
+import csv
+
+import pytest
+
+from vladiate.inputs import LocalFile, String, VladInput
+from vladiate import structure
+from vladiate.structure import scan
+
+
+class BytesInput(VladInput):
+    """An input which supports `read_range`, but isn't a `LocalFile`"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def size(self):
+        return len(self.data)
+
+    def read_range(self, start, end):
+        return self.data[start:end]
+
+
+CSV = (
+    b"Name,Note\r\n"
+    b"Dracula,Vampire\r\n"
+    b"\r\n"
+    b'"Vlad, the third","Impaler\r\nof Wallachia"\r\n'
+    b'"Quoted ""twice""",x\r\n'
+    b"Van Helsing,Hunter\r\n"
+)
+
+
+@pytest.fixture(params=["local", "range", "lines"])
+def make_source(request, tmp_path):
+    def make(data):
+        if request.param == "local":
+            path = tmp_path / "source.csv"
+            path.write_bytes(data)
+            return LocalFile(str(path))
+        if request.param == "range":
+            return BytesInput(data)
+        return String(data.decode("utf-8", "replace"))
+
+    return make
+
+
+@pytest.mark.parametrize("block_size", [7, 1024])
+def test_scan(monkeypatch, make_source, block_size):
+    monkeypatch.setattr(structure, "BLOCK_SIZE", block_size)
+
+    result = scan(make_source(CSV))
+
+    assert result.passed
+    assert result.fieldnames == ["Name", "Note"]
+    assert result.header_end == len(b"Name,Note\r\n")
+    assert result.rows == 4
+    assert result.errors == []
+
+
+@pytest.mark.parametrize(
+    "data, errors",
+    [
+        (
+            b"a,b\n1,2,3\n4\n5,6\n",
+            [(2, "Expected 2 fields, got 3"), (3, "Expected 2 fields, got 1")],
+        ),
+        (b'a,b\n"1,2\n3,4\n', [(2, "Unterminated quoted field")]),
+        (b'a,b\n"1"2,3\n', [(2, "Malformed record: ',' expected after '\"'")]),
+        (b'a,b\n"1\n2",3,4\n', [(2, "Expected 2 fields, got 3")]),
+        (b"a,b\n1,\xff\n2,3\n", [(2, "Invalid UTF-8: invalid start byte")]),
+    ],
+)
+def test_scan_finds_errors(data, errors, tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_bytes(data)
+
+    result = scan(LocalFile(str(path)))
+
+    assert not result.passed
+    assert result.errors == errors
+    assert result.error_count == len(errors)
+
+
+def test_scan_caps_errors():
+    result = scan(String("a,b\n" + "1\n" * 10), max_errors=3)
+
+    assert len(result.errors) == 3
+    assert result.error_count == 10
+
+
+def test_scan_dialect():
+    assert scan(String("a;b\n'1;2';3\n"), {"delimiter": ";", "quotechar": "'"}).passed
+    # Quotes don't start quoted fields unless the dialect quotes
+    assert scan(String('a,b\n"1,2\n'), {"quoting": csv.QUOTE_NONE}).passed
+    assert not scan(String('a,b\n"1,2\n')).passed
+    # Nor do they in the middle of a field
+    assert scan(String('a,b\n5" screen,x\n6,"y"\n')).passed
+    assert scan(String('a,b\n\\"1,2\n'), {"escapechar": "\\"}).passed
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-16", "cp1252"])
+def test_scan_encodings(tmp_path, encoding):
+    path = tmp_path / "source.csv"
+    path.write_bytes('Name,Note\n"Élisabeth",x\nZoë,y\n'.encode(encoding))
+    source = LocalFile(str(path), encoding=None if "utf" in encoding else encoding)
+
+    result = scan(source)
+
+    assert result.passed
+    assert result.fieldnames == ["Name", "Note"]
+    assert result.rows == 2
+    assert not scan(LocalFile(str(path), encoding="ascii")).passed
+
+
+def test_scan_empty_source():
+    result = scan(String(""))
+
+    assert not result.passed
+    assert result.fieldnames is None
+    assert result.error_count == 0
+
+
+@pytest.mark.parametrize("block_size", [16, 1024])
+def test_chunks(monkeypatch, tmp_path, block_size):
+    monkeypatch.setattr(structure, "BLOCK_SIZE", block_size)
+    path = tmp_path / "source.csv"
+    rows = [
+        '{},"multi\nline {}"'.format(i, i) if i % 7 else "{},x".format(i)
+        for i in range(200)
+    ]
+    path.write_text("Number,Note\n" + "\n".join(rows) + "\n")
+    source = LocalFile(str(path))
+
+    result = scan(source, chunk_size=100)
+    chunks = result.chunks(source)
+
+    assert result.boundaries[0] == result.header_end
+    assert len(chunks) > 10
+    assert chunks[-1].end == source.size()
+    numbers = [
+        row["Number"] for chunk in chunks for row in csv.DictReader(chunk.open())
+    ]
+    assert numbers == [str(i) for i in range(200)]
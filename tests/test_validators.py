@@ -1,22 +1,42 @@
+import copy
+import pickle
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+
 import pytest
 from pretend import stub, call, call_recorder
 
 from vladiate.exceptions import BadValidatorException, ValidationException
+from vladiate.index import KeyIndex
+from vladiate.inputs import LocalFile, String
 from vladiate.validators import (
+    AggregateValidator,
     CastValidator,
+    DateTimeValidator,
+    DateValidator,
+    DistinctCountValidator,
     EmptyValidator,
     FloatValidator,
+    ForeignKeyValidator,
     Ignore,
     IntValidator,
+    MaxValidator,
+    MinValidator,
+    MonotonicValidator,
     NotEmptyValidator,
+    NullRatioValidator,
     RangeValidator,
     RegexValidator,
     RowValidator,
     RowLengthValidator,
     SetValidator,
+    SumValidator,
     UniqueValidator,
     Validator,
+    _STATE_FORMAT,
     _stringify_set,
+    deserialize_state,
 )
 
 
@@ -74,6 +94,149 @@ def test_int_validator_fails(field):
         IntValidator().validate(field)
 
 
+@pytest.mark.parametrize(
+    "validator, field, value",
+    [
+        (IntValidator(), "42", 42),
+        (IntValidator(thousands=","), "4,200", 4200),
+        (IntValidator(thousands=","), "-1,234,567", -1234567),
+        (IntValidator(thousands=","), "420", 420),
+        (FloatValidator(decimal=","), "4,2", 4.2),
+        (FloatValidator(thousands=".", decimal=","), "1.234,5", 1234.5),
+        (FloatValidator(thousands=" ", decimal=","), "1 234,5", 1234.5),
+        (IntValidator(low=0, high=10), "10", 10),
+        (FloatValidator(low=-1.5), "-1.5", -1.5),
+        (IntValidator(empty_ok=True, low=1), "", None),
+    ],
+)
+def test_cast_validator_formats_work(validator, field, value):
+    assert validator.parse(field) == value if field else True
+    assert validator.validate(field) == value
+
+
+@pytest.mark.parametrize(
+    "validator, field",
+    [
+        (IntValidator(thousands=","), "4,20"),
+        (IntValidator(thousands=","), "4,2000"),
+        (IntValidator(thousands=","), "4200,000"),
+        (IntValidator(thousands=","), "1,000,00"),
+        (FloatValidator(decimal=","), "4.2"),
+        (FloatValidator(thousands=".", decimal=","), "1.234.5"),
+        (IntValidator(low=0, high=10), "11"),
+        (FloatValidator(low=0), "-0.1"),
+    ],
+)
+def test_cast_validator_formats_fail(validator, field):
+    with pytest.raises(ValueError):
+        validator.parse(field)
+    with pytest.raises(ValidationException):
+        validator.validate(field)
+    assert validator.bad == {field}
+
+
+@pytest.mark.parametrize(
+    "validator, field, value",
+    [
+        (DateValidator(), "2024-02-29", date(2024, 2, 29)),
+        (DateValidator("%d/%m/%Y"), "01/02/2024", date(2024, 2, 1)),
+        (DateValidator("%Y%m"), "202402", date(2024, 2, 1)),
+        (DateValidator("%b %d, %Y"), "Feb 01, 2024", date(2024, 2, 1)),
+        (DateValidator(low="2024-01-01"), "2024-01-01", date(2024, 1, 1)),
+        (DateValidator(high=date(2024, 1, 1)), "1999-12-31", date(1999, 12, 31)),
+        (DateTimeValidator(), "2024-02-01T10:11:12", datetime(2024, 2, 1, 10, 11, 12)),
+        (
+            DateTimeValidator("%Y-%m-%d %H:%M:%S.%f"),
+            "2024-02-01 10:11:12.000013",
+            datetime(2024, 2, 1, 10, 11, 12, 13),
+        ),
+        (DateTimeValidator("%d%%%m%%%Y"), "01%02%2024", datetime(2024, 2, 1)),
+    ],
+)
+def test_date_validator_works(validator, field, value):
+    assert validator.parse(field) == value
+    assert validator.validate(field) == value
+    assert validator.parse(field) == value
+
+
+@pytest.mark.parametrize(
+    "validator, field",
+    [
+        (DateValidator(), "2024-02-30"),
+        (DateValidator(), "2024-2-01"),
+        (DateValidator(), "20240201"),
+        (DateValidator(), "2024-02-01T00:00:00"),
+        (DateValidator(), ""),
+        (DateValidator("%d/%m/%Y"), "1/02/2024"),
+        (DateValidator("%d/%m/%Y"), "01/02/2024 "),
+        (DateValidator("%b %d, %Y"), "Foo 01, 2024"),
+        (DateValidator(low="2024-01-01"), "2023-12-31"),
+        (DateTimeValidator(), "2024-02-01 10:11:12"),
+        (DateTimeValidator(), "2024-02-01T25:11:12"),
+        (DateTimeValidator(high="2024-01-01T00:00:00"), "2024-01-01T00:00:01"),
+    ],
+)
+def test_date_validator_fails(validator, field):
+    with pytest.raises(ValueError):
+        validator.parse(field)
+    with pytest.raises(ValidationException):
+        validator.validate(field)
+    assert validator.bad == {field}
+
+
+def test_date_validator_cache():
+    validator = DateValidator(cache_size=2)
+    validator.convert = call_recorder(validator.convert)
+
+    for field in ["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-03"]:
+        validator.validate(field)
+
+    assert validator.convert.calls == [
+        call("2024-01-01"),
+        call("2024-01-02"),
+        call("2024-01-03"),
+    ]
+    assert validator.cache == {"2024-01-03": date(2024, 1, 3)}
+
+
+@pytest.mark.parametrize("format", ["%Y-%m-%d", "%d/%m/%Y", "%b %d %Y"])
+def test_date_validator_pickles(format):
+    validator = pickle.loads(
+        pickle.dumps(
+            DateValidator(format, low="Jan 01 2000" if "b" in format else None)
+        )
+    )
+
+    assert validator.validate(date(2024, 2, 1).strftime(format)) == date(2024, 2, 1)
+
+
+@pytest.mark.parametrize(
+    "factory",
+    [
+        lambda: IntValidator(),
+        lambda: IntValidator(empty_ok=True),
+        lambda: FloatValidator(thousands=",", low=0),
+        lambda: DateValidator("%Y", empty_ok=True),
+        lambda: SetValidator(["1", "2"]),
+    ],
+)
+def test_validate_batch_matches_validate(factory):
+    fields = ["1", "x", "2", "", "-3", "1,000", "y", "2"]
+    rows = [{"a": field} for field in fields]
+    single, batch = factory(), factory()
+    expected = []
+    for i, field in enumerate(fields):
+        try:
+            single.validate(field, row=rows[i])
+        except ValidationException as e:
+            expected.append((i, str(e)))
+
+    failures = batch.validate_batch(fields, rows)
+
+    assert [(i, str(e)) for i, e in failures] == expected
+    assert batch.bad == single.bad
+
+
 @pytest.mark.parametrize(
     "field_set, field", [(["foo"], "foo"), (["foo", "bar"], "foo")]
 )
@@ -174,6 +337,94 @@ def test_unique_validator_fails(fields, row, unique_with, exception, bad):
     assert validator.bad == bad
 
 
+def test_foreign_key_validator(tmp_path):
+    source = String("id,name\n1,Dracula\n2,Vlad\n,Nobody\n")
+    validator = ForeignKeyValidator(source, "id", cache_dir=str(tmp_path))
+
+    validator.validate("1")
+    validator.validate("2")
+    validator.validate("")
+    with pytest.raises(ValidationException):
+        validator.validate("3")
+    with pytest.raises(ValidationException):
+        validator.validate("Dracula")
+
+    assert validator.bad == {"3", "Dracula"}
+    assert len(validator.index) == 3
+
+
+def test_foreign_key_validator_empty_ok(tmp_path):
+    source = String("id\n1\n")
+    validator = ForeignKeyValidator(
+        source, "id", cache_dir=str(tmp_path), empty_ok=True
+    )
+
+    validator.validate("")
+    with pytest.raises(ValidationException):
+        ForeignKeyValidator(source, "id", cache_dir=str(tmp_path)).validate("")
+
+
+def test_foreign_key_validator_cache(tmp_path):
+    validator = ForeignKeyValidator(
+        String("id\n1\n2\n"), "id", cache_dir=str(tmp_path), cache_size=1
+    )
+    validator.index = stub(
+        field="id", source=None, __contains__=call_recorder(lambda value: value != "3")
+    )
+
+    for field in ["1", "1", "2", "1", "3", "3"]:
+        try:
+            validator.validate(field)
+        except ValidationException:
+            pass
+
+    assert validator.index.__contains__.calls == [
+        call("1"),
+        call("2"),
+        call("1"),
+        call("3"),
+        call("3"),
+    ]
+    assert validator.found == {"1"}
+
+
+def test_foreign_key_validator_missing_field(tmp_path):
+    validator = ForeignKeyValidator(String("id\n1\n"), "foo", cache_dir=str(tmp_path))
+
+    with pytest.raises(ValueError):
+        validator.validate("1")
+
+
+def test_key_index_is_built_once(tmp_path, monkeypatch):
+    path = tmp_path / "keys.csv"
+    path.write_text("id\n1\n2\n")
+    cache_dir = str(tmp_path / "cache")
+    build = call_recorder(KeyIndex.build)
+    monkeypatch.setattr(KeyIndex, "build", build)
+
+    assert "1" in KeyIndex(LocalFile(str(path)), "id", cache_dir=cache_dir)
+    assert "2" in KeyIndex(LocalFile(str(path)), "id", cache_dir=cache_dir)
+    # Another process finds the index on disk
+    monkeypatch.setattr("vladiate.index._loaded", {})
+    assert "3" not in KeyIndex(LocalFile(str(path)), "id", cache_dir=cache_dir)
+    assert len(build.calls) == 1
+
+    path.write_text("id\n1\n2\n3\n")
+    assert "3" in KeyIndex(LocalFile(str(path)), "id", cache_dir=cache_dir)
+    assert len(build.calls) == 2
+
+
+def test_foreign_key_validator_copies(tmp_path):
+    validator = ForeignKeyValidator(String("id\n1\n"), "id", cache_dir=str(tmp_path))
+    validator.validate("1")
+
+    for copied in [copy.deepcopy(validator), pickle.loads(pickle.dumps(validator))]:
+        assert copied.index.hashes is None
+        copied.validate("1")
+        with pytest.raises(ValidationException):
+            copied.validate("2")
+
+
 @pytest.mark.parametrize("pattern, field", [(r"foo.*", "foo"), (r"foo.*", "foobar")])
 def test_regex_validator_works(pattern, field):
     RegexValidator(pattern).validate(field)
@@ -263,18 +514,32 @@ def test_row_length_validator_works():
 
 
 @pytest.mark.parametrize(
-    "row",
+    "row, evidence",
     [
-        {"Field One": "1", "Field Two": None},
-        {"Field One": "1", "Field Two": "2", None: ["3", "4"]},
+        ({"Field One": "1", "Field Two": None}, (2, 1, "1")),
+        ({"Field One": "1", "Field Two": "2", None: ["3", "4"]}, (2, 4, "1,2,3,4")),
     ],
 )
-def test_row_length_validator_fails(row):
+def test_row_length_validator_fails(row, evidence):
     validator = RowLengthValidator()
+    validator.validate({"Field One": "1", "Field Two": "2"})
     with pytest.raises(ValidationException):
         validator.validate(row)
 
-    assert validator.bad == [row]
+    assert validator.invalid_rows == [evidence]
+
+
+def test_row_length_validator_keeps_compact_evidence():
+    validator = RowLengthValidator(max_rows=2, max_length=5)
+    for i in range(4):
+        with pytest.raises(ValidationException):
+            validator.validate({"A": "1", "B": "2", None: ["333", str(i)]})
+
+    assert validator.invalid_rows == [(1, 4, "1,2,3..."), (2, 4, "1,2,3...")]
+    assert validator.bad == ["row 1 (4 fields): 1,2,3...", "row 2 (4 fields): 1,2,3..."]
+
+    with pytest.raises(ValueError):
+        RowLengthValidator(max_rows=0)
 
 
 def test_base_row_validator_raises():
@@ -287,6 +552,151 @@ def test_base_row_validator_raises():
         validator.validate(stub())
 
 
+def test_base_row_validator_finishes():
+    RowValidator().finish()
+
+    with pytest.raises(NotImplementedError):
+        AggregateValidator("a", low=0).finish()
+
+
+@pytest.mark.parametrize(
+    "validator, fields, result",
+    [
+        (SumValidator("a"), ["1", "2.5", "", "x", None], 3.5),
+        (SumValidator("a", parser=int), ["1", "2", "2.5"], 3),
+        (SumValidator("a"), [], 0),
+        (MinValidator("a"), ["3", "1.5", "", "2"], 1.5),
+        (MinValidator("a", parser=str), ["b", "a", "c"], "a"),
+        (MinValidator("a"), ["x"], None),
+        (MaxValidator("a"), ["3", "10", "", "2"], 10),
+        (MaxValidator("a", parser=str), ["2024-01-02", "2024-01-10"], "2024-01-10"),
+        (DistinctCountValidator("a"), ["a", "b", "a", "", None], 3),
+        (DistinctCountValidator("a"), [], 0),
+        (NullRatioValidator("a"), ["a", "", None, "b"], 0.5),
+        (NullRatioValidator("a", null_values=["", "NULL"]), ["a", "NULL"], 0.5),
+        (NullRatioValidator("a"), [], 0.0),
+    ],
+)
+def test_aggregate_validator_result(validator, fields, result):
+    for field in fields:
+        validator.validate({"a": field})
+
+    assert validator.result() == result
+    validator.finish()
+    assert validator.bad == []
+
+
+@pytest.mark.parametrize(
+    "validator, fields",
+    [
+        (SumValidator("a", high=3), ["1", "2", "0.5"]),
+        (SumValidator("a", low=1), ["-1", "1"]),
+        (MinValidator("a", low=0), ["1", "-1"]),
+        (MinValidator("a", low=0), []),
+        (MaxValidator("a", low="2024-01-03", parser=str), ["2024-01-02"]),
+        (DistinctCountValidator("a", high=2), ["a", "b", "c"]),
+        (DistinctCountValidator("a", low=2), ["a", "a"]),
+        (NullRatioValidator("a", high=0.25), ["a", "", "b"]),
+    ],
+)
+def test_aggregate_validator_fails(validator, fields):
+    for field in fields:
+        validator.validate({"a": field})
+
+    with pytest.raises(ValidationException):
+        validator.finish()
+    assert len(validator.bad) == 1
+
+
+def test_distinct_count_validator_estimates():
+    validator = DistinctCountValidator("a")
+    for i in range(200000):
+        validator.validate({"a": str(i % 100000)})
+
+    assert abs(validator.result() - 100000) < 100000 * 0.03
+
+
+def test_distinct_count_validator_precision():
+    with pytest.raises(ValueError):
+        DistinctCountValidator("a", precision=3)
+    assert len(DistinctCountValidator("a", precision=4).registers) == 16
+
+
+@pytest.mark.parametrize(
+    "validator, fields, bad, fail_count",
+    [
+        (MonotonicValidator("a"), ["1", "1", "2", "", "10"], [], 0),
+        (MonotonicValidator("a"), ["1", "2", "1.5", "3"], ["row 3: 1.5"], 1),
+        (MonotonicValidator("a", strict=True), ["1", "1", "2"], ["row 2: 1"], 1),
+        (
+            MonotonicValidator("a", decreasing=True),
+            ["3", "2", "2", "4"],
+            ["row 4: 4"],
+            1,
+        ),
+        (
+            MonotonicValidator("a", parser=str),
+            ["2024-01-02", "2024-01-01"],
+            ["row 2: 2024-01-01"],
+            1,
+        ),
+        # Only the first rows out of order are kept, but every one is counted
+        (
+            MonotonicValidator("a", max_rows=2),
+            ["3", "2", "1", "0"],
+            ["row 2: 2", "row 3: 1"],
+            3,
+        ),
+    ],
+)
+def test_monotonic_validator(validator, fields, bad, fail_count):
+    for field in fields:
+        try:
+            validator.validate({"a": field})
+        except ValidationException:
+            validator.fail_count += 1
+
+    assert validator.bad == bad
+    assert validator.fail_count == fail_count
+
+
+@pytest.mark.parametrize(
+    "factory, fields",
+    [
+        (lambda: SumValidator("a", high=5), ["1", "2", "x", "3"]),
+        (lambda: MinValidator("a", low=2), ["3", "", "1", "2"]),
+        (lambda: MaxValidator("a", high=2), ["3", "x", "1", "2"]),
+        (lambda: MaxValidator("a"), ["", "x", "2", "1"]),
+        (lambda: DistinctCountValidator("a", high=2), ["a", "b", "a", "c"]),
+        (lambda: NullRatioValidator("a", high=0.25), ["a", "", "b", ""]),
+        (lambda: MonotonicValidator("a"), ["1", "2", "1", "3", "2"]),
+        (lambda: MonotonicValidator("a"), ["1", "2", "3", "4", "5"]),
+        (lambda: MonotonicValidator("a"), ["", "", "", "1", "0"]),
+        (lambda: MonotonicValidator("a", max_rows=1), ["3", "2", "1", "0"]),
+    ],
+)
+@pytest.mark.parametrize("split", [0, 1, 3])
+def test_row_validator_merge_matches_single_run(factory, fields, split):
+    single, first, second = factory(), factory(), factory()
+    for i, field in enumerate(fields):
+        for validator in [single, first if i < split else second]:
+            try:
+                validator.validate({"a": field})
+            except ValidationException:
+                validator.fail_count += 1
+
+    first.merge(deserialize_state(second.serialize()))
+
+    assert first.state() == single.state()
+    for validator in [first, single]:
+        try:
+            validator.finish()
+        except ValidationException:
+            validator.fail_count += 1
+    assert first.fail_count == single.fail_count
+    assert first.bad == single.bad
+
+
 @pytest.mark.parametrize(
     "validator_class,args",
     [
@@ -315,3 +725,108 @@ def test_all_validators_support_empty_ok(validator_class, args):
 )
 def test_stringify_set(a_set, max_len, stringified):
     assert _stringify_set(a_set, max_len) == stringified
+
+
+@pytest.mark.parametrize(
+    "validator_class,args,fields",
+    [
+        (IntValidator, [], ["1", "a", "b", "2", "a"]),
+        (SetValidator, [["foo"]], ["foo", "bar", "baz", "foo", "qux"]),
+        (RegexValidator, [r"foo.*"], ["foo", "bar", "foobar", "baz", "bar"]),
+        (RangeValidator, [0, 42], ["1", "43", "-1", "2", "50"]),
+        (EmptyValidator, [], ["", "a", "", "b", "c"]),
+        (NotEmptyValidator, [], ["a", "", "b", "", "c"]),
+        (UniqueValidator, [], ["a", "b", "c", "a", "b"]),
+    ],
+)
+def test_validator_merge_matches_single_run(validator_class, args, fields):
+    single, first, second = [validator_class(*args) for _ in range(3)]
+    for i, field in enumerate(fields):
+        for validator in [single, first if i < 3 else second]:
+            try:
+                validator.validate(field, row={"a": field})
+            except ValidationException:
+                validator.fail_count += 1
+
+    first.merge(deserialize_state(second.serialize()))
+
+    assert first.fail_count == single.fail_count
+    assert first.state() == single.state()
+    assert first.bad == single.bad
+
+
+def test_unique_validator_merge_finds_duplicates_across_parts():
+    first, second = UniqueValidator(), UniqueValidator()
+    first.validate("a", row={"a": "a"})
+    first.validate("b", row={"a": "b"})
+    second.validate("b", row={"a": "b"})
+
+    first.merge(second)
+
+    assert first.fail_count == 1
+    assert first.bad == {("b",)}
+
+
+def test_row_length_validator_merge():
+    first, second = RowLengthValidator(), RowLengthValidator()
+    for validator, row in [(first, {"a": "1", None: ["2"]}), (second, {"a": None})]:
+        with pytest.raises(ValidationException):
+            validator.validate(row)
+        validator.fail_count += 1
+
+    first.merge(second.state())
+
+    assert first.fail_count == 2
+    assert first.invalid_rows == [(1, 2, "1,2"), (2, 0, "")]
+    assert first.rows == 2
+
+
+@pytest.mark.parametrize(
+    "validator, values",
+    [
+        (MaxValidator("d", parser=date.fromisoformat), ["2024-01-02", "2023-12-31"]),
+        (
+            MinValidator("d", parser=datetime.fromisoformat),
+            ["2024-01-02T10:00:00+02:00", "2024-01-02T12:00:00+00:00"],
+        ),
+        (SumValidator("d", parser=Decimal), ["0.1", "0.2"]),
+        (MonotonicValidator("d", parser=time.fromisoformat), ["10:00", "09:00"]),
+    ],
+)
+def test_serialize_date_and_decimal_state(validator, values):
+    for value in values:
+        try:
+            validator.validate({"d": value})
+        except ValidationException:
+            validator.fail_count += 1
+
+    assert deserialize_state(validator.serialize()) == validator.state()
+
+
+@pytest.mark.parametrize(
+    "validator, field, message",
+    [
+        (IntValidator(), "x{", "invalid literal for int() with base 10: 'x{'"),
+        (RegexValidator(r"\d{3}"), "12", "'12' does not match pattern /{!r}/"),
+        (RangeValidator(1, 3), "5", "'5' is not in range 1 to 3"),
+        (UniqueValidator(), "1", "'1' is already in the column"),
+    ],
+)
+def test_failure_message_templates(validator, field, message):
+    if isinstance(validator, RegexValidator):
+        message = message.replace("{!r}", str(validator.regex))
+    with pytest.raises(ValidationException) as excinfo:
+        validator.validate(field)
+        validator.validate(field)
+
+    assert str(excinfo.value) == message
+    assert excinfo.value.values == (field,)
+    assert excinfo.value.template.format(field) == message
+
+
+def test_deserialize_state_rejects_other_data():
+    with pytest.raises(ValueError):
+        deserialize_state(b"\x00" + b"data")
+
+    with pytest.raises(pickle.UnpicklingError):
+        deserialize_state(_STATE_FORMAT + zlib.compress(pickle.dumps(stub)))
@@ -1,13 +1,26 @@
+import csv
+import io
+import os
+import pickle
+import threading
+
 import pytest
 
-from vladiate.inputs import LocalFile, String
+from vladiate.exceptions import ValidationException
+from vladiate.inputs import LocalFile, MultiFile, Stdin, String
 from vladiate.validators import (
     EmptyValidator,
     FloatValidator,
+    Ignore,
+    IntValidator,
     NotEmptyValidator,
+    RangeValidator,
+    MaxValidator,
     RowLengthValidator,
     SetValidator,
+    SumValidator,
     UniqueValidator,
+    Validator,
 )
 from vladiate.vlad import Vlad
 
@@ -103,13 +116,43 @@ def test_fails_validation():
     assert vlad.invalid_lines == {1, 2, 3}
 
 
-def test_gt_99_failures():
+def test_gt_99_failures(caplog):
     source = String("\n".join(["Foo"] + [str(x) for x in range(100)]))
 
     class TestVlad(Vlad):
         validators = {"Foo": [EmptyValidator()]}
 
     assert not TestVlad(source=source).validate()
+    assert "(1 more suppressed)" in caplog.text
+
+
+def test_failures_are_reported_lazily(caplog):
+    class Bad(object):
+        """A large collection of failures, which counts what is read of it"""
+
+        def __init__(self):
+            self.read = 0
+
+        def __len__(self):
+            return 10**6
+
+        def __iter__(self):
+            for i in range(len(self)):
+                self.read += 1
+                yield i
+
+    bad = Bad()
+
+    class LotsOfFailures(NotEmptyValidator):
+        @property
+        def bad(self):
+            return bad
+
+    vlad = Vlad(source=String("Foo\n\n,"), validators={"Foo": [LotsOfFailures()]})
+
+    assert not vlad.validate()
+    assert bad.read == 99
+    assert "(999901 more suppressed)" in caplog.text
 
 
 def test_ignore_missing_validators():
@@ -174,3 +217,602 @@ def test_stop_file_validation_at_invalid_threshold():
     assert vlad.validators["Column B"][0].fail_count == 0
     assert vlad.validators["Column C"][0].fail_count == 0
     assert vlad.invalid_lines == {1}
+
+
+def test_check_schema():
+    source = LocalFile("vladiate/examples/vampires.csv")
+
+    class TestVlad(Vlad):
+        validators = {"Column A": [UniqueValidator()], "Column B": []}
+
+    assert TestVlad(source=source).check_schema()
+
+
+@pytest.mark.parametrize(
+    "validators, missing_validators, missing_fields",
+    [
+        ({"Column A": []}, {"Column B"}, None),
+        ({"Column A": [], "Column B": [], "Column C": []}, set(), {"Column C"}),
+    ],
+)
+def test_check_schema_fails(validators, missing_validators, missing_fields):
+    vlad = Vlad(
+        source=LocalFile("vladiate/examples/vampires.csv"), validators=validators
+    )
+
+    assert not vlad.check_schema()
+    assert vlad.missing_validators == missing_validators
+    assert vlad.missing_fields == missing_fields
+    assert vlad.line_count == 0
+
+
+def test_check_schema_reads_only_the_header():
+    header = ",".join("Column {}".format(i) for i in range(500))
+    source = String("\n\n" + header + "\n" + "\n".join(["x"] * 10000))
+    reads = []
+    read_head = source.read_head
+    source.read_head = lambda size: reads.append(size) or read_head(size)
+
+    vlad = Vlad(source=source, validators={c: [] for c in header.split(",")})
+
+    assert vlad.check_schema()
+    assert max(reads) < 2 * len(header)
+
+
+def test_check_schema_no_fieldnames():
+    assert not Vlad(source=String(""), validators={"Foo": []}).check_schema()
+
+
+def _write_numbers(path, rows, bad_every):
+    path.write_text(
+        "Number,Kind\n"
+        + "".join(
+            "{},{}\n".format(i, "bad" if i % bad_every == 0 else "good")
+            for i in range(rows)
+        )
+    )
+    return LocalFile(str(path))
+
+
+@pytest.mark.parametrize("sample_method", ["random", "stratified"])
+def test_sample_size(tmp_path, caplog, sample_method):
+    source = _write_numbers(tmp_path / "numbers.csv", 20000, 4)
+    kind = SetValidator(["good"])
+
+    vlad = Vlad(
+        source=source,
+        validators={"Number": [Ignore()], "Kind": [kind]},
+        sample_size=400,
+        sample_method=sample_method,
+        sample_seed=0,
+    )
+
+    assert not vlad.validate()
+    assert 0 < vlad.line_count <= 400
+    estimate = [e for e in vlad.sample_estimates if e.field == "Kind"][0]
+    assert estimate.sampled == vlad.line_count
+    assert estimate.failures == kind.fail_count
+    rate = estimate.failures / estimate.sampled
+    assert estimate.low < rate < estimate.high
+    assert 0.15 < rate < 0.35
+    assert vlad.sampled_by_offset
+    assert "Rows were sampled by byte offset" in caplog.text
+
+
+def test_sample_size_without_seeking():
+    source = String("Foo\n" + "\n".join(str(x) for x in range(100)))
+
+    vlad = Vlad(source=source, validators={"Foo": [Ignore()]}, sample_size=10)
+
+    assert vlad.validate()
+    assert vlad.line_count == 10
+    assert vlad.sample_estimates[0].failures == 0
+    assert not vlad.sampled_by_offset
+
+
+def test_sample_size_with_failure_threshold(tmp_path):
+    source = _write_numbers(tmp_path / "numbers.csv", 20000, 2)
+
+    vlad = Vlad(
+        source=source,
+        validators={"Number": [Ignore()], "Kind": [SetValidator(["good"])]},
+        sample_size=200,
+        sample_seed=0,
+        file_validation_failure_threshold=0.1,
+    )
+
+    assert not vlad.validate()
+    assert vlad.line_count < 100
+
+
+def test_unknown_sample_method():
+    with pytest.raises(ValueError):
+        Vlad(source=String("Foo"), sample_size=10, sample_method="nope")
+
+
+def test_merge():
+    def make(rows):
+        return Vlad(
+            source=String("Foo,Bar\n" + "\n".join(rows)),
+            validators={"Foo": [UniqueValidator()], "Bar": [SetValidator(["x"])]},
+            row_validators=[RowLengthValidator()],
+        )
+
+    first, second = make(["1,x", "2,y"]), make(["2,x", "3,x,z"])
+    first.validate()
+    second.validate()
+
+    first.merge(second)
+
+    assert first.line_count == 4
+    assert first.validators["Foo"][0].bad == {("2",)}
+    assert first.validators["Bar"][0].fail_count == 1
+    assert first.row_validators[0].fail_count == 1
+
+    single = make(["1,x", "2,y", "2,x", "3,x,z"])
+    single.validate()
+    assert first.state() == single.state()
+
+
+def test_dialect():
+    source = String("Foo;Bar\n'a;b';c\n")
+
+    vlad = Vlad(
+        source=source,
+        validators={"Foo": [SetValidator(["a;b"])], "Bar": [SetValidator(["c"])]},
+        dialect="excel",
+        delimiter=";",
+    )
+    assert not vlad.validate()
+
+    class SemicolonsAndSingleQuotes(csv.excel):
+        delimiter = ";"
+        quotechar = "'"
+
+    vlad = Vlad(
+        source=source,
+        validators={"Foo": [SetValidator(["a;b"])], "Bar": [SetValidator(["c"])]},
+        dialect=SemicolonsAndSingleQuotes,
+    )
+    assert vlad.validate()
+
+
+def test_unknown_dialect():
+    with pytest.raises(csv.Error):
+        Vlad(source=String("Foo"), dialect="nope")
+
+
+@pytest.mark.parametrize("sniff", [True, 64])
+def test_sniff(sniff):
+    source = LocalFile("vladiate/examples/bats.csv")
+    validators = {
+        "Column A": [UniqueValidator()],
+        "Column B": [SetValidator(["Vampire", "Not A Vampire"])],
+    }
+
+    vlad = Vlad(source=source, validators=validators, sniff=sniff)
+
+    assert vlad.validate()
+    assert vlad.sniffed["delimiter"] == "|"
+    assert vlad.check_schema()
+
+
+def test_sniff_falls_back_to_dialect():
+    vlad = Vlad(source=String("Foo\n"), validators={"Foo": []}, sniff=True)
+
+    assert vlad.validate()
+    assert vlad.sniffed is None
+
+
+def test_strict_reports_malformed_rows(caplog):
+    source = String('Foo,Bar\n1,2\n"3"x,4\n')
+
+    validators = {"Foo": [Ignore()], "Bar": [Ignore()]}
+
+    assert Vlad(source=source, validators=validators).validate()
+    vlad = Vlad(source=source, validators=validators, strict=True)
+
+    assert vlad.validate() is False
+    assert "Malformed CSV: row 2" in caplog.text
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-16", "utf-32"])
+def test_byte_order_marks(tmp_path, encoding):
+    path = tmp_path / "source.csv"
+    path.write_bytes("Name,Note\nÉlisabeth,x\n".encode(encoding))
+    validators = {"Name": [SetValidator(["Élisabeth"])], "Note": [Ignore()]}
+
+    assert Vlad(source=LocalFile(str(path)), validators=validators).validate()
+    vlad = Vlad(source=LocalFile(str(path)), validators=validators, sample_size=5)
+    assert vlad.validate()
+
+
+@pytest.mark.parametrize(
+    "encoding", [None, "utf-8-sig", "utf-16", "utf-16-be", "utf-32", "latin-1"]
+)
+def test_bytes_read(tmp_path, encoding):
+    path = tmp_path / "source.csv"
+    path.write_bytes(
+        ("Name\r\nÉlisabeth\r\nZoë\nVlad\n" * 500).encode(encoding or "utf-8")
+    )
+    vlad = Vlad(
+        source=LocalFile(str(path), encoding=encoding),
+        validators={"Name": [NotEmptyValidator()]},
+    )
+
+    assert vlad.validate()
+    assert vlad.bytes_read == path.stat().st_size
+
+
+def test_latin_1_source(tmp_path):
+    path = tmp_path / "source.csv"
+    path.write_bytes("Name\nÉlisabeth\nZoë\n".encode("latin-1"))
+    source = LocalFile(str(path), encoding="latin-1")
+    validators = {"Name": [SetValidator(["Élisabeth", "Zoë"])]}
+
+    assert Vlad(source=source, validators=validators).validate()
+    assert Vlad(source=source, validators=validators, sample_size=5).validate()
+
+
+def test_undecodable_bytes_are_reported(tmp_path, caplog):
+    path = tmp_path / "source.csv"
+    path.write_bytes(b"Name\nVlad\n\xc9lisabeth\nZo\xeb\n")
+    validators = {"Name": [Ignore()]}
+
+    vlad = Vlad(source=LocalFile(str(path)), validators=validators)
+
+    assert vlad.validate() is False
+    assert vlad.line_count == 3
+    assert vlad.read_error_count == 2
+    assert vlad.read_errors == [
+        (3, "Invalid UTF-8: invalid continuation byte"),
+        (4, "Invalid UTF-8: invalid continuation byte"),
+    ]
+    assert "  Line 3: Invalid UTF-8: invalid continuation byte" in caplog.messages
+    source = LocalFile(str(path), errors="replace")
+    assert Vlad(source=source, validators=validators).validate()
+
+
+def test_multi_file_source(tmp_path, caplog):
+    (tmp_path / "a.csv").write_text("Name\nVlad\nMina\n")
+    (tmp_path / "b.csv").write_text("Name\nLucy\nVlad\n")
+    validators = {"Name": [UniqueValidator()]}
+
+    vlad = Vlad(source=MultiFile.glob(str(tmp_path)), validators=validators)
+
+    assert vlad.validate() is False
+    assert vlad.line_count == 4
+    assert vlad.failures["Name"] == {3: ["'Vlad' is already in the column"]}
+    (tmp_path / "c.csv").write_text("Surname\nHarker\n")
+    vlad = Vlad(source=MultiFile.glob(str(tmp_path)), validators={"Name": [Ignore()]})
+    assert vlad.validate() is False
+    assert vlad.read_error_count == 1
+    assert "header differs from the first part's" in caplog.text
+
+
+def test_strict_limits_field_size():
+    previous = csv.field_size_limit(10**9)
+    try:
+        source = String("Foo\n" + "x" * 200 + "\n")
+        assert Vlad(source=source, validators={"Foo": [Ignore()]}).validate()
+
+        vlad = Vlad(
+            source=source,
+            validators={"Foo": [Ignore()]},
+            strict=True,
+            field_size_limit=100,
+        )
+        assert vlad.validate() is False
+        assert csv.field_size_limit() == 10**9
+    finally:
+        csv.field_size_limit(previous)
+
+
+@pytest.mark.parametrize("threshold", [None, 1.0])
+def test_batch_size(threshold):
+    source = String("Foo,Bar\n" + "\n".join("{0},{0}".format(x) for x in range(250)))
+
+    def make(**kwargs):
+        return Vlad(
+            source=source,
+            validators={"Foo": [IntValidator(high=199)], "Bar": [SetValidator(["1"])]},
+            row_validators=[RowLengthValidator()],
+            file_validation_failure_threshold=threshold,
+            **kwargs
+        )
+
+    single, batch = make(), make(batch_size=100)
+
+    assert single.validate() is batch.validate() is False
+    assert batch.line_count == single.line_count == 250
+    assert batch.invalid_lines == single.invalid_lines
+    for field in ["Foo", "Bar"]:
+        assert sorted(batch.failures[field]) == sorted(single.failures[field])
+        assert batch.validators[field][0].bad == single.validators[field][0].bad
+
+
+def test_batch_size_stops_at_failure_threshold():
+    source = String("Foo\n" + "\n".join(["x"] * 500))
+
+    vlad = Vlad(
+        source=source,
+        validators={"Foo": [IntValidator()]},
+        file_validation_failure_threshold=0.1,
+        batch_size=100,
+    )
+
+    assert not vlad.validate()
+    assert vlad.line_count == 100
+
+
+def test_validators_share_parsed_values():
+    calls = []
+
+    def parse(field):
+        calls.append(field)
+        return int(field)
+
+    class Even(Validator):
+        parser = staticmethod(parse)
+
+        def __init__(self):
+            super(Even, self).__init__()
+            self.odd = set()
+
+        def validate(self, field, row={}):
+            self.validate_parsed(parse(field), field, row)
+
+        def validate_parsed(self, value, field, row):
+            if value % 2:
+                self.odd.add(field)
+                raise ValidationException("'{}' is odd".format(field))
+
+        @property
+        def bad(self):
+            return self.odd
+
+    vlad = Vlad(
+        source=String("Foo\n2\n3\n4"),
+        validators={"Foo": [Even(), Even(), Ignore()]},
+    )
+
+    assert not vlad.validate()
+    assert calls == ["2", "3", "4"]
+    assert [validator.bad for validator in vlad.validators["Foo"][:2]] == [{"3"}] * 2
+
+
+def test_int_and_range_validators_share_parsed_values():
+    source = String("Foo\n" + "\n".join(["1", "50", "150", "x", "1.5"]))
+
+    vlad = Vlad(
+        source=source,
+        validators={"Foo": [IntValidator(), RangeValidator(0, 100, empty_ok=True)]},
+    )
+
+    assert not vlad.validate()
+    int_validator, range_validator = vlad.validators["Foo"]
+    assert int_validator.bad == {"x", "1.5"}
+    assert range_validator.bad == {"150", "x"}
+    assert set(vlad.failures["Foo"]) == {2, 3, 4}
+
+
+def test_aggregate_validators(caplog):
+    source = String("Amount\n1\n2\n3\n")
+    vlad = Vlad(
+        source=source,
+        validators={"Amount": [IntValidator()]},
+        row_validators=[SumValidator("Amount", high=5), MaxValidator("Amount")],
+    )
+
+    assert not vlad.validate()
+    assert vlad.row_validators[0].fail_count == 1
+    assert vlad.row_validators[1].fail_count == 0
+    assert [str(e) for e in vlad.row_failures[None]] == [
+        "The sum of field 'Amount' is 6.0, not in range None to 5"
+    ]
+    assert (
+        " SumValidator failed: The sum of field 'Amount' is 6.0, not in range None"
+        " to 5" in caplog.messages
+    )
+
+
+def test_validate_without_finishing():
+    def make(rows):
+        return Vlad(
+            source=String("Amount\n" + "\n".join(rows)),
+            validators={"Amount": [IntValidator()]},
+            row_validators=[SumValidator("Amount", high=5)],
+        )
+
+    first, second = make(["1", "2"]), make(["3"])
+    assert first.validate(finish=False)
+    assert second.validate(finish=False)
+
+    first.merge(second)
+
+    assert not first.finish()
+    assert first.row_validators[0].fail_count == 1
+
+
+def test_failures_keep_only_messages():
+    vlad = Vlad(
+        source=String("Foo,Bar\n1,x\n2\nx,y\n"),
+        validators={"Foo": [IntValidator()], "Bar": [Ignore()]},
+        row_validators=[RowLengthValidator()],
+    )
+
+    assert not vlad.validate()
+    assert len(vlad.failure_log) == 2
+    assert vlad.failures == {
+        "Foo": {2: ["invalid literal for int() with base 10: 'x'"]}
+    }
+    assert vlad.row_failures == {1: ["Expected 2 fields, got 1"]}
+
+
+def test_read_rows():
+    vlad = Vlad(
+        source=String("Foo,Bar\n1,x\n2\n3,y,z\n4,w\n"),
+        validators={"Foo": [IntValidator()], "Bar": [Ignore()]},
+        row_validators=[RowLengthValidator()],
+    )
+    assert not vlad.validate()
+
+    lines = [line for line, _, _ in vlad.row_validators[0].invalid_rows]
+    assert vlad.read_rows(lines) == {
+        2: {"Foo": "2", "Bar": None},
+        3: {"Foo": "3", "Bar": "y", None: ["z"]},
+    }
+    assert vlad.read_rows([]) == {}
+
+
+def test_structure_check(caplog):
+    validator = IntValidator()
+    vlad = Vlad(
+        source=String("Foo,Bar\n1,2\n3\n4,5,6\n"),
+        validators={"Foo": [validator], "Bar": [IntValidator()]},
+        structure_check=True,
+    )
+
+    assert not vlad.validate()
+    assert vlad.line_count == 0
+    assert vlad.structure.errors == [
+        (3, "Expected 2 fields, got 1"),
+        (4, "Expected 2 fields, got 3"),
+    ]
+    assert "  Line 3: Expected 2 fields, got 1" in caplog.messages
+
+    vlad = Vlad(
+        source=String("Foo,Bar\n1,2\n"),
+        validators={"Foo": [IntValidator()], "Bar": [IntValidator()]},
+        structure_check=True,
+    )
+    assert vlad.validate()
+    assert vlad.structure.rows == 1
+
+
+class Animals(Vlad):
+    source = String("Name,Kind\nVlad,Vampire\nIgor,Human\n")
+    validators = {
+        "Name": [UniqueValidator()],
+        "Kind": [SetValidator(["Vampire", "Not A Vampire"])],
+    }
+
+
+def test_compile():
+    plan = Animals.compile(quiet=True)
+
+    first = plan.run()
+    second = plan.run(String("Name,Kind\nVlad,Vampire\n"))
+    assert not first.passed
+    assert second.passed
+    assert first.validators["Name"][0] is not second.validators["Name"][0]
+    assert list(first.failures["Kind"]) == [1]
+    assert Animals.validators["Name"][0].fail_count == 0
+    assert Animals.validators["Name"][0].unique_values == set()
+
+
+def test_compile_options():
+    plan = Animals.compile(
+        validators={"Name": [UniqueValidator()]}, ignore_missing_validators=True
+    )
+    vlad = plan.vlad(quiet=True)
+    assert vlad.source is Animals.source
+    assert vlad.ignore_missing_validators
+    assert list(vlad.validators) == ["Name"]
+    assert vlad.validate()
+
+
+def test_plan_is_immutable_and_picklable():
+    plan = Animals.compile(quiet=True)
+    with pytest.raises(AttributeError):
+        plan.options = ()
+
+    restored = pickle.loads(pickle.dumps(plan))
+    assert restored.vlad_class is Animals
+    assert restored.options == (("quiet", True),)
+    assert not restored.run().passed
+
+
+def test_plan_of_unpicklable_validators():
+    # Classes defined in a function can't be pickled
+    class Anything(Validator):
+        __slots__ = ()
+
+        def validate(self, field, row):
+            pass
+
+    validator = Anything()
+    plan = Vlad.compile(validators={"Name": [validator]}, quiet=True)
+    assert plan.snapshot is None
+
+    vlad = plan.run(String("Name\nVlad\n"))
+    assert vlad.passed
+    assert vlad.validators["Name"][0] is not validator
+    with pytest.raises(TypeError):
+        pickle.dumps(plan)
+
+
+@pytest.mark.parametrize("batch_size", [None, 2])
+def test_fail_fast(caplog, batch_size):
+    vlad = Vlad(
+        source=String("Foo\n1\n2\nx\n3\ny\n4\n5\n"),
+        validators={"Foo": [IntValidator()]},
+        fail_fast=True,
+        batch_size=batch_size,
+    )
+
+    assert not vlad.validate()
+    assert vlad.line_count == (3 if batch_size is None else 4)
+    assert vlad.validators["Foo"][0].fail_count == 1
+    assert (
+        "  Stopped at the first invalid row, after {} row(s)".format(vlad.line_count)
+        in caplog.messages
+    )
+
+
+def test_stdin_source():
+    stream = io.BytesIO(b"Column A,Column B\nVlad,Vampire\nIgor,Not A Vampire\n")
+    vlad = Vlad(
+        source=Stdin(stream),
+        validators={
+            "Column A": [UniqueValidator()],
+            "Column B": [SetValidator(["Vampire", "Not A Vampire"])],
+        },
+        sniff=True,
+    )
+
+    assert vlad.validate()
+    assert vlad.line_count == 2
+    assert stream.closed
+
+
+def test_fail_fast_stops_reading_a_pipe():
+    read_end, write_end = os.pipe()
+    written = []
+
+    def produce():
+        # Far more than a pipe buffers, so this blocks unless the pipe is
+        # closed by the reader
+        try:
+            with os.fdopen(write_end, "wb") as f:
+                f.write(b"Foo\nx\n")
+                for _ in range(1000):
+                    f.write(b"1\n" * 10000)
+                    written.append(None)
+        except BrokenPipeError:
+            pass
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    vlad = Vlad(
+        source=Stdin(os.fdopen(read_end, "rb")),
+        validators={"Foo": [IntValidator()]},
+        fail_fast=True,
+        quiet=True,
+    )
+
+    assert not vlad.validate()
+    producer.join(10)
+    assert not producer.is_alive()
+    assert len(written) < 1000
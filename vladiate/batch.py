@@ -0,0 +1,199 @@
+"""Validate many sources against the same Vlads in a single run
+
+The sources are listed in a manifest (one local path, glob pattern or
+`s3://` URL per line) and validated by a pool of worker processes, which
+each compile the Vlads once (see `Vlad.compile()`) and then pull one source
+at a time from a shared queue, so that workers which are done with small
+sources take over the remaining ones. Larger local files are handed out
+first, so a big file doesn't end up being validated on its own at the end.
+
+Workers validate quietly, and send back the summary of each validation (see
+`Vlad.summary()`), which are reported together once every source is done.
+"""
+
+import glob
+import os
+import sys
+
+from vladiate import logs
+from vladiate.inputs import LocalFile, S3File
+
+
+def read_manifest(path):
+    """Return the sources listed in the manifest at `path` (`-` for stdin),
+    skipping blank lines and `#` comments, and expanding glob patterns
+
+    A directory or glob pattern can also be given instead of a manifest.
+    """
+    if path != "-" and not os.path.isfile(path):
+        return expand(path)
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    specs = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            specs.extend(expand(line))
+    return specs
+
+
+def expand(spec):
+    """Expand a directory (to the `.csv` files in it) or glob pattern into
+    the paths it matches, in sorted order"""
+    if spec.startswith("s3://"):
+        return [spec]
+    if os.path.isdir(spec):
+        spec = os.path.join(spec, "*.csv")
+    if not glob.has_magic(spec):
+        return [spec]
+    paths = sorted(glob.glob(spec))
+    if not paths:
+        raise ValueError("No files match '{}'".format(spec))
+    return paths
+
+
+def make_source(spec, prototype=None):
+    """Return the input for a source listed in a manifest, decoded like
+    `prototype` (usually the source of the Vlad class)"""
+    encoding = getattr(prototype, "encoding", None)
+    errors = getattr(prototype, "errors", "strict")
+    if spec.startswith("s3://"):
+        return S3File(spec, encoding=encoding, errors=errors)
+    return LocalFile(spec, encoding=encoding, errors=errors)
+
+
+def schedule(specs):
+    """Order sources for validation, the largest local files first"""
+
+    def size(spec):
+        try:
+            return os.path.getsize(spec)
+        except OSError:
+            return 0
+
+    return sorted(specs, key=size, reverse=True)
+
+
+# The plans of a worker process, set by `_init_worker`
+_plans = None
+
+
+def _init_worker(plans):
+    global _plans
+    _plans = plans
+
+
+def validate_source(task):
+    """Validate an (index, Vlad name, source) task with the plans of the
+    worker, and return the summary"""
+    index, name, spec = task
+    plan = _plans[name]
+    source = make_source(spec, getattr(plan.vlad_class, "source", None))
+    vlad = plan.vlad(source, quiet=True)
+    try:
+        vlad.validate()
+        summary = vlad.summary()
+        summary["error"] = None
+    except Exception as e:
+        # A source which can't be read fails, without stopping the others
+        summary = vlad.summary()
+        summary["passed"] = False
+        summary["error"] = "{}: {}".format(e.__class__.__name__, e)
+    summary["vlad"] = name
+    summary["index"] = index
+    summary["missing_validators"] = sorted(vlad.missing_validators or [])
+    summary["missing_fields"] = sorted(vlad.missing_fields or [])
+    return summary
+
+
+def run(plans, specs, processes=1):
+    """Validate every source with each of `plans` (by Vlad name), and return
+    the summaries, in the order of `specs`"""
+    indexes = {spec: i for i, spec in enumerate(specs)}
+    tasks = [
+        (indexes[spec], name, spec)
+        for spec in schedule(specs)
+        for name in sorted(plans)
+    ]
+    processes = min(processes, len(tasks))
+    if processes <= 1:
+        _init_worker(plans)
+        summaries = [validate_source(task) for task in tasks]
+    else:
+        from multiprocessing import Pool
+
+        pool = Pool(processes, initializer=_init_worker, initargs=(plans,))
+        try:
+            summaries = list(
+                pool.imap_unordered(
+                    validate_source, tasks, chunksize=_chunk_size(tasks, processes)
+                )
+            )
+        finally:
+            pool.close()
+            pool.join()
+    return sorted(summaries, key=lambda summary: (summary["index"], summary["vlad"]))
+
+
+def _chunk_size(tasks, processes):
+    # Hand out a few tasks at once to save round trips to the workers, while
+    # keeping enough chunks that idle workers still find some left to take
+    return max(1, len(tasks) // (processes * 16))
+
+
+def report(summaries, quiet=False):
+    """Log the outcome of each validation, and a total. Returns whether every
+    one passed"""
+    logger = logs.logger
+    logger.disabled = quiet
+    failed = 0
+    for summary in summaries:
+        if summary["passed"]:
+            logger.info(
+                "\033[0;32mPASS\033[0m {}: {}, {} row(s)".format(
+                    summary["vlad"], summary["source"], summary["rows"]
+                )
+            )
+            continue
+        failed += 1
+        logger.info(
+            "\033[0;31mFAIL\033[0m {}: {}, {} row(s)".format(
+                summary["vlad"], summary["source"], summary["rows"]
+            )
+        )
+        if summary["error"]:
+            logger.info("  {}".format(summary["error"]))
+        if summary["missing_validators"]:
+            logger.info(
+                "  Missing validators for: {}".format(
+                    ", ".join(repr(name) for name in summary["missing_validators"])
+                )
+            )
+        if summary["missing_fields"]:
+            logger.info(
+                "  Missing fields: {}".format(
+                    ", ".join(repr(name) for name in summary["missing_fields"])
+                )
+            )
+        for failure in summary["failures"]:
+            if failure["count"]:
+                logger.info(
+                    "  {} failed {} time(s){}".format(
+                        failure["validator"],
+                        failure["count"],
+                        (
+                            " on field: '{}'".format(failure["field"])
+                            if failure["field"] is not None
+                            else ""
+                        ),
+                    )
+                )
+    logger.info(
+        "\n{} validation(s): {} passed, {} failed".format(
+            len(summaries), len(summaries) - failed, failed
+        )
+    )
+    return not failed
@@ -0,0 +1,174 @@
+"""Decoding of the raw bytes of sources into lines of text
+
+Sources are read in large blocks of bytes, which are decoded incrementally
+(so multi-byte characters may straddle blocks) and split into lines, keeping
+their line endings like a file opened with `newline=""`. The encoding of a
+source can be left for its byte order mark to tell, and bytes which can't be
+decoded are reported (with their line number) rather than raised.
+"""
+
+import codecs
+import threading
+from io import StringIO
+
+BLOCK_SIZE = 1024 * 1024
+
+# Byte order marks, the codec they imply and the encodings they belong to.
+# The UTF-32 little endian BOM starts with the UTF-16 one, so it comes first.
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le", "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32-be", "utf-32"),
+    (codecs.BOM_UTF8, "utf-8", "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le", "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16-be", "utf-16"),
+)
+
+# Encodings which may start with a BOM, and the one they belong to
+_BOM_ENCODINGS = {
+    "utf-8": "utf-8",
+    "utf-8-sig": "utf-8",
+    "utf-16": "utf-16",
+    "utf-32": "utf-32",
+}
+
+
+def resolve(encoding, head):
+    """Return the (codec, BOM length) to decode a source starting with the
+    bytes `head` with
+
+    With `encoding=None`, any BOM says which Unicode encoding the source is
+    in, and sources without one are decoded as UTF-8.
+    """
+    family = "utf-8"
+    if encoding is not None:
+        name = codecs.lookup(encoding).name
+        family = _BOM_ENCODINGS.get(name)
+        if family is None:
+            return name, 0
+    for bom, codec, bom_family in BOMS:
+        if head.startswith(bom) and (encoding is None or bom_family == family):
+            return codec, len(bom)
+    if encoding is None or family == "utf-8":
+        return "utf-8", 0
+    return encoding, 0
+
+
+def ascii_compatible(codec):
+    """Whether line breaks and delimiters are single ASCII bytes in `codec`,
+    so sources can be split on them without decoding"""
+    try:
+        return "\r\n,;\t|:\"'".encode(codec) == b"\r\n,;\t|:\"'"
+    except (UnicodeError, LookupError):
+        return False
+
+
+class DecodedLines(object):
+    """The lines of text in an iterable of blocks of bytes
+
+    `errors` is a `codecs` error handler, except for the default, `"strict"`,
+    which replaces undecodable bytes with U+FFFD and reports them in
+    `invalid`, as (line number, message) tuples, instead of raising. Lines
+    can only be iterated over once.
+    """
+
+    def __init__(self, blocks, encoding=None, errors="strict", max_errors=100):
+        self.blocks = blocks
+        self.encoding = encoding
+        self.errors = errors
+        self.max_errors = max_errors
+        self.codec = None
+        # The length of the byte order mark the source starts with, if any
+        self.bom = 0
+        self.ascii_compatible = True
+        # The number of line breaks decoded so far
+        self.line = 0
+        self.invalid = []
+        self.invalid_count = 0
+
+    def __iter__(self):
+        decoder = None
+        pending = ""
+        head = b""
+        for block in self.blocks:
+            if decoder is None:
+                # Wait for enough bytes to tell whether there's a BOM
+                head += block
+                if len(head) < 4:
+                    continue
+                decoder, block = self.start(head)
+            text = pending + self.decode(decoder, block, False)
+            # Only split whole lines, so a "\r\n" is never split in two
+            end = text.rfind("\n") + 1
+            pending = text[end:]
+            if end:
+                self.line += text.count("\n", 0, end)
+                yield from StringIO(text[:end], newline="")
+        if decoder is None:
+            if not head:
+                return
+            decoder, block = self.start(head)
+            pending = self.decode(decoder, block, False)
+        text = pending + self.decode(decoder, b"", True)
+        if text:
+            yield from StringIO(text, newline="")
+
+    def close(self):
+        """Stop reading the blocks, e.g. when validation stopped early"""
+        close = getattr(self.blocks, "close", None)
+        if close is not None:
+            close()
+
+    def start(self, head):
+        """Return the decoder for the bytes starting with `head`, and the bytes
+        of `head` to decode"""
+        self.codec, self.bom = resolve(self.encoding, head)
+        self.ascii_compatible = ascii_compatible(self.codec)
+        decoder = codecs.getincrementaldecoder(self.codec)(
+            "vladiate.report" if self.errors == "strict" else self.errors
+        )
+        return decoder, head[self.bom :]
+
+    def decode(self, decoder, data, final):
+        if self.errors != "strict":
+            return decoder.decode(data, final)
+        _found.errors = found = []
+        text = decoder.decode(data, final)
+        for decoded, start, _, reason in found:
+            self.invalid_count += 1
+            if len(self.invalid) < self.max_errors:
+                # The decoder sees the bytes it had buffered, then `data`, and
+                # only the bytes of a partial character were left pending
+                before = decoded[:start]
+                if self.ascii_compatible:
+                    breaks = before.count(b"\n")
+                else:
+                    breaks = before.decode(self.codec, "replace").count("\n")
+                self.invalid.append(
+                    (
+                        self.line + breaks + 1,
+                        "Invalid {}: {}".format(self.codec.upper(), reason),
+                    )
+                )
+        return text
+
+
+def invalid_sequences(data, codec):
+    """Return the (start, end, reason) of each invalid byte sequence in
+    `data`"""
+    _found.errors = found = []
+    codecs.decode(data, codec, "vladiate.report")
+    return [error[1:] for error in found]
+
+
+# The (bytes, start, end, reason) of the decoding errors found by the
+# `vladiate.report` handler
+_found = threading.local()
+
+
+def _replace_and_report(error):
+    # Decoders reuse the same exception for every error they find
+    _found.errors.append((error.object, error.start, error.end, error.reason))
+    return "\ufffd", error.end
+
+
+codecs.register_error("vladiate.report", _replace_and_report)
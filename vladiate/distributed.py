@@ -0,0 +1,390 @@
+"""Validate sources across several hosts
+
+A coordinator splits the sources of the Vlads to validate into tasks (whole
+sources, the parts of a `MultiFile`, or byte-range chunks of sources which
+support `read_range()`), and
+hands them out to workers over a simple line-delimited JSON protocol on TCP:
+
+    worker:      {"type": "request"}
+    coordinator: {"type": "task", "id": 0, "vlad": "...", ...}
+    worker:      {"type": "result", "id": 0, "passed": true, ...}
+    coordinator: {"type": "ok"}
+    ...
+    coordinator: {"type": "done"}
+
+While the last tasks are still being validated, the coordinator answers
+requests with `{"type": "wait"}`, so idle workers stay around to pick up
+tasks again if another worker goes away.
+
+Workers load the same vladfile as the coordinator, validate their shard, and
+send back the serialized state of each validator (see `Vlad.state()`), which
+the coordinator merges into a single report per Vlad. Tasks held by a worker
+that disconnects are handed out again.
+"""
+
+import base64
+import json
+import socket
+import threading
+import time
+from collections import deque
+
+import socketserver
+
+from vladiate import logs
+from vladiate.exceptions import MissingExtraException
+from vladiate.inputs import Chunk, MultiFile
+from vladiate.validators import deserialize_state, serialize_state
+from vladiate.vlad import Plan
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+# The read errors of every shard of a Vlad which are kept, as in a single run
+MAX_READ_ERRORS = 100
+
+
+def parse_address(address):
+    """Turn a `HOST:PORT` string into a (host, port) tuple"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _send(f, message):
+    f.write((json.dumps(message) + "\n").encode("utf-8"))
+    f.flush()
+
+
+def _receive(f):
+    line = f.readline()
+    if not line:
+        raise EOFError
+    return json.loads(line.decode("utf-8"))
+
+
+def compile_vlad(vlad):
+    """Return the `Plan` of a Vlad class, or `vlad` if it already is one"""
+    return vlad if isinstance(vlad, Plan) else vlad.compile()
+
+
+def fresh(vlad_class, source=None, quiet=False):
+    """Instantiate a Vlad class (or `Plan`) with validators of its own"""
+    return compile_vlad(vlad_class).vlad(source, quiet=quiet)
+
+
+def run_task(vlads, task, quiet=True, **options):
+    """Validate the shard described by `task`, and return the result message
+
+    `vlads` maps names to Vlad classes or, to only set up their validators
+    once for every task, to their `Plan`s. `options` (such as `fail_fast` or
+    `progress`) are passed on to the Vlad."""
+    plan = compile_vlad(vlads[task["vlad"]])
+    source = plan.vlad_class.source
+    if task.get("part") is not None:
+        source = source.parts[task["part"]]
+    if task["start"] is not None:
+        source = Chunk(source, task["header_end"], task["start"], task["end"])
+    vlad = plan.vlad(source, quiet=quiet, **options)
+    state = error = None
+    try:
+        # Aggregates are only checked by the coordinator, once every shard is in
+        passed = vlad.validate(finish=False)
+        state = base64.b64encode(serialize_state(vlad.state())).decode("ascii")
+    except Exception as e:
+        # A shard which can't be validated fails, rather than killing the
+        # worker (and every worker it would be handed out to next)
+        passed = False
+        error = "{}: {}".format(e.__class__.__name__, e)
+    return {
+        "type": "result",
+        "id": task["id"],
+        "source": repr(source),
+        "passed": passed,
+        "rows": vlad.line_count,
+        "bytes": vlad.bytes_read,
+        "elapsed": vlad.elapsed,
+        "state": state,
+        "error": error,
+        # The reasons a shard failed besides its validators
+        "read_errors": [list(read_error) for read_error in vlad.read_errors],
+        "read_error_count": vlad.read_error_count,
+        "missing_fields": sorted(vlad.missing_fields or []),
+        "missing_validators": sorted(vlad.missing_validators or []),
+    }
+
+
+def split_source(vlad_class, source, chunk_size, quiet=False):
+    """Return the (header end, start, end) of the chunks of about
+    `chunk_size` bytes to split a source into, or a single range of `None` to
+    validate it whole
+
+    The chunks start where records do, as found by a `structure.scan()` of
+    the source, so that quoted fields with line breaks aren't cut through.
+    """
+    from vladiate import structure
+
+    ranges = [(None, None, None)]
+    try:
+        size = source.size()
+    except (NotImplementedError, OSError, MissingExtraException):
+        # Sources which can't be read are validated whole, and fail with
+        # the error of reading them like any other task
+        size = None
+    if size is not None and size > chunk_size:
+        vlad = fresh(vlad_class, source, quiet=quiet)
+        if vlad.sniff:
+            vlad._sniff_dialect()
+        with vlad._limit_field_size():
+            scanned = structure.scan(
+                source, vlad._reader_kwargs(), max_errors=0, chunk_size=chunk_size
+            )
+        ranges = [
+            (chunk.header_end, chunk.start, chunk.end)
+            for chunk in scanned.chunks(source)
+        ] or ranges
+    return ranges
+
+
+def combine(name, vlad_class, results, quiet=False):
+    """Merge the results of the tasks of a Vlad into a new instance, log the
+    outcome, and return the instance, with `passed` set"""
+    vlad = fresh(vlad_class, quiet=quiet)
+    for result in results:
+        # Shards which raised have no state to merge, and fail the Vlad
+        if result["state"] is not None:
+            vlad.merge(deserialize_state(base64.b64decode(result["state"])))
+    vlad.finish()
+    vlad.passed = all(result["passed"] for result in results) and not any(
+        validator.fail_count
+        for validators in [vlad.row_validators] + list(vlad.validators.values())
+        for validator in validators
+    )
+    vlad.elapsed = sum(result.get("elapsed", 0.0) for result in results)
+    vlad.bytes_read = sum(result.get("bytes", 0) for result in results)
+    # Line numbers of read errors are those of the shard they were found in
+    read_errors = [
+        (line, "{} (in {})".format(message, result["source"]))
+        for result in results
+        for line, message in result.get("read_errors", [])
+    ]
+    vlad.read_errors = read_errors[:MAX_READ_ERRORS]
+    vlad.read_error_count = sum(result.get("read_error_count", 0) for result in results)
+    vlad.missing_fields = set().union(
+        *[result.get("missing_fields", []) for result in results]
+    )
+    vlad.missing_validators = set().union(
+        *[result.get("missing_validators", []) for result in results]
+    )
+    vlad.logger.info(
+        "\nValidating {}(source={}) in {} task(s)".format(
+            name, vlad.source, len(results)
+        )
+    )
+    if vlad.passed:
+        vlad.logger.info("\033[0;32m" + "Passed! :)" + "\033[0m")
+    else:
+        vlad.logger.info("\033[0;31m" + "Failed :(" + "\033[0m")
+        for result in results:
+            if result.get("error"):
+                vlad.logger.error(
+                    "  {} could not be validated: {}".format(
+                        result["source"], result["error"]
+                    )
+                )
+        if vlad.missing_validators:
+            vlad._log_missing_validators()
+        if vlad.missing_fields:
+            vlad._log_missing_fields()
+        if vlad.line_count:
+            vlad._log_validator_failures()
+        if vlad.read_error_count:
+            vlad._log_read_errors()
+    return vlad
+
+
+class Coordinator(object):
+    """Hand out tasks to workers and combine their results"""
+
+    def __init__(
+        self,
+        vlads,
+        address=("127.0.0.1", 0),
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        quiet=False,
+    ):
+        self.vlads = vlads
+        self.chunk_size = chunk_size
+        self.quiet = quiet
+        self.logger = logs.logger
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.pending = deque(self.plan())
+        self.outstanding = {}
+        self.results = {}
+        self.tasks = {task["id"]: task for task in self.pending}
+        self.server = _Server(address, _CoordinatorHandler, self)
+        self.address = self.server.server_address
+        if not self.tasks:
+            self.finished.set()
+
+    def plan(self):
+        tasks = []
+        for name, vlad_class in sorted(self.vlads.items()):
+            # The parts of a `MultiFile` are validated separately
+            parts = [(None, vlad_class.source)]
+            if isinstance(vlad_class.source, MultiFile):
+                parts = list(enumerate(vlad_class.source.parts))
+            for part, source in parts:
+                for header_end, start, end in self.split(vlad_class, source):
+                    tasks.append(
+                        {
+                            "type": "task",
+                            "id": len(tasks),
+                            "vlad": name,
+                            "part": part,
+                            "header_end": header_end,
+                            "start": start,
+                            "end": end,
+                        }
+                    )
+        return tasks
+
+    def split(self, vlad_class, source):
+        """Return the (header end, start, end) of the chunks to split a source
+        into, or a single range of `None` to validate it whole"""
+        return split_source(vlad_class, source, self.chunk_size, quiet=self.quiet)
+
+    def next_task(self):
+        """Return the next task to hand out, `None` when every task is done, or
+        a message asking the worker to wait while others might still fail"""
+        with self.lock:
+            if not self.pending:
+                return {"type": "wait"} if self.outstanding else None
+            task = self.pending.popleft()
+            self.outstanding[task["id"]] = task
+            return task
+
+    def requeue(self, task_id):
+        with self.lock:
+            task = self.outstanding.pop(task_id, None)
+            if task is not None:
+                self.pending.appendleft(task)
+
+    def complete(self, result):
+        """Record the result of a task, which is done even if it failed with
+        an error: handing it out again would only fail again"""
+        with self.lock:
+            task = self.outstanding.pop(result["id"], None)
+            if task is None:
+                return
+            if result.get("error"):
+                self.logger.error(
+                    "Task {} of {} failed: {}".format(
+                        task["id"], task["vlad"], result["error"]
+                    )
+                )
+            self.results[result["id"]] = result
+            if len(self.results) == len(self.tasks):
+                self.finished.set()
+
+    def serve(self):
+        """Serve tasks until every one of them has a result"""
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            while not self.finished.wait(0.1):
+                pass
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return self.report()
+
+    def report(self):
+        """Combine the results of every task, log them, and return whether
+        every Vlad passed"""
+        all_passed = True
+        for name, vlad_class in sorted(self.vlads.items()):
+            results = [
+                result
+                for task_id, result in sorted(self.results.items())
+                if self.tasks[task_id]["vlad"] == name
+            ]
+            vlad = combine(name, vlad_class, results, quiet=self.quiet)
+            all_passed = all_passed and vlad.passed
+        return all_passed
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, coordinator):
+        self.coordinator = coordinator
+        socketserver.TCPServer.__init__(self, address, handler)
+
+
+class _CoordinatorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator = self.server.coordinator
+        task = None
+        try:
+            while True:
+                message = _receive(self.rfile)
+                if message["type"] == "request":
+                    task = coordinator.next_task()
+                    _send(self.wfile, task or {"type": "done"})
+                    if task is None:
+                        return
+                    if task["type"] == "wait":
+                        task = None
+                elif message["type"] == "result":
+                    coordinator.complete(message)
+                    task = None
+                    _send(self.wfile, {"type": "ok"})
+        except (EOFError, ValueError, socket.error):
+            pass
+        finally:
+            if task is not None:
+                coordinator.requeue(task["id"])
+
+
+class Worker(object):
+    """Request tasks from a coordinator until there are none left"""
+
+    def __init__(self, vlads, address, quiet=True, connect_timeout=30):
+        self.vlads = {name: compile_vlad(vlad) for name, vlad in vlads.items()}
+        self.address = address
+        self.quiet = quiet
+        self.connect_timeout = connect_timeout
+
+    def connect(self):
+        """Connect to the coordinator, waiting for it to start if need be"""
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection(self.address)
+            except socket.error:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.1)
+
+    def run(self):
+        """Returns the number of tasks completed"""
+        completed = 0
+        connection = self.connect()
+        f = connection.makefile("rwb")
+        try:
+            while True:
+                _send(f, {"type": "request"})
+                task = _receive(f)
+                if task["type"] == "done":
+                    return completed
+                if task["type"] == "wait":
+                    time.sleep(0.5)
+                    continue
+                _send(f, run_task(self.vlads, task, quiet=self.quiet))
+                _receive(f)
+                completed += 1
+        finally:
+            f.close()
+            connection.close()
@@ -1,7 +1,24 @@
 class ValidationException(Exception):
-    """Thrown when validation fails"""
+    """Thrown when validation fails
 
-    pass
+    The message can be a template, formatted with `values` (e.g. the field
+    which failed), so that the failures of a validation keep each template
+    only once (see `vladiate.failures.FailureLog`).
+    """
+
+    @property
+    def template(self):
+        return self.args[0] if len(self.args) > 1 else None
+
+    @property
+    def values(self):
+        return self.args[1:]
+
+    def __str__(self):
+        # Only formatted when shown, as most failures are only ever counted
+        if len(self.args) > 1:
+            return self.args[0].format(*self.args[1:])
+        return super(ValidationException, self).__str__()
 
 
 class BadValidatorException(Exception):
@@ -0,0 +1,93 @@
+"""Compact storage for the failures of a validation"""
+
+from array import array
+from collections import defaultdict
+
+# The line of failures found once every row was validated, see `Vlad.finish()`
+END = -1
+
+
+class FailureLog(object):
+    """The failures of a validation, stored column-wise
+
+    Each failure takes up 22 bytes: 14 for its line, validator and template
+    ids, and a reference to the value (or values) its message is formatted
+    with, such as the field which failed. Validators are numbered by (field
+    name, validator), and message templates (see `ValidationException`) are
+    kept once however many failures share them, so no exception (nor the rows
+    its traceback would keep alive) outlives the validation.
+    """
+
+    __slots__ = (
+        "lines",
+        "validator_ids",
+        "template_ids",
+        "values",
+        "validators",
+        "templates",
+    )
+
+    def __init__(self):
+        self.lines = array("q")
+        self.validator_ids = array("H")
+        self.template_ids = array("I")
+        self.values = []
+        # The (field name, validator) and (template, number of values) of each
+        # id, and back
+        self.validators = {}
+        self.templates = {}
+
+    def add(self, line, field_name, validator, message):
+        """Record a failure, `line` being `None` once every row was validated,
+        and `field_name` `None` for row validators"""
+        key = (field_name, validator)
+        validator_id = self.validators.get(key)
+        if validator_id is None:
+            validator_id = self.validators[key] = len(self.validators)
+            if validator_id > 0xFFFF:
+                self.validator_ids = array("I", self.validator_ids)
+        values = getattr(message, "values", ())
+        # Messages with a single value keep it as is, rather than in a tuple
+        key = (message.template, min(len(values), 2)) if values else (str(message), 0)
+        template_id = self.templates.get(key)
+        if template_id is None:
+            template_id = self.templates[key] = len(self.templates)
+        self.lines.append(END if line is None else line)
+        self.validator_ids.append(validator_id)
+        self.template_ids.append(template_id)
+        self.values.append(values[0] if len(values) == 1 else values or None)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        """Yield the (line, field name, validator, message) of each failure"""
+        validators = list(self.validators)
+        templates = list(self.templates)
+        for line, validator_id, template_id, values in zip(
+            self.lines, self.validator_ids, self.template_ids, self.values
+        ):
+            field_name, validator = validators[validator_id]
+            message, arity = templates[template_id]
+            if arity == 1:
+                message = message.format(values)
+            elif arity:
+                message = message.format(*values)
+            yield (None if line == END else line, field_name, validator, message)
+
+    def by_field(self):
+        """Return the messages of the failures of field validators, by field
+        name and then line"""
+        failures = defaultdict(lambda: defaultdict(list))
+        for line, field_name, _, message in self:
+            if field_name is not None:
+                failures[field_name][line].append(message)
+        return failures
+
+    def by_line(self):
+        """Return the messages of the failures of row validators, by line"""
+        failures = defaultdict(list)
+        for line, field_name, _, message in self:
+            if field_name is None:
+                failures[line].append(message)
+        return failures
@@ -0,0 +1,153 @@
+"""On-disk indexes of the values of a field of a source
+
+An index is a sorted array of 64-bit hashes of every value of a field,
+written to a cache directory and memory-mapped, so that it is only built once
+for every Vlad (and process) that looks values up in it. Indexes remember the
+`fingerprint()` of the source they were built from, and are rebuilt when it
+changes.
+
+Since only hashes are kept, a value missing from the source has a tiny (about
+one in 2**64 per distinct value) chance of being found anyway.
+"""
+
+import csv
+import hashlib
+import os
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+
+MAGIC = b"VLADIDX1"
+
+# The header is the magic, then the length of the fingerprint, then the
+# fingerprint itself, padded so the hashes which follow are 8-byte aligned
+_HEADER = struct.Struct("<8sI")
+
+# Indexes loaded in this process, by path, along with the fingerprint of the
+# source they were built from
+_loaded = {}
+_lock = threading.Lock()
+
+
+def default_cache_dir():
+    """Return the directory indexes are written to, `$VLADIATE_CACHE_DIR` if
+    set"""
+    import tempfile
+
+    return os.environ.get("VLADIATE_CACHE_DIR") or os.path.join(
+        tempfile.gettempdir(), "vladiate-cache"
+    )
+
+
+def hash_value(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class KeyIndex(object):
+    """An index of the values of `field` in `source`, a `VladInput`
+
+    Sources without a `fingerprint()` are indexed in memory only, once per
+    process.
+    """
+
+    def __init__(self, source, field, cache_dir=None, dialect="excel"):
+        self.source = source
+        self.field = field
+        self.cache_dir = cache_dir
+        self.dialect = dialect
+        self.hashes = None
+
+    def __reduce__(self):
+        # Copies (e.g. of the class validators of a Vlad) load the index again,
+        # which finds it in `_loaded`
+        return KeyIndex, (self.source, self.field, self.cache_dir, self.dialect)
+
+    @property
+    def path(self):
+        name = hashlib.blake2b(
+            "{!r}\0{}\0{}".format(self.source, self.field, self.dialect).encode(
+                "utf-8"
+            ),
+            digest_size=16,
+        ).hexdigest()
+        return os.path.join(self.cache_dir or default_cache_dir(), name + ".idx")
+
+    def __contains__(self, value):
+        hashes = self.hashes
+        if hashes is None:
+            hashes = self.load()
+        h = hash_value(value)
+        i = bisect_left(hashes, h)
+        return i < len(hashes) and hashes[i] == h
+
+    def __len__(self):
+        return len(self.hashes if self.hashes is not None else self.load())
+
+    def load(self):
+        """Load the index, building it first if there is no up to date index
+        of the source, and return the sorted hashes"""
+        fingerprint = self.source.fingerprint()
+        path = self.path if fingerprint is not None else repr(self.source)
+        key = (path, self.field, self.dialect)
+        with _lock:
+            loaded = _loaded.get(key)
+            if loaded is None or loaded[0] != fingerprint:
+                hashes = None
+                if fingerprint is not None:
+                    hashes = _read(path, fingerprint)
+                if hashes is None:
+                    hashes = self.build()
+                    if fingerprint is not None:
+                        _write(path, fingerprint, hashes)
+                        hashes = _read(path, fingerprint)
+                loaded = _loaded[key] = (fingerprint, hashes)
+        self.hashes = loaded[1]
+        return self.hashes
+
+    def build(self):
+        """Read the source, and return the sorted hashes of its values"""
+        reader = csv.DictReader(self.source.open(), dialect=self.dialect)
+        if self.field not in (reader.fieldnames or []):
+            raise ValueError(
+                "{!r} has no field '{}' to index".format(self.source, self.field)
+            )
+        return array("Q", sorted({hash_value(row[self.field] or "") for row in reader}))
+
+
+def _read(path, fingerprint):
+    """Return the hashes of the index at `path`, or `None` if there is none or
+    it was built from another version of the source"""
+    import mmap
+
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, length = _HEADER.unpack_from(data)
+    except struct.error:
+        return None
+    start = _HEADER.size + length
+    if magic != MAGIC or data[_HEADER.size : start] != fingerprint.encode("utf-8"):
+        return None
+    start += -start % 8
+    if (len(data) - start) % 8:
+        return None
+    return memoryview(data)[start:].cast("Q")
+
+
+def _write(path, fingerprint, hashes):
+    """Atomically write an index, so other processes never read a partial one"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fingerprint = fingerprint.encode("utf-8")
+    header = _HEADER.pack(MAGIC, len(fingerprint)) + fingerprint
+    header += b"\0" * (-len(header) % 8)
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        hashes.tofile(f)
+    os.replace(tmp_path, path)
@@ -1,4 +1,9 @@
-import io
+import codecs
+import os
+import sys
+import threading
+from collections import deque
+from itertools import islice
 
 try:
     from urlparse import urlparse
@@ -9,18 +14,62 @@ try:
 except ImportError:
     from io import StringIO
 
+from vladiate import decoding
 from vladiate.exceptions import MissingExtraException
 
 
 class VladInput(object):
     """A generic input class"""
 
+    # How the bytes of the input are decoded, see `decoding.DecodedLines`:
+    # `None` lets a byte order mark tell, and defaults to UTF-8
+    encoding = None
+    errors = "strict"
+
     def __init__(self):
         raise NotImplementedError
 
     def open(self):
         raise NotImplementedError
 
+    def codec(self):
+        """Return the (codec, BOM length) the input is decoded with"""
+        return decoding.resolve(self.encoding, self.read_head(4))
+
+    def read_head(self, size):
+        """Return (at most) the first `size` bytes of the input
+
+        Subclasses should override this if they can avoid reading the whole
+        input to get at its beginning (or support `read_range()`).
+        """
+        try:
+            return self.read_range(0, size)
+        except NotImplementedError:
+            pass
+        head = b""
+        for line in self.open():
+            head += line if isinstance(line, bytes) else line.encode("utf-8")
+            if len(head) >= size:
+                break
+        return head[:size]
+
+    def size(self):
+        """Return the size of the input in bytes, or `None` if it is unknown"""
+        return None
+
+    def read_range(self, start, end):
+        """Return the bytes of the input from offset `start` up to `end`
+
+        Inputs which support this can be sampled (and split) without being
+        read in their entirety.
+        """
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Return a string which changes whenever the contents of the input
+        do, or `None` if there is no cheap way to tell"""
+        return None
+
     def __repr__(self):
         raise NotImplementedError
 
@@ -28,12 +77,36 @@ class VladInput(object):
 class LocalFile(VladInput):
     """Read from a local file path"""
 
-    def __init__(self, filename):
+    def __init__(self, filename, encoding=None, errors="strict"):
         self.filename = filename
+        self.encoding, self.errors = _check_codec(encoding, errors)
 
     def open(self):
-        with open(self.filename, "r") as f:
-            return f.readlines()
+        return decoding.DecodedLines(self._blocks(), self.encoding, self.errors)
+
+    def _blocks(self):
+        with open(self.filename, "rb") as f:
+            while True:
+                block = f.read(decoding.BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+
+    def read_head(self, size):
+        with open(self.filename, "rb") as f:
+            return f.read(size)
+
+    def size(self):
+        return os.path.getsize(self.filename)
+
+    def read_range(self, start, end):
+        with open(self.filename, "rb") as f:
+            f.seek(start)
+            return f.read(max(end - start, 0))
+
+    def fingerprint(self):
+        stat = os.stat(self.filename)
+        return "{}:{}".format(stat.st_size, stat.st_mtime_ns)
 
     def __repr__(self):
         return "{}('{}')".format(self.__class__.__name__, self.filename)
@@ -42,17 +115,13 @@ class LocalFile(VladInput):
 class S3File(VladInput):
     """Read from a file in S3"""
 
-    def __init__(self, path=None, bucket=None, key=None):
-        try:
-            import boto  # noqa
-
-            self.boto = boto
-        except ImportError:
-            # 2.7 workaround, should just be `raise Exception() from None`
-            exc = MissingExtraException()
-            exc.__context__ = None
-            raise exc
+    # boto is only imported once the file is actually read, so that listing
+    # or loading a vladfile doesn't pay for it
+    boto = None
 
+    def __init__(
+        self, path=None, bucket=None, key=None, encoding=None, errors="strict"
+    ):
         if path and not any((bucket, key)):
             self.path = path
             parse_result = urlparse(path)
@@ -61,24 +130,351 @@ class S3File(VladInput):
         elif all((bucket, key)):
             self.bucket = bucket
             self.key = key
-            self.path = "s3://{}{}"
+            self.path = "s3://{}{}".format(bucket, key)
         else:
             raise ValueError(
                 "Either 'path' argument or 'bucket' and 'key' argument must " "be set."
             )
+        self.encoding, self.errors = _check_codec(encoding, errors)
+
+    def _connect(self):
+        if self.boto is None:
+            try:
+                import boto  # noqa
+
+                self.boto = boto
+            except ImportError:
+                # 2.7 workaround, should just be `raise Exception() from None`
+                exc = MissingExtraException()
+                exc.__context__ = None
+                raise exc
+        return self.boto.connect_s3()
 
     def open(self):
-        s3 = self.boto.connect_s3()
+        s3 = self._connect()
+        bucket = s3.get_bucket(self.bucket)
+        key = bucket.new_key(self.key)
+        contents = bytes(key.get_contents_as_string())
+        blocks = (
+            contents[start : start + decoding.BLOCK_SIZE]
+            for start in range(0, len(contents), decoding.BLOCK_SIZE)
+        )
+        return decoding.DecodedLines(blocks, self.encoding, self.errors)
+
+    def read_head(self, size):
+        return self.read_range(0, size)
+
+    def size(self):
+        s3 = self._connect()
+        return s3.get_bucket(self.bucket).get_key(self.key).size
+
+    def fingerprint(self):
+        s3 = self._connect()
+        return s3.get_bucket(self.bucket).get_key(self.key).etag
+
+    def read_range(self, start, end):
+        if end <= start:
+            return b""
+        s3 = self._connect()
         bucket = s3.get_bucket(self.bucket)
         key = bucket.new_key(self.key)
-        contents = key.get_contents_as_string()
-        ret = io.BytesIO(bytes(contents))
-        return ret
+        # A ranged GET, so only the requested bytes are transferred
+        return bytes(
+            key.get_contents_as_string(
+                headers={"Range": "bytes={}-{}".format(start, end - 1)}
+            )
+        )
+
+    def __repr__(self):
+        return "{}('{}')".format(self.__class__.__name__, self.path)
+
+
+class Chunk(VladInput):
+    """Read a byte range of another input, along with its header row
+
+    The source must support `read_range()`. `header_end` is the offset at
+    which the header row of the source ends, and `start` and `end` should fall
+    between records (see `distributed.split_source`).
+    """
+
+    def __init__(self, source, header_end, start, end):
+        self.source = source
+        self.header_end = header_end
+        self.start = start
+        self.end = end
+        self.encoding = source.encoding
+        self.errors = source.errors
+
+    def open(self):
+        # The header comes first, so any byte order mark is found as usual
+        blocks = (
+            self.source.read_range(0, self.header_end),
+            self.source.read_range(self.start, self.end),
+        )
+        return decoding.DecodedLines(blocks, self.encoding, self.errors)
+
+    def codec(self):
+        return self.source.codec()
+
+    def size(self):
+        return self.header_end + self.end - self.start
+
+    def fingerprint(self):
+        fingerprint = self.source.fingerprint()
+        if fingerprint is not None:
+            return "{}:{}:{}".format(fingerprint, self.start, self.end)
+
+    def __repr__(self):
+        return "{}({!r}, {}, {})".format(
+            self.__class__.__name__, self.source, self.start, self.end
+        )
+
+
+class MultiFile(VladInput):
+    """Read several inputs, such as the parts of a feed, as a single one
+
+    Every part starts with its own header row. Only the first one is kept,
+    and the header rows of the other parts must be the same (but for their
+    line ending): parts with another header are skipped, and reported like
+    undecodable bytes. Up to `prefetch` parts are read ahead in parallel
+    threads, each at most a few thousand lines ahead of the validation.
+    """
+
+    def __init__(self, parts, prefetch=4):
+        self._parts = list(parts)
+        self.prefetch = prefetch
+        self.pattern = None
+
+    @classmethod
+    def glob(cls, pattern, prefetch=4, encoding=None, errors="strict"):
+        """Read the local files matching `pattern` (or every `.csv` file in a
+        directory), in sorted order"""
+        import glob
+
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.csv")
+        filenames = sorted(glob.glob(pattern))
+        if not filenames:
+            raise ValueError("No files match '{}'".format(pattern))
+        multi_file = cls(
+            [LocalFile(filename, encoding, errors) for filename in filenames],
+            prefetch,
+        )
+        multi_file.pattern = pattern
+        return multi_file
+
+    @property
+    def parts(self):
+        return self._parts
+
+    @property
+    def encoding(self):
+        return self.parts[0].encoding
+
+    @property
+    def errors(self):
+        return self.parts[0].errors
+
+    def open(self):
+        return _PartLines(self.parts, self.prefetch)
+
+    def read_head(self, size):
+        return self.parts[0].read_head(size)
+
+    def codec(self):
+        return self.parts[0].codec()
+
+    def size(self):
+        sizes = [part.size() for part in self.parts]
+        if None not in sizes:
+            return sum(sizes)
+
+    def fingerprint(self):
+        import hashlib
+
+        fingerprints = [part.fingerprint() for part in self.parts]
+        if None not in fingerprints:
+            return hashlib.sha1("\0".join(fingerprints).encode("utf-8")).hexdigest()
+
+    def __repr__(self):
+        if self.pattern is not None:
+            return "{}('{}')".format(self.__class__.__name__, self.pattern)
+        shown = ", ".join(repr(part) for part in self._parts[:2])
+        if len(self._parts) > 2:
+            shown += ", ... {} parts".format(len(self._parts))
+        return "{}({})".format(self.__class__.__name__, shown)
+
+
+class S3Prefix(MultiFile):
+    """Read every file in S3 under a prefix as a single input, see
+    `MultiFile`
+
+    The files are listed (in sorted order) when first needed.
+    """
+
+    def __init__(self, path, prefetch=4, encoding=None, errors="strict"):
+        super(S3Prefix, self).__init__([], prefetch)
+        parse_result = urlparse(path)
+        self.path = path
+        self.bucket = parse_result.netloc
+        self.prefix = parse_result.path.lstrip("/")
+        self.encoding_, self.errors_ = _check_codec(encoding, errors)
+        self.listed = False
+
+    @property
+    def parts(self):
+        if not self.listed:
+            s3 = S3File(bucket=self.bucket, key="/" + self.prefix)._connect()
+            names = sorted(
+                key.name
+                for key in s3.get_bucket(self.bucket).list(prefix=self.prefix)
+                if not key.name.endswith("/")
+            )
+            if not names:
+                raise ValueError("No files under '{}'".format(self.path))
+            self._parts = [
+                S3File(
+                    bucket=self.bucket,
+                    key="/" + name,
+                    encoding=self.encoding_,
+                    errors=self.errors_,
+                )
+                for name in names
+            ]
+            self.listed = True
+        return self._parts
 
     def __repr__(self):
         return "{}('{}')".format(self.__class__.__name__, self.path)
 
 
+class _PartLines(object):
+    """The lines of the parts of a `MultiFile`, with the `invalid` lines of
+    the parts, like `decoding.DecodedLines`"""
+
+    def __init__(self, parts, prefetch):
+        self.parts = parts
+        self.prefetch = prefetch
+        self.header = None
+        self.line = 0
+        self.invalid = []
+        self.invalid_count = 0
+
+    def __iter__(self):
+        if not self.prefetch:
+            for part in self.parts:
+                opened = part.open()
+                yield from self.part_lines(part, opened, opened)
+            return
+        parts = iter(self.parts)
+        ahead = deque(_PartReader(part) for part in islice(parts, self.prefetch))
+        try:
+            while ahead:
+                reader = ahead[0]
+                ahead.extend(_PartReader(part) for part in islice(parts, 1))
+                yield from self.part_lines(reader.part, reader, reader.lines())
+                ahead.popleft()
+        finally:
+            # Stop reading the parts ahead, if validation stopped early
+            for reader in ahead:
+                reader.stop()
+
+    def part_lines(self, part, opened, lines):
+        """Yield the lines of a part, but for its header unless it is the
+        first one"""
+        lines = iter(lines)
+        # The line of the source before the first line of the part
+        offset = self.line
+        for header in lines:
+            if self.header is None:
+                self.header = header.rstrip("\r\n")
+                self.line += 1
+                yield header
+            elif header.rstrip("\r\n") != self.header:
+                self.report(
+                    self.line + 1, "{!r}: header differs from the first part's", part
+                )
+                return
+            else:
+                offset -= 1
+            break
+        for line in lines:
+            self.line += 1
+            yield line
+        # Undecodable bytes are reported along with the part they are in
+        self.invalid_count += getattr(opened, "invalid_count", 0)
+        for line, message in getattr(opened, "invalid", []):
+            self.invalid_count -= 1
+            self.report(offset + line, "{!r}: line {}: {}", part, line, message)
+
+    def report(self, line, message, *args):
+        self.invalid_count += 1
+        if len(self.invalid) < 100:
+            self.invalid.append((line, message.format(*args)))
+
+
+class _PartReader(object):
+    """Read the lines of a part in a thread, in batches of `batch_size` lines,
+    at most `batches` of which are kept waiting for `lines()`"""
+
+    def __init__(self, part, batches=4, batch_size=1024):
+        from queue import Queue
+
+        self.part = part
+        self.batch_size = batch_size
+        self.queue = Queue(batches)
+        self.stopped = False
+        self.opened = None
+        thread = threading.Thread(target=self.run)
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def invalid(self):
+        return getattr(self.opened, "invalid", [])
+
+    @property
+    def invalid_count(self):
+        return getattr(self.opened, "invalid_count", 0)
+
+    def run(self):
+        try:
+            self.opened = self.part.open()
+            lines = iter(self.opened)
+            while not self.stopped:
+                batch = list(islice(lines, self.batch_size))
+                self.queue.put(batch)
+                if not batch:
+                    break
+        except Exception as e:
+            self.queue.put(e)
+        finally:
+            close = getattr(self.opened, "close", None)
+            if close is not None:
+                close()
+
+    def lines(self):
+        while True:
+            batch = self.queue.get()
+            if isinstance(batch, Exception):
+                raise batch
+            if not batch:
+                return
+            yield from batch
+
+    def stop(self):
+        from queue import Empty
+
+        self.stopped = True
+        # Make room for any batch the thread is waiting to put, after which
+        # it sees that it was stopped
+        while True:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                break
+
+
 class String(VladInput):
     """Read a file from a string"""
 
@@ -86,7 +482,88 @@ class String(VladInput):
         self.string_io = string_io if string_io else StringIO(string_input)
 
     def open(self):
-        return self.string_io
+        # A new stream each time, so the string can be read more than once at
+        # a time (e.g. to count rows for `file_validation_failure_threshold`)
+        return StringIO(self.string_io.getvalue())
+
+    def read_head(self, size):
+        return self.string_io.getvalue()[:size].encode("utf-8")[:size]
+
+    def fingerprint(self):
+        import hashlib
+
+        return hashlib.sha1(self.string_io.getvalue().encode("utf-8")).hexdigest()
 
     def __repr__(self):
         return "{}('{}')".format(self.__class__.__name__, "...")
+
+
+class Stdin(VladInput):
+    """Read from standard input (or another binary stream, such as a pipe),
+    as it comes
+
+    The stream is read in blocks of at most `decoding.BLOCK_SIZE` bytes, so
+    only a few rows are held in memory at a time. As a stream can only be
+    read once, so can this input: what `read_head()` reads is kept, and read
+    again by `open()`, but anything which reads the whole source before
+    validating it (like `file_validation_failure_threshold` or
+    `structure_check`) isn't supported. The stream is closed once read, or
+    when validation stops early (see `Vlad.fail_fast`), so that a process
+    writing to a pipe gets an error rather than blocking forever.
+    """
+
+    def __init__(self, stream=None, encoding=None, errors="strict"):
+        if stream is None:
+            stream = sys.stdin.buffer
+        self.stream = stream
+        self.encoding, self.errors = _check_codec(encoding, errors)
+        self.head = b""
+        self.opened = False
+
+    def open(self):
+        if self.opened:
+            raise ValueError("{!r} can only be read once".format(self))
+        self.opened = True
+        return decoding.DecodedLines(self._blocks(), self.encoding, self.errors)
+
+    def _read(self, size):
+        # `read1` returns what is available rather than waiting for `size`
+        # bytes, if the stream is buffered
+        return getattr(self.stream, "read1", self.stream.read)(size)
+
+    def _blocks(self):
+        try:
+            if self.head:
+                yield self.head
+                self.head = b""
+            while True:
+                block = self._read(decoding.BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+        finally:
+            self.close()
+
+    def read_head(self, size):
+        if self.opened:
+            raise ValueError("{!r} can only be read once".format(self))
+        while len(self.head) < size:
+            block = self._read(size - len(self.head))
+            if not block:
+                break
+            self.head += block
+        return self.head[:size]
+
+    def close(self):
+        self.stream.close()
+
+    def __repr__(self):
+        return "{}()".format(self.__class__.__name__)
+
+
+def _check_codec(encoding, errors):
+    """Fail early on an unknown encoding or error handler"""
+    if encoding is not None:
+        codecs.lookup(encoding)
+    codecs.lookup_error(errors)
+    return encoding, errors
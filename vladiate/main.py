@@ -1,12 +1,13 @@
-from importlib.metadata import version
-from multiprocessing import Pool, Queue
 from vladiate import Vlad
 from vladiate import logs
 from vladiate import exits
+from vladiate.inputs import Stdin
+from vladiate.progress import Aggregator, QueueReporter, make_reporter
+from vladiate import metrics
 
 import os
 import sys
-import inspect
+import threading
 from argparse import ArgumentParser
 
 
@@ -64,8 +65,69 @@ def parse_args():
         "--processes",
         dest="processes",
         default=1,
+        type=_processes,
+        help="attempt to use this number of processes, or 'auto' for one per "
+        "CPU (as long as there is enough memory available)",
+    )
+
+    # Estimate how long validations take from previous runs
+    parser.add_argument(
+        "--history",
+        dest="history",
+        default=None,
+        metavar="HISTORY_FILE",
+        help="record how long each validation took in this file, and use it "
+        "to schedule validations across processes in later runs",
+    )
+
+    # Validate standard input
+    parser.add_argument(
+        "--stdin",
+        action="store_true",
+        dest="stdin",
+        default=False,
+        help="validate standard input with the (single) vlad, as it is "
+        "read, instead of its source",
+    )
+
+    # Stop at the first invalid row
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        dest="fail_fast",
+        default=False,
+        help="stop validating a source at its first invalid row",
+    )
+
+    # Validate many sources in a single run
+    parser.add_argument(
+        "--sources",
+        dest="sources",
+        default=None,
+        metavar="MANIFEST",
+        help="validate each source listed in this file (one path, glob "
+        "pattern or s3:// URL per line, '-' for stdin) with the vlads, "
+        "instead of their own source. Also takes a directory or glob pattern",
+    )
+
+    # Validate sources on request
+    parser.add_argument(
+        "--serve",
+        dest="serve",
+        default=None,
+        metavar="ADDRESS",
+        help="keep running, and validate sources submitted over HTTP on this "
+        "address (HOST:PORT, or unix:PATH for a Unix socket) with -p worker "
+        "processes",
+    )
+
+    parser.add_argument(
+        "--max-queue",
+        dest="max_queue",
+        default=None,
         type=int,
-        help="attempt to use this number of processes",
+        help="with --serve, turn jobs away once this many are waiting for a "
+        "worker. Default: the number of processes",
     )
 
     # Disable vladiate classes console log output
@@ -78,7 +140,95 @@ def parse_args():
         help="disable console log output generated by validations",
     )
 
-    return parser.parse_args()
+    # Only check the header row of each source against its validators
+    parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        dest="schema_only",
+        default=False,
+        help="only check the header of each source for missing fields and "
+        "validators, without validating any rows",
+    )
+
+    # Report progress while validating
+    parser.add_argument(
+        "--progress",
+        dest="progress",
+        nargs="?",
+        const="terminal",
+        default=None,
+        choices=["terminal", "json"],
+        help="report rows processed, throughput, failures and ETA while "
+        "validating, either on the terminal (the default) or as JSON lines",
+    )
+
+    parser.add_argument(
+        "--progress-interval",
+        dest="progress_interval",
+        default=1.0,
+        type=float,
+        help="seconds between progress reports. Default: 1",
+    )
+
+    # Export metrics for Prometheus
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        default=None,
+        help="write Prometheus metrics to this file when done, e.g. for the "
+        "node_exporter textfile collector",
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        dest="metrics_port",
+        default=None,
+        type=int,
+        help="serve Prometheus metrics on this port of localhost while running",
+    )
+
+    # Distribute validation across hosts
+    parser.add_argument(
+        "--coordinator",
+        dest="coordinator",
+        default=None,
+        metavar="HOST:PORT",
+        help="listen on this address and hand out sources (or chunks of "
+        "sources) to workers, then report the combined results",
+    )
+
+    parser.add_argument(
+        "--worker",
+        dest="worker",
+        default=None,
+        metavar="HOST:PORT",
+        help="validate sources handed out by the coordinator at this address",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        default=64 * 1024 * 1024,
+        type=int,
+        help="with --coordinator, split sources larger than this many bytes "
+        "into chunks. Default: 64MiB",
+    )
+
+    arguments = parser.parse_args()
+    # Batch validation runs each source quietly in a pool of its own
+    if arguments.sources:
+        for option, dest in [
+            ("--schema-only", "schema_only"),
+            ("--progress", "progress"),
+            ("--history", "history"),
+        ]:
+            if getattr(arguments, dest):
+                parser.error("{} can't be used with --sources".format(option))
+    return arguments
+
+
+def _processes(value):
+    return value if value == "auto" else int(value)
 
 
 def is_vlad(tup):
@@ -87,7 +237,7 @@ def is_vlad(tup):
     """
     name, item = tup
     return bool(
-        inspect.isclass(item)
+        isinstance(item, type)
         and issubclass(item, Vlad)
         and hasattr(item, "source")
         and getattr(item, "source")
@@ -170,16 +320,75 @@ def load_vladfile(path):
     return imported.__doc__, vlads
 
 
+def _run(vlad, schema_only=False):
+    passed = vlad.check_schema() if schema_only else vlad.validate()
+    summary = vlad.summary()
+    summary["passed"] = passed
+    return summary
+
+
 def _vladiate(vlad):
-    global result_queue
+    arguments = parse_args()
+    progress = QueueReporter(progress_queue) if arguments.progress else None
+    if isinstance(vlad, tuple):
+        # A chunk of a large source, merged with the others by `main`
+        from vladiate import distributed
+
+        vlad, task = vlad
+        result = distributed.run_task(
+            {task["vlad"]: vlad},
+            task,
+            progress=progress,
+            progress_interval=arguments.progress_interval,
+            fail_fast=arguments.fail_fast,
+        )
+        result["vlad"] = task["vlad"]
+        result_queue.put(result)
+        return
     result_queue.put(
-        vlad(
-            vlad.source, validators=vlad.validators, quiet=parse_args().quiet
-        ).validate()
+        _run(
+            vlad(
+                vlad.source,
+                validators=vlad.validators,
+                quiet=arguments.quiet,
+                progress=progress,
+                progress_interval=arguments.progress_interval,
+                fail_fast=arguments.fail_fast,
+            ),
+            schema_only=arguments.schema_only,
+        )
     )
 
 
-result_queue = Queue()
+def _drain_progress(aggregator):
+    for snapshot in iter(progress_queue.get, None):
+        aggregator(snapshot)
+
+
+# Created by `_pool`, so that multiprocessing is only imported when needed
+result_queue = None
+progress_queue = None
+
+
+def _init_worker(results, progress):
+    global result_queue, progress_queue
+    result_queue = results
+    progress_queue = progress
+
+
+def _pool(processes):
+    """Start a pool of worker processes which share the result and progress
+    queues"""
+    global result_queue, progress_queue
+    from multiprocessing import Pool, Queue
+
+    if result_queue is None:
+        result_queue = Queue()
+    if progress_queue is None:
+        progress_queue = Queue()
+    return Pool(
+        processes, initializer=_init_worker, initargs=(result_queue, progress_queue)
+    )
 
 
 def main():
@@ -187,6 +396,8 @@ def main():
     logger = logs.logger
 
     if arguments.show_version:
+        from importlib.metadata import version
+
         print("Vladiate %s" % (version("vladiate"),))
         return exits.OK
 
@@ -220,26 +431,201 @@ def main():
             names = set(arguments.vlads) & set(vlads.keys())
             vlad_classes = [vlads[n] for n in names]
     else:
+        names = vlads.keys()
         vlad_classes = vlads.values()
 
+    processes = arguments.processes
+    if processes == "auto":
+        from vladiate import scheduling
+
+        processes = scheduling.auto_processes()
+
+    if arguments.worker:
+        from vladiate import distributed
+
+        worker = distributed.Worker(
+            vlads, distributed.parse_address(arguments.worker), quiet=arguments.quiet
+        )
+        worker.run()
+        return exits.OK
+
+    if arguments.coordinator:
+        from vladiate import distributed
+
+        coordinator = distributed.Coordinator(
+            {name: vlads[name] for name in names},
+            distributed.parse_address(arguments.coordinator),
+            chunk_size=arguments.chunk_size,
+            quiet=arguments.quiet,
+        )
+        passed = coordinator.serve()
+        return exits.OK if passed else exits.DATAERR
+
+    if arguments.serve:
+        from vladiate import server
+
+        try:
+            daemon = server.Server(
+                {
+                    name: vlads[name].compile(fail_fast=arguments.fail_fast)
+                    for name in names
+                },
+                server.parse_address(arguments.serve),
+                processes=processes,
+                max_queue=arguments.max_queue,
+                quiet=arguments.quiet,
+            )
+        except (OSError, ValueError) as e:
+            logger.error("Could not serve on {}: {}".format(arguments.serve, e))
+            return exits.UNAVAILABLE
+        logger.info("Serving on {}".format(arguments.serve))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return exits.OK
+
     # validate all the vlads, and collect the validations for a good exit
     # return code
+    registry = metrics.Registry()
+    if arguments.metrics_port:
+        metrics_server = metrics.serve(registry, arguments.metrics_port)
+
+    history = None
+    if arguments.history:
+        from vladiate import scheduling
+
+        history = scheduling.History(arguments.history)
+
     all_passed = True
-    if arguments.processes == 1:
+    if arguments.sources:
+        from vladiate import batch
+
+        try:
+            specs = batch.read_manifest(arguments.sources)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read the sources: {}".format(e))
+            return exits.NOINPUT
+        plans = {
+            name: vlads[name].compile(fail_fast=arguments.fail_fast) for name in names
+        }
+        summaries = batch.run(plans, specs, processes)
+        for summary in summaries:
+            registry.record(summary)
+        all_passed = batch.report(summaries, quiet=arguments.quiet)
+
+    elif arguments.stdin:
+        if len(vlad_classes) != 1:
+            logger.error("--stdin can only be validated by a single vlad")
+            return exits.UNAVAILABLE
+        (vlad,) = vlad_classes
+        summary = _run(
+            vlad(
+                source=Stdin(
+                    encoding=getattr(vlad.source, "encoding", None),
+                    errors=getattr(vlad.source, "errors", "strict"),
+                ),
+                quiet=arguments.quiet,
+                progress=(
+                    make_reporter(arguments.progress) if arguments.progress else None
+                ),
+                progress_interval=arguments.progress_interval,
+                fail_fast=arguments.fail_fast,
+            ),
+            schema_only=arguments.schema_only,
+        )
+        registry.record(summary)
+        all_passed = summary["passed"]
+
+    elif processes == 1:
         for vlad in vlad_classes:
-            passed = vlad(source=vlad.source, quiet=arguments.quiet).validate()
-            all_passed = all_passed and passed
+            summary = _run(
+                vlad(
+                    source=vlad.source,
+                    quiet=arguments.quiet,
+                    progress=(
+                        make_reporter(arguments.progress)
+                        if arguments.progress
+                        else None
+                    ),
+                    progress_interval=arguments.progress_interval,
+                    fail_fast=arguments.fail_fast,
+                ),
+                schema_only=arguments.schema_only,
+            )
+            registry.record(summary)
+            if history is not None:
+                history.record(summary)
+            all_passed = all_passed and summary["passed"]
 
     else:
-        proc_pool = Pool(
-            arguments.processes
-            if arguments.processes <= len(vlad_classes)
-            else len(vlad_classes)
+        from vladiate import distributed, scheduling
+
+        pools = []
+
+        def pool_map(function, jobs):
+            # Large sources are scanned for where to split them in parallel,
+            # by the pool which then validates their chunks
+            pools.append(_pool(processes))
+            return pools[0].map(function, jobs, chunksize=1)
+
+        # The longest jobs first, with large sources split into chunks
+        jobs = scheduling.schedule(
+            {name: vlads[name] for name in names},
+            processes,
+            history,
+            split=not arguments.schema_only,
+            map=pool_map,
         )
-        proc_pool.map(_vladiate, vlad_classes)
-        while not result_queue.empty():
-            passed = result_queue.get()
-            all_passed = all_passed and passed
+        proc_pool = pools[0] if pools else _pool(min(processes, len(jobs)))
+        # Progress from the workers is combined into a single report
+        if arguments.progress:
+            aggregator = Aggregator(
+                make_reporter(arguments.progress),
+                interval=arguments.progress_interval,
+            )
+            drain = threading.Thread(target=_drain_progress, args=(aggregator,))
+            drain.daemon = True
+            drain.start()
+        proc_pool.map(_vladiate, jobs, chunksize=1)
+        # Every job put one result on the queue, which has to be emptied
+        # before the workers can exit
+        results = [result_queue.get() for _ in jobs]
+        proc_pool.close()
+        proc_pool.join()
+        if arguments.progress:
+            progress_queue.put(None)
+            drain.join()
+            aggregator.finish()
+        summaries = []
+        chunks = {}
+        for result in results:
+            if result.get("type") == "result":
+                chunks.setdefault(result["vlad"], []).append(result)
+            else:
+                summaries.append(result)
+        for name, results in sorted(chunks.items()):
+            # Chunks are merged in the order of the source
+            results.sort(key=lambda result: result["id"])
+            vlad = distributed.combine(
+                name, vlads[name], results, quiet=arguments.quiet
+            )
+            summary = vlad.summary()
+            summary["vlad"] = name
+            summaries.append(summary)
+        for summary in summaries:
+            registry.record(summary)
+            if history is not None:
+                history.record(summary)
+            all_passed = all_passed and summary["passed"]
+
+    if history is not None:
+        history.save()
+
+    if arguments.metrics_file:
+        metrics.write_textfile(registry, arguments.metrics_file)
+    if arguments.metrics_port:
+        metrics_server.shutdown()
 
     return exits.OK if all_passed else exits.DATAERR
 
@@ -0,0 +1,170 @@
+"""Export validation metrics in the Prometheus text exposition format
+
+Metrics can either be written to a file for the node_exporter textfile
+collector, or served over HTTP for Prometheus to scrape.
+"""
+
+import os
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TIME_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join('{}="{}"'.format(key, _escape(value)) for key, value in labels)
+    )
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} counter".format(self.name),
+        ]
+        for key, value in sorted(self.values.items()):
+            lines.append("{}{} {}".format(self.name, _labels(key), _number(value)))
+        return lines
+
+
+class Histogram(object):
+    def __init__(self, name, documentation, buckets=TIME_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        counts, total = self.values.get(key, ([0] * len(self.buckets), 0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.values[key] = (counts, total + value)
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        for key, (counts, total) in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        self.name, _labels(key + (("le", _number(bound)),)), count
+                    )
+                )
+            lines.append("{}_sum{} {}".format(self.name, _labels(key), _number(total)))
+            lines.append("{}_count{} {}".format(self.name, _labels(key), counts[-1]))
+        return lines
+
+
+class Registry(object):
+    """The metrics of every validation in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.validations = Counter(
+            "vladiate_validations_total", "Validations run, by result."
+        )
+        self.rows = Counter("vladiate_rows_processed_total", "Rows validated.")
+        self.bytes = Counter("vladiate_bytes_read_total", "Bytes read from sources.")
+        self.failures = Counter(
+            "vladiate_validator_failures_total", "Validation failures, by validator."
+        )
+        self.validation_time = Histogram(
+            "vladiate_validation_seconds", "Time taken to validate a source."
+        )
+        self.fetch_time = Histogram(
+            "vladiate_input_fetch_seconds", "Time taken to open a source."
+        )
+        self.metrics = [
+            self.validations,
+            self.rows,
+            self.bytes,
+            self.failures,
+            self.validation_time,
+            self.fetch_time,
+        ]
+
+    def record(self, summary):
+        """Record the outcome of a validation, as returned by `Vlad.summary()`"""
+        vlad = summary["vlad"]
+        with self.lock:
+            self.validations.inc(
+                vlad=vlad, result="passed" if summary["passed"] else "failed"
+            )
+            self.rows.inc(summary["rows"], vlad=vlad)
+            self.bytes.inc(summary["bytes"], vlad=vlad)
+            for failure in summary["failures"]:
+                self.failures.inc(
+                    failure["count"],
+                    vlad=vlad,
+                    validator=failure["validator"],
+                    field=failure["field"] or "",
+                )
+            self.validation_time.observe(summary["elapsed"], vlad=vlad)
+            self.fetch_time.observe(
+                summary["fetch_time"], vlad=vlad, input=summary["input"]
+            )
+
+    def render(self):
+        with self.lock:
+            lines = [line for metric in self.metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+def write_textfile(registry, path):
+    """Atomically write the metrics to `path`, so the textfile collector never
+    reads a partial file"""
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "w") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def serve(registry, port, address="127.0.0.1"):
+    """Serve the metrics over HTTP from a background thread, and return the
+    server (call `shutdown()` on it to stop serving)"""
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer((address, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,207 @@
+"""Live progress and throughput reporting for long validations"""
+
+from __future__ import division
+import json
+import sys
+import time
+
+from vladiate.exceptions import MissingExtraException
+
+TERMINAL = "terminal"
+JSON = "json"
+
+
+class Progress(object):
+    """Tracks how far along the validation of a single source is
+
+    Snapshots are handed to `reporter` at most once every `interval` seconds.
+    The clock is only checked every `check_every` rows, so this stays off the
+    hot path of `Vlad.validate`.
+    """
+
+    def __init__(self, vlad, reporter, interval=1.0, check_every=1000):
+        self.vlad = vlad
+        self.reporter = reporter
+        self.interval = interval
+        self.check_every = check_every
+        try:
+            self.total_bytes = vlad.source.size()
+        except (NotImplementedError, OSError, MissingExtraException):
+            # Progress is still reported, without a percentage or ETA
+            self.total_bytes = None
+        self.started = time.monotonic()
+        self._next_report = self.started + interval
+
+    def update(self):
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            self.reporter(self.snapshot(now))
+
+    def finish(self):
+        self.reporter(self.snapshot(time.monotonic(), done=True))
+
+    def snapshot(self, now, done=False):
+        """Return the current progress as a JSON-serializable dict"""
+        vlad = self.vlad
+        elapsed = now - self.started
+        return {
+            "vlad": vlad.__class__.__name__,
+            "source": repr(vlad.source),
+            "rows": vlad.line_count,
+            "bytes": vlad.bytes_read,
+            "total_bytes": self.total_bytes,
+            "elapsed": elapsed,
+            "rows_per_sec": vlad.line_count / elapsed if elapsed else 0.0,
+            "eta": None if done else _eta(vlad.bytes_read, self.total_bytes, elapsed),
+            "failures": failure_counts(vlad),
+            "done": done,
+        }
+
+
+def failure_counts(vlad):
+    """Return the running failure count of each validator of a Vlad, by label"""
+    counts = {}
+    for validator in vlad.row_validators:
+        counts[validator.__class__.__name__] = validator.fail_count
+    for field_name, validators_list in vlad.validators.items():
+        for validator in validators_list:
+            label = "{} on field: '{}'".format(validator.__class__.__name__, field_name)
+            counts[label] = counts.get(label, 0) + validator.fail_count
+    return counts
+
+
+def _eta(done_bytes, total_bytes, elapsed):
+    if not total_bytes or not done_bytes or not elapsed:
+        return None
+    return max(total_bytes - done_bytes, 0) / (done_bytes / elapsed)
+
+
+def _format_bytes(count):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if count < 1000:
+            break
+        count /= 1000
+    else:
+        unit = "TB"
+    return "{:.1f} {}".format(count, unit)
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return "{}:{:02}:{:02}".format(hours, minutes, seconds)
+
+
+def format_snapshot(snapshot):
+    """Format a snapshot as a single human-readable line"""
+    parts = ["{}: {:,} rows".format(snapshot["vlad"], snapshot["rows"])]
+    if snapshot["bytes"]:
+        read = _format_bytes(snapshot["bytes"])
+        if snapshot["total_bytes"]:
+            read += " of {} ({:.1%})".format(
+                _format_bytes(snapshot["total_bytes"]),
+                min(snapshot["bytes"] / snapshot["total_bytes"], 1),
+            )
+        parts.append(read)
+    parts.append("{:,.0f} rows/s".format(snapshot["rows_per_sec"]))
+    parts.append("{:,} failures".format(sum(snapshot["failures"].values())))
+    if snapshot["eta"] is not None:
+        parts.append("ETA {}".format(_format_duration(snapshot["eta"])))
+    elif snapshot["done"]:
+        parts.append("done in {}".format(_format_duration(snapshot["elapsed"])))
+    return ", ".join(parts)
+
+
+class TerminalReporter(object):
+    """Render progress as a single, continuously overwritten terminal line"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def __call__(self, snapshot):
+        self.stream.write("\r\033[K" + format_snapshot(snapshot))
+        if snapshot["done"]:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class JSONReporter(object):
+    """Emit progress as one JSON object per line"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def __call__(self, snapshot):
+        self.stream.write(json.dumps(snapshot, sort_keys=True) + "\n")
+        self.stream.flush()
+
+
+class QueueReporter(object):
+    """Send progress to another process, e.g. from a `multiprocessing.Pool`
+    worker to an `Aggregator` in the parent"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def __call__(self, snapshot):
+        self.queue.put(snapshot)
+
+
+class Aggregator(object):
+    """Combine the progress of several validations running in parallel into
+    a single report"""
+
+    def __init__(self, reporter, interval=1.0):
+        self.reporter = reporter
+        self.interval = interval
+        self.snapshots = {}
+        self._next_report = time.monotonic() + interval
+
+    def __call__(self, snapshot):
+        self.snapshots[(snapshot["vlad"], snapshot["source"])] = snapshot
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            self.reporter(self.combined())
+
+    def finish(self):
+        if self.snapshots:
+            self.reporter(self.combined())
+
+    def combined(self):
+        snapshots = list(self.snapshots.values())
+        done = all(snapshot["done"] for snapshot in snapshots)
+        elapsed = max(snapshot["elapsed"] for snapshot in snapshots)
+        done_bytes = sum(snapshot["bytes"] for snapshot in snapshots)
+        if all(snapshot["total_bytes"] for snapshot in snapshots):
+            total_bytes = sum(snapshot["total_bytes"] for snapshot in snapshots)
+        else:
+            total_bytes = None
+        rows = sum(snapshot["rows"] for snapshot in snapshots)
+        failures = {}
+        for snapshot in snapshots:
+            for label, count in snapshot["failures"].items():
+                label = "{}: {}".format(snapshot["vlad"], label)
+                failures[label] = failures.get(label, 0) + count
+        return {
+            "vlad": "{} vlad(s)".format(len(snapshots)),
+            "source": None,
+            "rows": rows,
+            "bytes": done_bytes,
+            "total_bytes": total_bytes,
+            "elapsed": elapsed,
+            "rows_per_sec": rows / elapsed if elapsed else 0.0,
+            "eta": None if done else _eta(done_bytes, total_bytes, elapsed),
+            "failures": failures,
+            "done": done,
+        }
+
+
+def make_reporter(kind):
+    """Return a reporter for the `--progress` command line option"""
+    if kind == TERMINAL:
+        return TerminalReporter()
+    if kind == JSON:
+        return JSONReporter()
+    raise ValueError("Unknown progress reporter: '{}'".format(kind))
@@ -0,0 +1,141 @@
+"""Helpers for validating a random subset of the rows of a source"""
+
+from __future__ import division
+import csv
+import math
+from collections import namedtuple
+from io import StringIO
+
+from vladiate import decoding
+
+RANDOM = "random"
+STRATIFIED = "stratified"
+
+# Logged with the estimates of a sample read from random offsets, whose rows
+# aren't picked uniformly (see `seek_sample`)
+SEEK_SAMPLE_BIAS = (
+    "Rows were sampled by byte offset, so rows after long rows are more likely "
+    "to be picked: the intervals assume every row was as likely"
+)
+
+SampleEstimate = namedtuple(
+    "SampleEstimate", ["field", "validator", "failures", "sampled", "low", "high"]
+)
+
+
+def wilson_interval(failures, total, confidence=0.95):
+    """Return the Wilson score interval for a failure rate, as a (low, high)
+    tuple of proportions"""
+    from statistics import NormalDist
+
+    if not total:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = failures / total
+    denominator = 1 + z**2 / total
+    center = (rate + z**2 / (2 * total)) / denominator
+    margin = (
+        z * math.sqrt(rate * (1 - rate) / total + z**2 / (4 * total**2)) / denominator
+    )
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def to_row(fieldnames, values):
+    """Turn a list of values into a row dict, the same way `csv.DictReader`
+    does"""
+    row = dict(zip(fieldnames, values))
+    if len(fieldnames) < len(values):
+        row[None] = values[len(fieldnames) :]
+    elif len(fieldnames) > len(values):
+        for key in fieldnames[len(values) :]:
+            row[key] = None
+    return row
+
+
+def sample_offsets(start, end, count, method, rng):
+    """Pick `count` sorted byte offsets between `start` and `end`"""
+    if method == STRATIFIED:
+        width = (end - start) / count
+        return [int(start + width * (i + rng.random())) for i in range(count)]
+    if method == RANDOM:
+        return sorted(rng.randrange(start, end) for _ in range(count))
+    raise ValueError("Unknown sampling method: '{}'".format(method))
+
+
+def _read_row_at(source, offset, first, size, reader_kwargs, codec, window=16384):
+    """Read the first complete row starting at or after `offset`
+
+    Returns a (row values, start offset) tuple, or `None` if there
+    is no row left in the source. Unless `offset` is `first` (the start of the
+    data), whatever partial row the offset lands in is skipped.
+    """
+    while True:
+        chunk = source.read_range(offset, min(offset + window, size))
+        at_end = offset + len(chunk) >= size
+        start = 0
+        if offset != first:
+            start = chunk.find(b"\n") + 1
+            if not start:
+                if at_end:
+                    return None
+                window *= 2
+                continue
+        stop = chunk.find(b"\n", start)
+        if stop == -1 and not at_end:
+            window *= 2
+            continue
+        stop = len(chunk) if stop == -1 else stop + 1
+        text = chunk[start:stop].decode(codec, "replace")
+        for values in csv.reader(StringIO(text), **reader_kwargs):
+            return values, offset + start
+        return None
+
+
+def seek_sample(
+    source, fieldnames, first, count, method, rng, reader_kwargs, codec="utf-8"
+):
+    """Return up to `count` rows read from random offsets into the source
+
+    This requires a source which supports `size()` and `read_range()`. Rows are
+    resynchronized on line boundaries, so fields with quoted newlines may be
+    split at a sampled offset, and the source must be in an encoding where line
+    breaks are single bytes.
+
+    Each offset picks the row after the line it lands in, so rows are picked in
+    proportion to the length of the line before them (the header, for the
+    first row), rather than uniformly: the sample over-represents rows which
+    follow long rows. See `SEEK_SAMPLE_BIAS`.
+    """
+    size = source.size()
+    if size is None or not decoding.ascii_compatible(codec):
+        raise NotImplementedError
+    rows = []
+    if first >= size:
+        return rows
+    seen = set()
+    # Offsets in the header pick the first row, like offsets in any other
+    # line pick the row after it
+    for offset in sample_offsets(0, size, count, method, rng):
+        offset = max(offset, first)
+        found = _read_row_at(source, offset, first, size, reader_kwargs, codec)
+        if found is None:
+            continue
+        values, row_start = found
+        if row_start in seen:
+            continue
+        seen.add(row_start)
+        rows.append(to_row(fieldnames, values))
+    return rows
+
+
+def reservoir_sample(rows, count, rng):
+    """Return a uniform random sample of `count` rows from an iterable"""
+    sample = []
+    for i, row in enumerate(rows):
+        if i < count:
+            sample.append(row)
+        else:
+            j = rng.randrange(i + 1)
+            if j < count:
+                sample[j] = row
+    return sample
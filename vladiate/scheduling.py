@@ -0,0 +1,188 @@
+"""Schedule the validations of a run across its worker processes
+
+Each Vlad gets an estimated cost: how long it took last time, if there is a
+`History` of previous runs, or else the size of its source at the
+throughput seen so far. Jobs are then handed out longest first, so that a
+large source doesn't start last and leave the other processes idle while it
+finishes, and a source which would take longer than its share of the run on
+its own is split into chunks (see `distributed.split_source`) which are
+validated in parallel and merged.
+"""
+
+import json
+import math
+import os
+
+from vladiate import distributed
+from vladiate.exceptions import MissingExtraException
+
+# The bytes per second of a validation, until a history tells otherwise
+DEFAULT_THROUGHPUT = 10 * 1024 * 1024
+
+# Sources are never split into chunks smaller than this
+MIN_CHUNK_SIZE = 16 * 1024 * 1024
+
+# The memory set aside for each process by `auto_processes()`
+MEMORY_PER_PROCESS = 256 * 1024 * 1024
+
+
+def cpu_count():
+    """The number of CPUs this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def available_memory():
+    """The memory available to start processes with, in bytes, or `None` if
+    it is unknown"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def auto_processes(memory_per_process=MEMORY_PER_PROCESS):
+    """Return how many processes to use: one per CPU, as long as there is
+    `memory_per_process` available for each"""
+    processes = cpu_count()
+    memory = available_memory()
+    if memory is not None:
+        processes = min(processes, memory // memory_per_process)
+    return max(1, processes)
+
+
+class History(object):
+    """The time taken by previous validations, by Vlad and source, kept in a
+    JSON file"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                # A corrupt history is started over
+                pass
+
+    @staticmethod
+    def key(name, source):
+        return "{} {}".format(name, source)
+
+    def record(self, summary):
+        """Record the outcome of a validation, see `Vlad.summary()`"""
+        self.entries[self.key(summary["vlad"], summary["source"])] = {
+            "seconds": summary["elapsed"],
+            "bytes": summary["bytes"],
+        }
+
+    def throughput(self):
+        """The bytes per second of the validations recorded so far"""
+        seconds = sum(entry["seconds"] for entry in self.entries.values())
+        size = sum(entry["bytes"] for entry in self.entries.values())
+        if seconds > 0 and size > 0:
+            return size / seconds
+        return DEFAULT_THROUGHPUT
+
+    def estimate(self, name, source, size=None):
+        """Return how many seconds validating `source` with the Vlad `name`
+        should take, or `None` if there is no telling"""
+        entry = self.entries.get(self.key(name, repr(source)))
+        if entry is not None:
+            return entry["seconds"]
+        if size is not None:
+            return size / self.throughput()
+        return None
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def source_size(source):
+    """The size of a source in bytes, or `None` if it is unknown"""
+    try:
+        return source.size()
+    except (NotImplementedError, OSError, MissingExtraException):
+        return None
+
+
+def _split(job):
+    """Return the chunks to split the source of a (Vlad class, chunk size)
+    job into, see `distributed.split_source`"""
+    vlad, chunk_size = job
+    return distributed.split_source(vlad, vlad.source, chunk_size, quiet=True)
+
+
+def schedule(vlads, processes, history=None, split=True, map=map):
+    """Return the jobs to validate `vlads` (by name) with, longest first
+
+    Jobs are Vlad classes, or (Vlad class, task) tuples for the chunks of
+    a source (see `distributed.run_task`). Splitting a source takes a
+    structural scan of it, which `map` runs (e.g. `Pool.map`, to scan
+    several large sources at once). The chunks of a source can only be
+    validated once it was scanned: a scan runs at close to disk speed for
+    records without quotes, but takes up to half as long as validating
+    sources where most records have some.
+    """
+    history = history or History()
+    sizes = {name: source_size(vlad.source) for name, vlad in vlads.items()}
+    costs = {
+        name: history.estimate(name, vlad.source, sizes[name])
+        for name, vlad in vlads.items()
+    }
+    known = [cost for cost in costs.values() if cost is not None]
+    # Sources with no estimate are assumed to be of the usual cost
+    default = sum(known) / len(known) if known else 1.0
+    costs = {name: default if cost is None else cost for name, cost in costs.items()}
+    share = sum(costs.values()) / processes
+
+    large = []
+    if split and processes > 1:
+        large = [
+            name
+            for name, size in sorted(sizes.items())
+            if size is not None and costs[name] > share and size >= 2 * MIN_CHUNK_SIZE
+        ]
+    chunked = {}
+    if large:
+        jobs = [
+            (
+                vlads[name],
+                max(MIN_CHUNK_SIZE, int(math.ceil(sizes[name] / processes))),
+            )
+            for name in large
+        ]
+        chunked = dict(zip(large, map(_split, jobs)))
+
+    jobs = []
+    for name, vlad in sorted(vlads.items()):
+        size = sizes[name]
+        chunks = chunked.get(name, [(None, None, None)])
+        if len(chunks) == 1:
+            jobs.append((costs[name], vlad))
+            continue
+        for header_end, start, end in chunks:
+            task = {
+                "type": "task",
+                "id": len(jobs),
+                "vlad": name,
+                "part": None,
+                "header_end": header_end,
+                "start": start,
+                "end": end,
+            }
+            jobs.append((costs[name] * (end - start) / size, (vlad, task)))
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    return [job for _, job in jobs]
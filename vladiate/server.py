@@ -0,0 +1,248 @@
+"""Validate sources on request, from a long-running process
+
+The server loads the vladfile once, and keeps a pool of worker processes
+which each compile the Vlads once (see `Vlad.compile()`), so a validation
+doesn't pay for starting Python, importing the vladfile or setting up
+validators. Jobs are submitted over HTTP, on a TCP port or a Unix socket:
+
+    POST /validate?vlad=Name&path=/path/to/file.csv
+    POST /validate?vlad=Name           (with the CSV as the request body)
+    GET  /vlads                        (the names of the Vlads)
+    GET  /metrics                      (see `vladiate.metrics`)
+
+A validation answers with the JSON summary of the job (see
+`vladiate.batch.validate_source`). Each worker validates one source at a
+time (which also keeps `csv.field_size_limit`, a process-wide setting, to
+one validation at a time), and at most `max_queue` jobs wait for a worker:
+other jobs are turned away right away with a 503, so clients can back off.
+"""
+
+import json
+import os
+import socketserver
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+from vladiate import batch
+from vladiate import distributed
+from vladiate import logs
+from vladiate import metrics
+
+# The largest request body accepted
+MAX_BODY_SIZE = 4 * 1024 * 1024 * 1024
+
+UNIX_PREFIX = "unix:"
+
+
+class Server(object):
+    """Validate sources with `plans` (by Vlad name) on request, at `address`
+    (a (host, port) tuple, or the path of a Unix socket)"""
+
+    def __init__(
+        self,
+        plans,
+        address=("127.0.0.1", 0),
+        processes=1,
+        max_queue=None,
+        max_body_size=MAX_BODY_SIZE,
+        quiet=False,
+    ):
+        from multiprocessing import Pool
+
+        self.plans = plans
+        self.processes = processes
+        self.max_queue = processes if max_queue is None else max_queue
+        self.max_body_size = max_body_size
+        self.quiet = quiet
+        self.logger = logs.logger
+        self.registry = metrics.Registry()
+        # Jobs being validated or waiting for a worker
+        self.slots = threading.BoundedSemaphore(processes + self.max_queue)
+        if isinstance(address, str):
+            _remove_stale_socket(address)
+            self.server = _UnixServer(address, _Handler, self)
+        else:
+            self.server = _TCPServer(address, _Handler, self)
+        self.address = self.server.server_address
+        # Only start the workers once the address is ours
+        self.pool = Pool(processes, initializer=batch._init_worker, initargs=(plans,))
+
+    @contextmanager
+    def slot(self):
+        """Hold a place for a job while in the context, which is `True` if
+        there was one left, `False` if too many jobs are waiting already"""
+        acquired = self.slots.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.slots.release()
+
+    def validate(self, name, spec):
+        """Validate the source at `spec` with the Vlad `name` in a worker, and
+        return the summary"""
+        summary = self.pool.apply(batch.validate_source, ((0, name, spec),))
+        self.registry.record(summary)
+        if not self.quiet:
+            self.logger.info(
+                "{} {}: {}, {} row(s) in {:.3f}s".format(
+                    "PASS" if summary["passed"] else "FAIL",
+                    name,
+                    summary["source"],
+                    summary["rows"],
+                    summary["elapsed"],
+                )
+            )
+        return summary
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        """Stop `serve_forever()`, from another thread"""
+        self.server.shutdown()
+
+    def close(self):
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.pool.terminate()
+        self.pool.join()
+
+
+def parse_address(address):
+    """Turn a `HOST:PORT` or `unix:PATH` string into the address to serve on"""
+    if address.startswith(UNIX_PREFIX):
+        return address[len(UNIX_PREFIX) :]
+    return distributed.parse_address(address)
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, server):
+        self.vladiate = server
+        socketserver.TCPServer.__init__(self, address, handler)
+
+
+def _remove_stale_socket(path):
+    """Remove the socket left at `path` by an earlier server, refusing to
+    remove anything else"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError("'{}' exists and isn't a socket".format(path))
+    os.unlink(path)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, server):
+        self.vladiate = server
+        socketserver.UnixStreamServer.__init__(self, address, handler)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send the headers and body of a response in one go, rather than waiting
+    # for the client to acknowledge the headers (see Nagle's algorithm)
+    wbufsize = -1
+
+    def do_GET(self):
+        server = self.server.vladiate
+        url = urlparse(self.path)
+        if url.path == "/vlads":
+            self.send_json(200, {"vlads": sorted(server.plans)})
+        elif url.path == "/metrics":
+            self.send_body(
+                200, server.registry.render().encode("utf-8"), metrics.CONTENT_TYPE
+            )
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        server = self.server.vladiate
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if url.path != "/validate":
+            return self.reject(404, "Not found", length)
+        name = query.get("vlad")
+        if name not in server.plans:
+            return self.reject(404, "Unknown vlad: {}".format(name), length)
+        if "path" not in query and not length:
+            return self.reject(400, "Either a path or a body is required", length)
+        if length > server.max_body_size:
+            return self.reject(413, "The body is too large", length)
+        with server.slot() as acquired:
+            if not acquired:
+                return self.reject(503, "Too many jobs waiting", length, retry=True)
+            if "path" in query:
+                self.discard(length)
+                summary = server.validate(name, query["path"])
+            else:
+                summary = self.validate_body(name, length)
+        if summary is not None:
+            self.send_json(200, summary)
+
+    def validate_body(self, name, length):
+        # The body is spooled to a file, so it doesn't have to fit in memory
+        with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+            while length:
+                block = self.rfile.read(min(length, 1024 * 1024))
+                if not block:
+                    # The client went away
+                    self.close_connection = True
+                    return None
+                f.write(block)
+                length -= len(block)
+            f.flush()
+            summary = self.server.vladiate.validate(name, f.name)
+        summary["source"] = "request body"
+        return summary
+
+    def reject(self, status, error, length, retry=False):
+        if length > self.server.vladiate.max_body_size:
+            self.close_connection = True
+        else:
+            self.discard(length)
+        self.send_json(status, {"error": error}, retry=retry)
+
+    def discard(self, length):
+        # Read what is left of the body, to keep the connection usable
+        while length > 0:
+            block = self.rfile.read(min(length, 1024 * 1024))
+            if not block:
+                break
+            length -= len(block)
+
+    def send_json(self, status, message, retry=False):
+        body = (json.dumps(message) + "\n").encode("utf-8")
+        self.send_body(status, body, "application/json", retry)
+
+    def send_body(self, status, body, content_type, retry=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if retry:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,280 @@
+"""A fast structural check of a source, straight from its raw bytes
+
+Before any row is turned into a dict, `scan()` checks that every record has
+as many fields as the header, that quoted fields are terminated and quoted
+properly, and that the source can be decoded. Records without any quote
+character (most of them, usually) only have their delimiters counted, so
+structurally broken sources are rejected at close to disk speed.
+
+The scan also finds where records start, so a source can be split into chunks
+without cutting through a quoted field (see `Structure.chunks()`).
+"""
+
+import csv
+import mmap
+
+from vladiate import decoding
+from vladiate.inputs import Chunk, LocalFile
+
+BLOCK_SIZE = 1024 * 1024
+
+
+class Structure(object):
+    """The outcome of a `scan()`"""
+
+    def __init__(self):
+        self.fieldnames = None
+        # The offset at which the header row ends
+        self.header_end = None
+        self.rows = 0
+        self.lines = 0
+        self.size = 0
+        # The first errors found, as (line number, message) tuples
+        self.errors = []
+        self.error_count = 0
+        # Offsets at which records start, roughly `chunk_size` bytes apart
+        self.boundaries = []
+
+    @property
+    def passed(self):
+        return self.fieldnames is not None and not self.error_count
+
+    def chunks(self, source):
+        """Split `source` into a `Chunk` per boundary found by the scan"""
+        return [
+            Chunk(source, self.header_end, start, end)
+            for start, end in zip(self.boundaries, self.boundaries[1:] + [self.size])
+            if start < end
+        ]
+
+
+class _Scanner(object):
+    def __init__(self, reader_kwargs, max_errors, chunk_size, codec="utf-8", bom=0):
+        dialect = csv.reader([], **reader_kwargs).dialect
+        self.reader_kwargs = dict(reader_kwargs, strict=True)
+        self.codec = codec
+        self.bom = bom
+        self.delimiter = dialect.delimiter.encode(codec)
+        self.quote = None
+        if dialect.quoting != csv.QUOTE_NONE and dialect.quotechar:
+            self.quote = dialect.quotechar.encode(codec)
+        self.max_errors = max_errors
+        self.chunk_size = chunk_size
+        self.next_boundary = None
+        self.structure = Structure()
+        self.expected = None
+        # Whether the csv reader is between records, and the offset and line
+        # number of the record it is reading otherwise
+        self.between_records = True
+        self.record_start = 0
+        self.record_line = 0
+        # The offset of the end of the last line handed to the reader
+        self.position = 0
+        self.exhausted = False
+
+    def error(self, line, message):
+        structure = self.structure
+        structure.error_count += 1
+        if len(structure.errors) < self.max_errors:
+            structure.errors.append((line, message))
+
+    def run(self, blocks):
+        """Scan `blocks`, (bytes, offset) tuples of whole lines"""
+        reader = csv.reader(self.lines(blocks), **self.reader_kwargs)
+        while True:
+            try:
+                values = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                if self.exhausted:
+                    message = "Unterminated quoted field"
+                else:
+                    message = "Malformed record: {}".format(e)
+                self.error(self.record_line, message)
+                if self.expected is not None:
+                    self.structure.rows += 1
+                values = None
+            self.between_records = True
+            if values:
+                self.record(values)
+
+    def lines(self, blocks):
+        """Yield the lines the csv reader has to parse, which are those of the
+        header and those from a quote character to the end of its record, and
+        count the fields of the others in bulk"""
+        structure = self.structure
+        for block, offset in blocks:
+            self.check_encoding(block)
+            position = self.bom if offset == 0 else 0
+            while position < len(block):
+                if self.between_records and self.expected is not None:
+                    quote = -1
+                    if self.quote is not None:
+                        quote = block.find(self.quote, position)
+                    if quote == -1:
+                        self.count_fields(block[position:], offset + position)
+                        break
+                    start = block.rfind(b"\n", position, quote) + 1
+                    if start > position:
+                        self.count_fields(block[position:start], offset + position)
+                        position = start
+                end = block.find(b"\n", position) + 1 or len(block)
+                structure.lines += 1
+                if self.between_records:
+                    self.between_records = False
+                    self.record_start = offset + position
+                    self.record_line = structure.lines
+                self.position = offset + end
+                yield block[position:end].decode(self.codec, "replace")
+                position = end
+            self.structure.size = offset + len(block)
+        self.exhausted = True
+
+    def count_fields(self, block, offset):
+        """Scan lines which don't have any quote character: each one is a
+        record, with one more field than it has delimiters"""
+        structure = self.structure
+        lines = block.split(b"\n")
+        if not lines[-1]:
+            lines.pop()
+        first_line = structure.lines + 1
+        structure.lines += len(lines)
+        expected = self.expected - 1
+        delimiter = self.delimiter
+        counts = [line.count(delimiter) for line in lines]
+        structure.rows += len(counts)
+        for i, count in enumerate(counts):
+            if count != expected:
+                if not lines[i].rstrip(b"\r"):
+                    # Blank lines are skipped, like `csv.DictReader` does
+                    structure.rows -= 1
+                else:
+                    self.error(first_line + i, self.mismatch(count + 1))
+        if self.chunk_size:
+            end = offset + len(block)
+            while self.next_boundary < end:
+                start = 0
+                if self.next_boundary > offset:
+                    start = block.find(b"\n", self.next_boundary - offset - 1) + 1
+                    if not start or offset + start >= end:
+                        break
+                self.boundary(offset + start)
+
+    def record(self, values):
+        """Check a record parsed by the csv reader"""
+        structure = self.structure
+        if self.expected is None:
+            structure.fieldnames = values
+            structure.header_end = self.position
+            self.expected = len(values)
+            if self.chunk_size:
+                self.boundary(structure.header_end)
+            return
+        structure.rows += 1
+        if len(values) != self.expected:
+            self.error(self.record_line, self.mismatch(len(values)))
+        if self.chunk_size and self.record_start >= self.next_boundary:
+            self.boundary(self.record_start)
+
+    def boundary(self, offset):
+        self.structure.boundaries.append(offset)
+        self.next_boundary = offset + self.chunk_size
+
+    def mismatch(self, fields):
+        return "Expected {} fields, got {}".format(self.expected, fields)
+
+    def check_encoding(self, block):
+        for start, _, reason in decoding.invalid_sequences(block, self.codec):
+            line = self.structure.lines + block.count(b"\n", 0, start) + 1
+            self.error(line, "Invalid {}: {}".format(self.codec.upper(), reason))
+
+
+def _raw_blocks(source, block_size):
+    """Return the raw bytes of a source, in blocks, or `None` if it can only
+    be read as lines of text"""
+    if isinstance(source, LocalFile):
+        return _mapped_blocks(source.filename, block_size)
+    size = source.size()
+    if size is None:
+        return None
+    try:
+        first = source.read_range(0, min(block_size, size))
+    except NotImplementedError:
+        return None
+    return _ranged_blocks(source, first, size, block_size)
+
+
+def _mapped_blocks(filename, block_size):
+    with open(filename, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file can't be mapped
+            return
+        with data:
+            for start in range(0, len(data), block_size):
+                yield data[start : start + block_size]
+
+
+def _ranged_blocks(source, first, size, block_size):
+    yield first
+    for start in range(block_size, size, block_size):
+        yield source.read_range(start, min(start + block_size, size))
+
+
+def _line_blocks(source, block_size):
+    """Yield the lines of a source encoded as UTF-8, in blocks"""
+    block = []
+    length = 0
+    for line in source.open():
+        if isinstance(line, str):
+            line = line.encode("utf-8")
+        block.append(line)
+        length += len(line)
+        if length >= block_size:
+            yield b"".join(block)
+            block = []
+            length = 0
+    if block:
+        yield b"".join(block)
+
+
+def scan(source, reader_kwargs=None, max_errors=100, chunk_size=None):
+    """Check the structure of a source, see `Structure`
+
+    `reader_kwargs` are the `csv.reader` arguments the source is read with.
+    With `chunk_size`, the scan also records `boundaries` between records
+    about that many bytes apart.
+
+    Sources are scanned in the encoding they are decoded with. Those which
+    can't be read as raw bytes, or are in an encoding where line breaks
+    aren't single bytes (such as UTF-16), are decoded first, and have no
+    `boundaries`.
+    """
+    codec, bom = source.codec()
+    blocks = None
+    if decoding.ascii_compatible(codec):
+        blocks = _raw_blocks(source, BLOCK_SIZE)
+    if blocks is None:
+        codec, bom, chunk_size = "utf-8", 0, None
+        blocks = _line_blocks(source, BLOCK_SIZE)
+    scanner = _Scanner(reader_kwargs or {}, max_errors, chunk_size, codec, bom)
+    scanner.run(_whole_lines(blocks))
+    return scanner.structure
+
+
+def _whole_lines(blocks):
+    """Yield (bytes, offset) tuples of whole lines, out of blocks which may end
+    in the middle of one"""
+    offset = 0
+    rest = b""
+    for block in blocks:
+        block = rest + block
+        end = block.rfind(b"\n") + 1
+        rest = block[end:]
+        if end:
+            yield block[:end], offset
+            offset += end
+    if rest:
+        yield rest, offset
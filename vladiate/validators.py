@@ -1,12 +1,25 @@
+import math
 import re
+from datetime import date, datetime
 from itertools import islice
 
 from vladiate.exceptions import ValidationException, BadValidatorException
 
+# Parsers whose values can be used in place of the value of another parser
+# for the same field, e.g. the `int` of a field compares like its `float`
+PARSER_SUBSTITUTES = {float: (int,)}
+
 
 class Validator(object):
     """Generic Validator class"""
 
+    __slots__ = ("fail_count", "empty_ok")
+
+    # A function turning a field into the value this validator checks, which
+    # `Vlad` can then share between the validators of a field, see
+    # `validate_parsed`
+    parser = None
+
     def __init__(self, empty_ok=False):
         self.fail_count = 0
         self.empty_ok = empty_ok
@@ -20,46 +33,228 @@ class Validator(object):
         """Validate the given field. Also is given the row context"""
         raise NotImplementedError
 
+    def validate_parsed(self, value, field, row):
+        """Validate the given field, already parsed by `parser` into `value`.
+        Only called if `parser` succeeded, otherwise `validate` is"""
+        self.validate(field, row=row)
+
+    def validate_batch(self, fields, rows):
+        """Validate a column of fields at once, given the rows they are from.
+        Returns an (index, ValidationException) tuple for each failure"""
+        failures = []
+        for i, field in enumerate(fields):
+            try:
+                self.validate(field, row=rows[i])
+            except ValidationException as e:
+                failures.append((i, e))
+        return failures
+
+    def state(self):
+        """Return the results of validation so far, as plain Python values"""
+        return {"fail_count": self.fail_count}
+
+    def merge(self, other):
+        """Combine the results of another validator of the same kind (or its
+        `state()`) into this one"""
+        self.fail_count += _as_state(other)["fail_count"]
+
+    def serialize(self):
+        """Return `state()` encoded as bytes, see `deserialize_state`"""
+        return serialize_state(self.state())
+
 
 class CastValidator(Validator):
-    """Validates that a field can be cast to a float"""
+    """Validates that a field can be cast with `cast`
 
-    def __init__(self, **kwargs):
+    Numbers can use a `thousands` separator (which then has to group digits
+    by three) and a `decimal` separator other than `.`, and can be required to
+    be between `low` and `high`.
+    """
+
+    __slots__ = (
+        "invalid_set",
+        "thousands",
+        "decimal",
+        "low",
+        "high",
+        "plain",
+        "grouping",
+        "cast",
+        "parser",
+    )
+
+    def __init__(self, thousands=None, decimal=".", low=None, high=None, **kwargs):
         super(CastValidator, self).__init__(**kwargs)
         self.invalid_set = set([])
+        self.thousands = thousands
+        self.decimal = decimal
+        self.low = low
+        self.high = high
+        self.plain = thousands is None and decimal == "." and low is high is None
+        self.parser = None
+        if thousands is not None:
+            self.grouping = re.compile(
+                r"\s*[+-]?(?:\d{{1,3}}(?:{0}\d{{3}})+(?!\d))?[^{0}]*\Z".format(
+                    re.escape(thousands)
+                )
+            )
+
+    def parse(self, field):
+        """Return the value of `field`, or raise `ValueError`"""
+        if self.plain:
+            return self.cast(field)
+        if self.thousands is not None:
+            if not self.grouping.match(field):
+                raise ValueError(
+                    "'{}' does not group thousands with '{}'".format(
+                        field, self.thousands
+                    )
+                )
+            field = field.replace(self.thousands, "")
+        if self.decimal != ".":
+            if "." in field:
+                raise ValueError(
+                    "'{}' does not use '{}' as decimal separator".format(
+                        field, self.decimal
+                    )
+                )
+            field = field.replace(self.decimal, ".")
+        value = self.cast(field)
+        if (self.low is not None and value < self.low) or (
+            self.high is not None and value > self.high
+        ):
+            raise ValueError(
+                "'{}' is not in range {} to {}".format(field, self.low, self.high)
+            )
+        return value
+
+    def validate_parsed(self, value, field, row):
+        pass
 
     def validate(self, field, row={}):
+        """Returns the parsed value, or `None` for an allowed empty field"""
         try:
             if field or not self.empty_ok:
-                self.cast(field)
+                return self.cast(field) if self.plain else self.parse(field)
         except ValueError as e:
             self.invalid_set.add(field)
-            raise ValidationException(e)
+            raise _cast_failure(e, field)
+
+    def validate_batch(self, fields, rows):
+        # Parse runs of valid fields without any Python-level call per field,
+        # only going through `validate` for the fields which fail
+        parse = self.cast if self.plain else self.parse
+        if self.empty_ok:
+            parse = _skip_empty(parse)
+        failures = []
+        # `map` carries on with the next field after one fails to parse
+        parsed = map(parse, fields)
+        i = -1
+        while True:
+            try:
+                for i, _ in enumerate(parsed, i + 1):
+                    pass
+                return failures
+            except ValueError as e:
+                i += 1
+                self.invalid_set.add(fields[i])
+                failures.append((i, _cast_failure(e, fields[i])))
 
     @property
     def bad(self):
         return self.invalid_set
 
+    def state(self):
+        state = super(CastValidator, self).state()
+        state["invalid_set"] = self.invalid_set
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(CastValidator, self).merge(state)
+        self.invalid_set.update(state["invalid_set"])
+
 
 class FloatValidator(CastValidator):
     """Validates that a field can be cast to a float"""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(FloatValidator, self).__init__(**kwargs)
         self.cast = float
+        self.parser = float if self.plain else self.parse
 
 
 class IntValidator(CastValidator):
     """Validates that a field can be cast to an int"""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(IntValidator, self).__init__(**kwargs)
         self.cast = int
+        self.parser = int if self.plain else self.parse
+
+
+class DateValidator(CastValidator):
+    """Validates that a field is a date in the given `format`
+
+    Fields have to match the `strptime` format exactly, including any zero
+    padding. Common formats are parsed with `fromisoformat` or a precompiled
+    regex instead of `strptime`, and parsed values are cached, since dates
+    tend to repeat.
+    """
+
+    __slots__ = ("format", "cache_size", "cache", "convert")
+
+    def __init__(
+        self, format="%Y-%m-%d", low=None, high=None, cache_size=10000, **kwargs
+    ):
+        super(DateValidator, self).__init__(**kwargs)
+        self.format = format
+        self.cache_size = cache_size
+        self.cache = {}
+        self.convert = _DateFormat(format, self.kind)
+        self.low = self.convert(low) if isinstance(low, str) else low
+        self.high = self.convert(high) if isinstance(high, str) else high
+        self.plain = False
+        self.parser = self.parse
+
+    kind = date
+
+    def parse(self, field):
+        value = self.cache.get(field)
+        if value is None:
+            value = self.convert(field)
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[field] = value
+        if (self.low is not None and value < self.low) or (
+            self.high is not None and value > self.high
+        ):
+            raise ValueError(
+                "'{}' is not in range {} to {}".format(field, self.low, self.high)
+            )
+        return value
+
+
+class DateTimeValidator(DateValidator):
+    """Validates that a field is a date and time in the given `format`"""
+
+    __slots__ = ()
+
+    kind = datetime
+
+    def __init__(self, format="%Y-%m-%dT%H:%M:%S", **kwargs):
+        super(DateTimeValidator, self).__init__(format=format, **kwargs)
 
 
 class SetValidator(Validator):
     """Validates that a field is in the given set"""
 
+    __slots__ = ("valid_set", "ignore_case", "set_to_check", "invalid_set")
+
     def __init__(self, valid_set=[], ignore_case=False, **kwargs):
         super(SetValidator, self).__init__(**kwargs)
         self.valid_set = set(valid_set)
@@ -87,10 +282,22 @@ class SetValidator(Validator):
     def bad(self):
         return self.invalid_set
 
+    def state(self):
+        state = super(SetValidator, self).state()
+        state["invalid_set"] = self.invalid_set
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(SetValidator, self).merge(state)
+        self.invalid_set.update(state["invalid_set"])
+
 
 class UniqueValidator(Validator):
     """Validates that a field is unique within the file"""
 
+    __slots__ = ("unique_values", "duplicates", "unique_with", "unique_check")
+
     def __init__(self, unique_with=[], **kwargs):
         super(UniqueValidator, self).__init__(**kwargs)
         self.unique_values = set([])
@@ -117,21 +324,85 @@ class UniqueValidator(Validator):
             self.duplicates.add(key)
             if self.unique_with:
                 raise ValidationException(
-                    "'{}' is already in the column (unique with: {})".format(
-                        field, key[1:]
-                    )
+                    "'{}' is already in the column (unique with: {})", field, key[1:]
                 )
             else:
-                raise ValidationException("'{}' is already in the column".format(field))
+                raise ValidationException("'{}' is already in the column", field)
 
     @property
     def bad(self):
         return self.duplicates
 
+    def state(self):
+        state = super(UniqueValidator, self).state()
+        state["unique_values"] = self.unique_values
+        state["duplicates"] = self.duplicates
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(UniqueValidator, self).merge(state)
+        # Values seen by both validators are duplicates as well
+        repeated = self.unique_values & state["unique_values"]
+        self.fail_count += len(repeated)
+        self.duplicates.update(repeated, state["duplicates"])
+        self.unique_values.update(state["unique_values"])
+
+
+class ForeignKeyValidator(Validator):
+    """Validates that a field is one of the values of `field` in another
+    `source`, through an index of that source which is built once and shared
+    (see `vladiate.index`)"""
+
+    __slots__ = ("index", "invalid_set", "cache_size", "found")
+
+    def __init__(
+        self, source, field, cache_dir=None, dialect="excel", cache_size=10000, **kwargs
+    ):
+        from vladiate.index import KeyIndex
+
+        super(ForeignKeyValidator, self).__init__(**kwargs)
+        self.index = KeyIndex(source, field, cache_dir=cache_dir, dialect=dialect)
+        self.invalid_set = set([])
+        # Keys found in the index, since foreign keys tend to repeat
+        self.cache_size = cache_size
+        self.found = set([])
+
+    def validate(self, field, row={}):
+        if field in self.found or (field == "" and self.empty_ok):
+            return
+        if field in self.index:
+            if len(self.found) >= self.cache_size:
+                self.found.clear()
+            self.found.add(field)
+        else:
+            self.invalid_set.add(field)
+            raise ValidationException(
+                "'{}' is not in field "
+                + _escape("'{}' of {!r}".format(self.index.field, self.index.source)),
+                field,
+            )
+
+    @property
+    def bad(self):
+        return self.invalid_set
+
+    def state(self):
+        state = super(ForeignKeyValidator, self).state()
+        state["invalid_set"] = self.invalid_set
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(ForeignKeyValidator, self).merge(state)
+        self.invalid_set.update(state["invalid_set"])
+
 
 class RegexValidator(Validator):
     """Validates that a field matches a given regex"""
 
+    __slots__ = ("regex", "failures")
+
     def __init__(self, pattern=r"di^", full=False, **kwargs):
         super(RegexValidator, self).__init__(**kwargs)
         self.failures = set([])
@@ -144,15 +415,32 @@ class RegexValidator(Validator):
         if not self.regex.match(field) and (field or not self.empty_ok):
             self.failures.add(field)
             raise ValidationException(
-                "'{}' does not match pattern /{}/".format(field, self.regex)
+                "'{}' does not match pattern " + _escape("/{}/".format(self.regex)),
+                field,
             )
 
     @property
     def bad(self):
         return self.failures
 
+    def state(self):
+        state = super(RegexValidator, self).state()
+        state["failures"] = self.failures
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(RegexValidator, self).merge(state)
+        self.failures.update(state["failures"])
+
 
 class RangeValidator(Validator):
+    """Validates that a field is a number between `low` and `high`"""
+
+    __slots__ = ("low", "high", "outside")
+
+    parser = float
+
     def __init__(self, low, high, **kwargs):
         super(RangeValidator, self).__init__(**kwargs)
         self.fail_count = 0
@@ -168,19 +456,39 @@ class RangeValidator(Validator):
             if not self.low <= value <= self.high:
                 raise ValueError
         except ValueError:
-            self.outside.add(field)
-            raise ValidationException(
-                "'{}' is not in range {} to {}".format(field, self.low, self.high)
-            )
+            self._fail(field)
+
+    def validate_parsed(self, value, field, row):
+        if not self.low <= value <= self.high:
+            self._fail(field)
+
+    def _fail(self, field):
+        self.outside.add(field)
+        raise ValidationException(
+            "'{}' is not in range " + _escape("{} to {}".format(self.low, self.high)),
+            field,
+        )
 
     @property
     def bad(self):
         return self.outside
 
+    def state(self):
+        state = super(RangeValidator, self).state()
+        state["outside"] = self.outside
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(RangeValidator, self).merge(state)
+        self.outside.update(state["outside"])
+
 
 class EmptyValidator(Validator):
     """Validates that a field is always empty"""
 
+    __slots__ = ("nonempty",)
+
     def __init__(self, **kwargs):
         super(EmptyValidator, self).__init__(**kwargs)
         self.nonempty = set([])
@@ -188,16 +496,28 @@ class EmptyValidator(Validator):
     def validate(self, field, row={}):
         if field != "":
             self.nonempty.add(field)
-            raise ValidationException("'{}' is not an empty string".format(field))
+            raise ValidationException("'{}' is not an empty string", field)
 
     @property
     def bad(self):
         return self.nonempty
 
+    def state(self):
+        state = super(EmptyValidator, self).state()
+        state["nonempty"] = self.nonempty
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(EmptyValidator, self).merge(state)
+        self.nonempty.update(state["nonempty"])
+
 
 class NotEmptyValidator(Validator):
     """Validates that a field is not empty"""
 
+    __slots__ = ("failed",)
+
     def __init__(self, **kwargs):
         super(NotEmptyValidator, self).__init__(**kwargs)
         self.fail_count = 0
@@ -212,10 +532,22 @@ class NotEmptyValidator(Validator):
     def bad(self):
         return self.failed
 
+    def state(self):
+        state = super(NotEmptyValidator, self).state()
+        state["failed"] = self.failed
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(NotEmptyValidator, self).merge(state)
+        self.failed = self.failed or state["failed"]
+
 
 class Ignore(Validator):
     """Ignore a given field. Never fails"""
 
+    __slots__ = ()
+
     def validate(self, field, row={}):
         pass
 
@@ -227,6 +559,8 @@ class Ignore(Validator):
 class RowValidator(object):
     """Generic RowValidator class"""
 
+    __slots__ = ("fail_count",)
+
     def __init__(self):
         self.fail_count = 0
 
@@ -239,13 +573,370 @@ class RowValidator(object):
         """Validate the given row."""
         raise NotImplementedError
 
+    def finish(self):
+        """Called once every row has been validated (and merged)"""
+        pass
+
+    def state(self):
+        """Return the results of validation so far, as plain Python values"""
+        return {"fail_count": self.fail_count}
+
+    def merge(self, other):
+        """Combine the results of another validator of the same kind (or its
+        `state()`) into this one"""
+        self.fail_count += _as_state(other)["fail_count"]
+
+    def serialize(self):
+        """Return `state()` encoded as bytes, see `deserialize_state`"""
+        return serialize_state(self.state())
+
+
+class AggregateValidator(RowValidator):
+    """Generic aggregate validator, which summarizes `field` in constant
+    memory as rows are validated, and checks that the summary (`result()`)
+    is between `low` and `high` in `finish()`
+
+    Subclasses should merge their summaries in `merge()`. The outcome of
+    `finish()` is not merged, so only merge validators which haven't finished.
+    """
+
+    __slots__ = ("field", "low", "high", "errors")
+
+    # What the result is, in failure messages
+    description = "aggregate"
+
+    def __init__(self, field, low=None, high=None):
+        super(AggregateValidator, self).__init__()
+        self.field = field
+        self.low = low
+        self.high = high
+        self.errors = []
+
+    @property
+    def bad(self):
+        return self.errors
+
+    def result(self):
+        """Return the summary of the rows so far, or `None` if there is none"""
+        raise NotImplementedError
+
+    def finish(self):
+        value = self.result()
+        if value is None:
+            if self.low is not None or self.high is not None:
+                self._fail("Field '{}' has no values".format(self.field))
+        elif (self.low is not None and value < self.low) or (
+            self.high is not None and value > self.high
+        ):
+            self._fail(
+                "The {} of field '{}' is {}, not in range {} to {}".format(
+                    self.description, self.field, value, self.low, self.high
+                )
+            )
+
+    def _fail(self, message):
+        self.errors.append(message)
+        raise ValidationException(message)
+
+
+class SumValidator(AggregateValidator):
+    """Validates that the sum of a field is between `low` and `high`. Fields
+    which `parser` fails to parse are left to field validators"""
+
+    __slots__ = ("parser", "total")
+
+    description = "sum"
+
+    def __init__(self, field, low=None, high=None, parser=float):
+        super(SumValidator, self).__init__(field, low=low, high=high)
+        self.parser = parser
+        self.total = 0
+
+    def validate(self, row):
+        try:
+            self.total += self.parser(row.get(self.field))
+        except (TypeError, ValueError):
+            pass
+
+    def result(self):
+        return self.total
+
+    def state(self):
+        state = super(SumValidator, self).state()
+        state["total"] = self.total
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(SumValidator, self).merge(state)
+        self.total += state["total"]
+
+
+class MinValidator(AggregateValidator):
+    """Validates that the smallest value of a field is between `low` and
+    `high`. Fields which `parser` fails to parse are left to field
+    validators"""
+
+    __slots__ = ("parser", "value")
+
+    description = "minimum"
+
+    def __init__(self, field, low=None, high=None, parser=float):
+        super(MinValidator, self).__init__(field, low=low, high=high)
+        self.parser = parser
+        self.value = None
+
+    def validate(self, row):
+        try:
+            value = self.parser(row.get(self.field))
+        except (TypeError, ValueError):
+            return
+        if self.value is None or self._better(value, self.value):
+            self.value = value
+
+    def _better(self, value, than):
+        return value < than
+
+    def result(self):
+        return self.value
+
+    def state(self):
+        state = super(MinValidator, self).state()
+        state["value"] = self.value
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(MinValidator, self).merge(state)
+        value = state["value"]
+        if value is not None and (
+            self.value is None or self._better(value, self.value)
+        ):
+            self.value = value
+
+
+class MaxValidator(MinValidator):
+    """Validates that the largest value of a field is between `low` and
+    `high`, e.g. that the latest date of a daily export is recent enough"""
+
+    __slots__ = ()
+
+    description = "maximum"
+
+    def _better(self, value, than):
+        return value > than
+
+
+class DistinctCountValidator(AggregateValidator):
+    """Validates that the number of distinct values of a field is between
+    `low` and `high`
+
+    The count is estimated with HyperLogLog, in 2**`precision` bytes, with a
+    relative standard error of about 1.04 / sqrt(2**`precision`) (0.8% by
+    default).
+    """
+
+    __slots__ = ("precision", "registers", "hash_value")
+
+    description = "estimated distinct count"
+
+    def __init__(self, field, low=None, high=None, precision=14):
+        # Imported here, as it imports hashlib
+        from vladiate.index import hash_value
+
+        super(DistinctCountValidator, self).__init__(field, low=low, high=high)
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self.hash_value = hash_value
+
+    def validate(self, row):
+        h = self.hash_value(row.get(self.field) or "")
+        # The first `precision` bits pick a register, which keeps the largest
+        # position of the first 1 bit in the others
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        register = h >> (64 - self.precision)
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def result(self):
+        m = len(self.registers)
+        estimate = (
+            0.7213 / (1 + 1.079 / m) * m * m / sum(2.0**-r for r in self.registers)
+        )
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small counts
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def state(self):
+        state = super(DistinctCountValidator, self).state()
+        state["registers"] = bytes(self.registers)
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(DistinctCountValidator, self).merge(state)
+        self.registers = bytearray(map(max, self.registers, state["registers"]))
+
+
+class NullRatioValidator(AggregateValidator):
+    """Validates that the share of rows in which a field is null (one of
+    `null_values`, or missing) is between `low` and `high`"""
+
+    __slots__ = ("null_values", "nulls", "rows")
+
+    description = "null ratio"
+
+    def __init__(self, field, low=None, high=None, null_values=("",)):
+        super(NullRatioValidator, self).__init__(field, low=low, high=high)
+        self.null_values = frozenset(null_values)
+        self.nulls = 0
+        self.rows = 0
+
+    def validate(self, row):
+        self.rows += 1
+        value = row.get(self.field)
+        if value is None or value in self.null_values:
+            self.nulls += 1
+
+    def result(self):
+        return self.nulls / self.rows if self.rows else 0.0
+
+    def state(self):
+        state = super(NullRatioValidator, self).state()
+        state["nulls"] = self.nulls
+        state["rows"] = self.rows
+        return state
+
+    def merge(self, other):
+        state = _as_state(other)
+        super(NullRatioValidator, self).merge(state)
+        self.nulls += state["nulls"]
+        self.rows += state["rows"]
+
+
+class MonotonicValidator(RowValidator):
+    """Validates that a field never decreases (or increases, if `decreasing`)
+    from one row to the next, or never stays the same either if `strict`.
+    Fields which `parser` fails to parse are left to field validators
+
+    Only the row number and field value of the first `max_rows` rows out of
+    order are kept, like `RowLengthValidator` does.
+    """
+
+    __slots__ = (
+        "field",
+        "decreasing",
+        "strict",
+        "parser",
+        "max_rows",
+        "first",
+        "first_row",
+        "last",
+        "rows",
+        "invalid_rows",
+    )
+
+    def __init__(
+        self, field, decreasing=False, strict=False, parser=float, max_rows=100
+    ):
+        super(MonotonicValidator, self).__init__()
+        if max_rows is not None and max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
+        self.field = field
+        self.decreasing = decreasing
+        self.strict = strict
+        self.parser = parser
+        self.max_rows = max_rows
+        self.first = None
+        # The (row number, value) of the first parsed field
+        self.first_row = None
+        self.last = None
+        self.rows = 0
+        self.invalid_rows = []
+
+    def _in_order(self, previous, value):
+        if self.decreasing:
+            previous, value = value, previous
+        return previous < value if self.strict else previous <= value
+
+    def _record(self, line, value):
+        if self.max_rows is None or len(self.invalid_rows) < self.max_rows:
+            self.invalid_rows.append((line, value))
+
+    def validate(self, row):
+        self.rows += 1
+        field = row.get(self.field)
+        try:
+            value = self.parser(field)
+        except (TypeError, ValueError):
+            return
+        previous, self.last = self.last, value
+        if previous is None:
+            self.first, self.first_row = value, (self.rows, field)
+        elif not self._in_order(previous, value):
+            self._record(self.rows, field)
+            raise ValidationException(
+                "'{}' is out of order after '{}'", field, previous
+            )
+
+    @property
+    def bad(self):
+        return ["row {}: {}".format(line, value) for line, value in self.invalid_rows]
+
+    def state(self):
+        state = super(MonotonicValidator, self).state()
+        state["first"] = self.first
+        state["first_row"] = self.first_row
+        state["last"] = self.last
+        state["rows"] = self.rows
+        state["invalid_rows"] = self.invalid_rows
+        return state
+
+    def merge(self, other):
+        """Merge the validator of the rows which come right after this one's"""
+        state = _as_state(other)
+        super(MonotonicValidator, self).merge(state)
+        if state["first"] is not None:
+            line, value = state["first_row"]
+            if self.last is None:
+                self.first = state["first"]
+                self.first_row = (self.rows + line, value)
+            elif not self._in_order(self.last, state["first"]):
+                self.fail_count += 1
+                self._record(self.rows + line, value)
+            self.last = state["last"]
+        for line, value in state["invalid_rows"]:
+            self._record(self.rows + line, value)
+        self.rows += state["rows"]
+
 
 class RowLengthValidator(Validator):
-    def __init__(self, **kwargs):
+    """Validates that each row has as many fields as the header
+
+    Only compact evidence of the first `max_rows` invalid rows is kept: their
+    row number (1 for the first row after the header), how many fields they
+    have, and their values joined by commas, truncated to `max_length`
+    characters. See `Vlad.read_rows()` to read them in full again.
+    """
+
+    __slots__ = ("invalid_rows", "rows", "max_rows", "max_length")
+
+    def __init__(self, max_rows=100, max_length=200, **kwargs):
         super().__init__(**kwargs)
+        if max_rows is not None and max_rows < 1:
+            raise ValueError("max_rows must be at least 1")
         self.invalid_rows = []
+        self.rows = 0
+        self.max_rows = max_rows
+        self.max_length = max_length
 
     def validate(self, row):
+        self.rows += 1
         # `csv.DictReader` uses its `restkey` attributes to store values
         # left over after consuming the expected number of values based
         # on the header row. If the row contains `None` here, that means
@@ -257,26 +948,79 @@ class RowLengthValidator(Validator):
         # default of `None` in our checks. `None` is not an expected
         # valid key for standard `DictReader` use.
         if None in row.keys():
-            self.invalid_rows.append(row)
             expected_length = len(row) - 1
             length = len(row) + len(row[None]) - 1
+            self._record(row, length)
             raise ValidationException(
-                f"Expected {expected_length} fields, got {length}"
+                "Expected {} fields, got {}", expected_length, length
             )
 
         # Similarly, there is a `csv.DictReader.restval` attribute that
         # handles the case where there are fewer than expected rows.
         if None in row.values():
-            self.invalid_rows.append(row)
             expected_length = len(row)
             length = len([value for value in row.values() if value is not None])
+            self._record(row, length)
             raise ValidationException(
-                f"Expected {expected_length} fields, got {length}"
+                "Expected {} fields, got {}", expected_length, length
             )
 
+    def _record(self, row, length):
+        if self.max_rows is not None and len(self.invalid_rows) >= self.max_rows:
+            return
+        values = [
+            value for key, value in row.items() if key is not None and value is not None
+        ]
+        text = ",".join(values + row.get(None, []))
+        if self.max_length is not None and len(text) > self.max_length:
+            text = text[: self.max_length] + "..."
+        self.invalid_rows.append((self.rows, length, text))
+
     @property
     def bad(self):
-        return self.invalid_rows
+        return [
+            "row {} ({} fields): {}".format(line, length, text)
+            for line, length, text in self.invalid_rows
+        ]
+
+    def state(self):
+        state = super(RowLengthValidator, self).state()
+        state["invalid_rows"] = self.invalid_rows
+        state["rows"] = self.rows
+        return state
+
+    def merge(self, other):
+        """Merge the validator of the rows which come right after this one's"""
+        state = _as_state(other)
+        super(RowLengthValidator, self).merge(state)
+        self.invalid_rows.extend(
+            (self.rows + line, length, text)
+            for line, length, text in state["invalid_rows"]
+        )
+        if self.max_rows is not None:
+            del self.invalid_rows[self.max_rows :]
+        self.rows += state["rows"]
+
+
+def _escape(text):
+    """Escape `text` to be part of a message template"""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _cast_failure(error, field):
+    """Return the `ValidationException` for the `ValueError` raised parsing
+    `field`, with the field as the value of its message if it is quoted in it"""
+    message = str(error)
+    quoted = repr(field)
+    start = message.rfind(quoted)
+    if start == -1:
+        return ValidationException(message)
+    template = message[:start] + "{!r}" + message[start + len(quoted) :]
+    if "{" in message or "}" in message:
+        template = (
+            _escape(message[:start]) + "{!r}" + _escape(message[start + len(quoted) :])
+        )
+    return ValidationException(template, field)
 
 
 def _stringify_set(a_set, max_len, max_sort_size=8192):
@@ -298,3 +1042,158 @@ def _stringify_set(a_set, max_len, max_sort_size=8192):
     if len(a_set) > max_len:
         text += " ({} more suppressed)".format(len(a_set) - max_len)
     return text
+
+
+# Regexes for the `strptime` directives which `_DateFormat` can parse without
+# `strptime`
+_DATE_DIRECTIVES = {
+    "%Y": r"(?P<year>\d{4})",
+    "%m": r"(?P<month>\d{2})",
+    "%d": r"(?P<day>\d{2})",
+    "%H": r"(?P<hour>\d{2})",
+    "%M": r"(?P<minute>\d{2})",
+    "%S": r"(?P<second>\d{2})",
+    "%f": r"(?P<microsecond>\d{6})",
+    "%%": "%",
+}
+
+# The format, length and separator positions of ISO 8601 strings
+_ISO_FORMATS = {
+    date: ("%Y-%m-%d", 10, ((4, "-"), (7, "-"))),
+    datetime: (
+        "%Y-%m-%dT%H:%M:%S",
+        19,
+        ((4, "-"), (7, "-"), (10, "T"), (13, ":"), (16, ":")),
+    ),
+}
+
+
+class _DateFormat(object):
+    """Turns strings in a `strptime` format into a `date` or `datetime`
+    (`kind`), or raises `ValueError`"""
+
+    def __init__(self, format, kind):
+        self.format = format
+        self.kind = kind
+        self.regex = None
+        iso_format, self.length, self.separators = _ISO_FORMATS[kind]
+        if format == iso_format:
+            self.convert = self._from_iso
+            return
+        parts = re.split(r"(%.)", format)
+        directives = [part for part in parts[1::2] if part != "%%"]
+        if all(part in _DATE_DIRECTIVES for part in parts[1::2]) and len(
+            set(directives)
+        ) == len(directives):
+            self.regex = re.compile(
+                "".join(
+                    _DATE_DIRECTIVES[part] if i % 2 else re.escape(part)
+                    for i, part in enumerate(parts)
+                )
+                + r"\Z",
+                re.ASCII,
+            )
+            self.convert = self._from_regex
+        else:
+            self.convert = self._from_strptime
+
+    def __call__(self, field):
+        return self.convert(field)
+
+    def __reduce__(self):
+        return _DateFormat, (self.format, self.kind)
+
+    def _mismatch(self, field):
+        return ValueError("'{}' does not match format '{}'".format(field, self.format))
+
+    def _from_iso(self, field):
+        # `fromisoformat` accepts more than this format on recent versions of
+        # Python, so check the shape of the string first
+        if len(field) != self.length:
+            raise self._mismatch(field)
+        for i, separator in self.separators:
+            if field[i] != separator:
+                raise self._mismatch(field)
+        return self.kind.fromisoformat(field)
+
+    def _from_regex(self, field):
+        match = self.regex.match(field)
+        if match is None:
+            raise self._mismatch(field)
+        values = {key: int(value) for key, value in match.groupdict().items()}
+        year = values.pop("year", 1900)
+        month = values.pop("month", 1)
+        day = values.pop("day", 1)
+        if self.kind is date:
+            return date(year, month, day)
+        return datetime(year, month, day, **values)
+
+    def _from_strptime(self, field):
+        value = datetime.strptime(field, self.format)
+        return value.date() if self.kind is date else value
+
+
+def _skip_empty(parse):
+    def parse_nonempty(field):
+        return parse(field) if field else field
+
+    return parse_nonempty
+
+
+def _as_state(other):
+    return other if isinstance(other, dict) else other.state()
+
+
+# Bumped whenever the encoding of serialized state changes
+_STATE_FORMAT = b"\x01"
+
+
+# The only classes validator state may contain, besides plain values: those
+# the parsers of aggregates (such as `date.fromisoformat`) commonly return
+_STATE_CLASSES = frozenset(
+    [
+        ("datetime", "date"),
+        ("datetime", "datetime"),
+        ("datetime", "time"),
+        ("datetime", "timedelta"),
+        ("datetime", "timezone"),
+        ("decimal", "Decimal"),
+    ]
+)
+
+
+def _state_unpickler(data):
+    """Return an unpickler of `data` which only allows plain values
+    (containers, strings, numbers...), and the date, time and decimal values
+    of `_STATE_CLASSES`"""
+    import io
+    import pickle
+
+    class _StateUnpickler(pickle.Unpickler):
+        def find_class(self, module, name):
+            if (module, name) not in _STATE_CLASSES:
+                raise pickle.UnpicklingError(
+                    "Validator state can't contain '{}.{}'".format(module, name)
+                )
+            return super(_StateUnpickler, self).find_class(module, name)
+
+    return _StateUnpickler(io.BytesIO(data))
+
+
+def serialize_state(state):
+    """Encode the `state()` of a validator as compact bytes, to ship it to
+    another process or store it on disk"""
+    import pickle
+    import zlib
+
+    return _STATE_FORMAT + zlib.compress(pickle.dumps(state, protocol=4), 1)
+
+
+def deserialize_state(data):
+    """Decode the bytes returned by `serialize_state` (or `serialize()`), to be
+    passed to the `merge()` method of a validator"""
+    import zlib
+
+    if data[:1] != _STATE_FORMAT:
+        raise ValueError("Unknown validator state format")
+    return _state_unpickler(zlib.decompress(data[1:])).load()
@@ -1,9 +1,32 @@
 from __future__ import division
+import codecs
+import copy
 import csv
-from collections import defaultdict
+import logging
+import time
+from contextlib import contextmanager
+from itertools import chain, islice
+from io import StringIO
 from vladiate.exceptions import ValidationException
-from vladiate.validators import EmptyValidator
+from vladiate.validators import (
+    PARSER_SUBSTITUTES,
+    AggregateValidator,
+    EmptyValidator,
+)
+from vladiate import decoding
 from vladiate import logs
+from vladiate.failures import FailureLog
+from vladiate.progress import Progress
+
+# How much of the start of a source `sniff=True` detects the dialect from
+SNIFF_SIZE = 16 * 1024
+
+# The delimiters `sniff=True` chooses from, unless `delimiter` is set
+SNIFF_DELIMITERS = ",;\t|:"
+
+# The default limit of the `csv` module, enforced by `strict=True` even if
+# something else in the process raised it
+DEFAULT_FIELD_SIZE_LIMIT = 128 * 1024
 
 
 class Vlad(object):
@@ -17,22 +40,69 @@ class Vlad(object):
         file_validation_failure_threshold=None,
         quiet=False,
         row_validators=[],
+        sample_size=None,
+        sample_method="random",
+        sample_seed=None,
+        confidence=0.95,
+        progress=None,
+        progress_interval=1.0,
+        dialect=None,
+        sniff=False,
+        strict=False,
+        field_size_limit=None,
+        batch_size=None,
+        structure_check=False,
+        fail_fast=False,
     ):
         self.logger = logs.logger
-        self.failures = defaultdict(lambda: defaultdict(list))
-        self.row_failures = defaultdict(list)
+        self.failure_log = FailureLog()
         self.missing_validators = None
         self.missing_fields = None
         self.source = source
         self.validators = validators or getattr(self, "validators", {})
         self.row_validators = row_validators or getattr(self, "row_validators", [])
-        self.delimiter = delimiter or getattr(self, "delimiter", ",")
+        self.dialect = dialect or getattr(self, "dialect", "excel")
+        self.delimiter = delimiter or getattr(self, "delimiter", None)
+        self.sniff = sniff or getattr(self, "sniff", False)
+        self.sniffed = None
+        self.strict = strict or getattr(self, "strict", False)
+        self.field_size_limit = field_size_limit or getattr(
+            self, "field_size_limit", DEFAULT_FIELD_SIZE_LIMIT if self.strict else None
+        )
+        # Fail early on an unknown dialect or bad formatting parameters
+        csv.reader([], **self._reader_kwargs())
         self.line_count = 0
         self.ignore_missing_validators = ignore_missing_validators
         self.logger.disabled = quiet
         self.invalid_lines = set()
         self.file_validation_failure_threshold = file_validation_failure_threshold
         self.total_lines = 0
+        self.sample_size = sample_size
+        # See `vladiate.sampling`, which is only imported to sample rows
+        if sample_method not in ("random", "stratified"):
+            raise ValueError("Unknown sampling method: '{}'".format(sample_method))
+        self.sample_method = sample_method
+        self.sample_seed = sample_seed
+        self.confidence = confidence
+        self.sample_estimates = []
+        # Whether the sample was read from random offsets into the source
+        self.sampled_by_offset = False
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.passed = None
+        self.bytes_read = 0
+        self.elapsed = 0.0
+        self.fetch_time = 0.0
+        self.batch_size = batch_size or getattr(self, "batch_size", None)
+        self.structure_check = structure_check or getattr(
+            self, "structure_check", False
+        )
+        self.structure = None
+        self.fail_fast = fail_fast or getattr(self, "fail_fast", False)
+        # Lines of the source which couldn't be read properly (such as those
+        # with undecodable bytes), as (line number, message) tuples
+        self.read_errors = []
+        self.read_error_count = 0
 
         self.validators.update(
             {
@@ -42,9 +112,35 @@ class Vlad(object):
             }
         )
 
+    @classmethod
+    def compile(cls, validators=None, row_validators=None, **options):
+        """Compile the Vlad into a `Plan`, to validate any number of sources
+        with it, each with validators of its own. `validators` and
+        `row_validators` default to those of the class, and `options` are
+        keyword arguments for every instance"""
+        return Plan(cls, validators, row_validators, **options)
+
+    @property
+    def failures(self):
+        """The failure messages of field validators, by field name and line"""
+        return self.failure_log.by_field()
+
+    @property
+    def row_failures(self):
+        """The failure messages of row validators, by line (`None` for the
+        failures found once every row was validated)"""
+        return self.failure_log.by_line()
+
     def _log_debug_failures(self):
+        # Formatting every failure is expensive, so skip it unless it is shown
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
         for line, errors in self.row_failures.items():
-            self.logger.debug("\nFailure on line number {}".format(line))
+            if line is None:
+                self.logger.debug("\nFailure at the end of the source")
+            else:
+                self.logger.debug("\nFailure on line number {}".format(line))
             for error in errors:
                 self.logger.debug("    {}".format(error))
 
@@ -57,7 +153,12 @@ class Vlad(object):
 
     def _log_validator_failures(self):
         for validator in self.row_validators:
-            if validator.bad:
+            if isinstance(validator, AggregateValidator):
+                for error in validator.bad:
+                    self.logger.error(
+                        " {} failed: {}".format(validator.__class__.__name__, error)
+                    )
+            elif validator.bad:
                 self.logger.error(
                     " {} failed {} time(s) ({:.1%})".format(
                         validator.__class__.__name__,
@@ -68,14 +169,13 @@ class Vlad(object):
                 try:
                     # If validator.bad is iterable, it contains the rows
                     # which caused it to fail
-                    invalid = list(validator.bad)
-                    shown = ["'{}'".format(row) for row in invalid[:99]]
-                    hidden = ["'{}'".format(row) for row in invalid[99:]]
+                    invalid, hidden = _preview(validator.bad, 99)
+                    shown = ["'{}'".format(row) for row in invalid]
                     self.logger.error(
                         "   Invalid rows: \n{}".format("    \n".join(shown))
                     )
                     if hidden:
-                        self.logger.error("    ({} more suppressed".format(len(hidden)))
+                        self.logger.error("    ({} more suppressed)".format(hidden))
                 except TypeError:
                     pass
 
@@ -93,19 +193,37 @@ class Vlad(object):
                     try:
                         # If self.bad is iterable, it contains the fields which
                         # caused it to fail
-                        invalid = list(validator.bad)
-                        shown = ["'{}'".format(field) for field in invalid[:99]]
-                        hidden = ["'{}'".format(field) for field in invalid[99:]]
+                        invalid, hidden = _preview(validator.bad, 99)
+                        shown = ["'{}'".format(field) for field in invalid]
                         self.logger.error(
                             "    Invalid fields: [{}]".format(", ".join(shown))
                         )
                         if hidden:
-                            self.logger.error(
-                                "    ({} more suppressed)".format(len(hidden))
-                            )
+                            self.logger.error("    ({} more suppressed)".format(hidden))
                     except TypeError:
                         pass
 
+    def _log_structure_errors(self):
+        self.logger.error(
+            "\033[0;31m"
+            + "Malformed CSV: {} structural error(s)".format(self.structure.error_count)
+            + "\033[0m"
+        )
+        self._log_line_errors(self.structure.errors, self.structure.error_count)
+
+    def _log_read_errors(self):
+        self.logger.error(
+            "  Source could not be read {} time(s)".format(self.read_error_count)
+        )
+        self._log_line_errors(self.read_errors, self.read_error_count)
+
+    def _log_line_errors(self, errors, count):
+        for line, message in errors:
+            self.logger.error("  Line {}: {}".format(line, message))
+        hidden = count - len(errors)
+        if hidden:
+            self.logger.error("  ({} more suppressed)".format(hidden))
+
     def _log_missing_validators(self):
         self.logger.error("  Missing validators for:")
         self._log_missing(self.missing_validators)
@@ -123,24 +241,102 @@ class Vlad(object):
             )
         )
 
-    def _get_total_lines(self):
-        reader = csv.DictReader(self.source.open(), delimiter=self.delimiter)
-        self.total_lines = sum(1 for _ in reader)
-        return self.total_lines
+    def _reader_kwargs(self):
+        """The keyword arguments for every CSV reader of the source"""
+        kwargs = {"dialect": self.dialect}
+        if self.sniffed:
+            kwargs.update(self.sniffed)
+        if self.delimiter:
+            kwargs["delimiter"] = self.delimiter
+        if self.strict:
+            kwargs["strict"] = True
+        return kwargs
 
-    def validate(self):
-        self.logger.info(
-            "\nValidating {}(source={})".format(self.__class__.__name__, self.source)
+    def _sniff_dialect(self):
+        """Detect the dialect from the start of the source with `csv.Sniffer`"""
+        size = SNIFF_SIZE if self.sniff is True else self.sniff
+        head = self.source.read_head(size)
+        codec, bom = decoding.resolve(self.source.encoding, head)
+        text = codecs.getincrementaldecoder(codec)("replace").decode(
+            head[bom:], final=len(head) < size
         )
-        reader = csv.DictReader(self.source.open(), delimiter=self.delimiter)
+        if len(head) >= size:
+            # Don't let a partial last line throw off the sniffer
+            text = text[: text.rfind("\n") + 1] or text
+        try:
+            sniffed = csv.Sniffer().sniff(
+                text, delimiters=self.delimiter or SNIFF_DELIMITERS
+            )
+        except csv.Error:
+            self.logger.info(
+                "\033[1;33m"
+                + "Could not detect the dialect, using the configured one"
+                + "\033[0m"
+            )
+            return
+        # The sniffer can't tell whether quotes are doubled unless the sample
+        # happens to contain some, so only take what it reliably detects
+        self.sniffed = {
+            "delimiter": sniffed.delimiter,
+            "quotechar": sniffed.quotechar,
+            "skipinitialspace": sniffed.skipinitialspace,
+        }
+        self.logger.debug("Detected dialect: {}".format(self.sniffed))
+
+    @contextmanager
+    def _limit_field_size(self):
+        """Apply `field_size_limit` while reading the source
 
-        if not reader.fieldnames:
+        The limit of the `csv` module is process-wide, so the previous limit is
+        restored afterwards.
+        """
+        if self.field_size_limit is None:
+            yield
+            return
+        previous = csv.field_size_limit(self.field_size_limit)
+        try:
+            yield
+        finally:
+            csv.field_size_limit(previous)
+
+    def _read_header(self, size=1024):
+        """Read the header row, fetching only as much of the source as needed
+
+        Returns a (fieldnames, offset) tuple, where `offset` is the number of
+        bytes taken up by the header.
+        """
+        while True:
+            head = self.source.read_head(size)
+            at_end = len(head) < size
+            codec, bom = decoding.resolve(self.source.encoding, head)
+            buffer = StringIO(
+                codecs.getincrementaldecoder(codec)("replace").decode(
+                    head[bom:], final=at_end
+                )
+            )
+            for fieldnames in csv.reader(buffer, **self._reader_kwargs()):
+                # Like `csv.DictReader`, skip any blank lines before the header
+                if fieldnames:
+                    break
+            else:
+                if at_end:
+                    return None, len(head)
+                fieldnames = None
+            # Unless the whole source was read, the header is only complete if
+            # something follows it
+            if fieldnames and (at_end or buffer.tell() < len(buffer.getvalue())):
+                header = buffer.getvalue()[: buffer.tell()]
+                return fieldnames, bom + len(header.encode(codec, "replace"))
+            size *= 2
+
+    def _check_fieldnames(self, fieldnames):
+        if not fieldnames:
             self.logger.info(
                 "\033[1;33m" + "Source file has no field names" + "\033[0m"
             )
             return False
 
-        self.missing_validators = set(reader.fieldnames) - set(self.validators)
+        self.missing_validators = set(fieldnames) - set(self.validators)
         if self.missing_validators:
             self.logger.info("\033[1;33m" + "Missing..." + "\033[0m")
             self._log_missing_validators()
@@ -148,55 +344,572 @@ class Vlad(object):
             if not self.ignore_missing_validators:
                 return False
 
-        self.missing_fields = set(self.validators) - set(reader.fieldnames)
+        self.missing_fields = set(self.validators) - set(fieldnames)
         if self.missing_fields:
             self.logger.info("\033[1;33m" + "Missing..." + "\033[0m")
             self._log_missing_fields()
             return False
 
-        if self.file_validation_failure_threshold:
-            self.total_lines = self._get_total_lines()
+        return True
+
+    def check_schema(self):
+        """Check only the header of the source against the validators"""
+        self.logger.info(
+            "\nChecking schema of {}(source={})".format(
+                self.__class__.__name__, self.source
+            )
+        )
+        if self.sniff:
+            self._sniff_dialect()
+        with self._limit_field_size():
+            fieldnames, _ = self._read_header()
+        self.passed = self._check_fieldnames(fieldnames)
+        if self.passed:
+            self.logger.info("\033[0;32m" + "Passed! :)" + "\033[0m")
+        return self.passed
+
+    def _get_total_lines(self):
+        reader = csv.DictReader(self.source.open(), **self._reader_kwargs())
+        self.total_lines = sum(1 for _ in reader)
+        return self.total_lines
+
+    def _sample_rows(self, fieldnames, offset):
+        """Pick `sample_size` rows of the source to validate
+
+        Sources which support `size()` and `read_range()` are sampled by
+        seeking to random offsets, other sources have to be read in full.
+        """
+        import random
+
+        from vladiate import sampling
+
+        rng = random.Random(self.sample_seed)
+        try:
+            rows = sampling.seek_sample(
+                self.source,
+                fieldnames,
+                offset,
+                self.sample_size,
+                self.sample_method,
+                rng,
+                self._reader_kwargs(),
+                self.source.codec()[0],
+            )
+            self.sampled_by_offset = True
+            return rows
+        except NotImplementedError:
+            reader = csv.DictReader(self.source.open(), **self._reader_kwargs())
+            return sampling.reservoir_sample(reader, self.sample_size, rng)
+
+    def read_rows(self, lines):
+        """Read the rows with the given numbers (1 for the first row after the
+        header) from the source again, e.g. to show the rows behind failures.
+        Returns the rows by number"""
+        wanted = set(lines)
+        rows = {}
+        if not wanted:
+            return rows
+        last = max(wanted)
+        with self._limit_field_size():
+            reader = csv.DictReader(self.source.open(), **self._reader_kwargs())
+            for number, row in enumerate(reader, 1):
+                if number in wanted:
+                    rows[number] = row
+                if number >= last:
+                    break
+        return rows
+
+    def _locate_errors(self, rows):
+        """Add the number of the row to any error parsing it"""
+        try:
+            for row in rows:
+                yield row
+        except csv.Error as e:
+            raise csv.Error("row {}: {}".format(self.line_count + 1, e))
+
+    def _estimate_failure_rates(self):
+        from vladiate import sampling
+
+        validators = [(None, validator) for validator in self.row_validators] + [
+            (field_name, validator)
+            for field_name, validators_list in self.validators.items()
+            for validator in validators_list
+        ]
+        self.sample_estimates = [
+            sampling.SampleEstimate(
+                field_name,
+                validator.__class__.__name__,
+                validator.fail_count,
+                self.line_count,
+                *sampling.wilson_interval(
+                    validator.fail_count, self.line_count, self.confidence
+                )
+            )
+            for field_name, validator in validators
+        ]
+        self.logger.info(
+            "  Estimated failure rates from a sample of {} row(s) "
+            "({:.0%} confidence):".format(self.line_count, self.confidence)
+        )
+        if self.sampled_by_offset:
+            self.logger.info("  ({})".format(sampling.SEEK_SAMPLE_BIAS))
+        for estimate in self.sample_estimates:
+            self.logger.info(
+                "    {}{}: {:.1%} ({:.1%} to {:.1%})".format(
+                    estimate.validator,
+                    (
+                        " on field: '{}'".format(estimate.field)
+                        if estimate.field is not None
+                        else ""
+                    ),
+                    estimate.failures / estimate.sampled if estimate.sampled else 0,
+                    estimate.low,
+                    estimate.high,
+                )
+            )
+
+    def _count_bytes(self, lines):
+        """Yield `lines`, counting the bytes of the source they were decoded
+        from in `bytes_read`"""
+        iterator = iter(lines)
+        for first in iterator:
+            # The codec is only known once the source starts being decoded
+            codec = getattr(lines, "codec", None) or "utf-8"
+            encode = codecs.getincrementalencoder(codec)("replace").encode
+            single_byte = decoding.ascii_compatible(codec)
+            self.bytes_read += getattr(lines, "bom", 0)
+            for line in chain([first], iterator):
+                if single_byte and line.isascii():
+                    self.bytes_read += len(line)
+                else:
+                    self.bytes_read += len(encode(line))
+                yield line
+
+    def summary(self):
+        """Return the outcome of the last validation as a picklable dict"""
+        failures = [
+            {
+                "validator": validator.__class__.__name__,
+                "field": None,
+                "count": validator.fail_count,
+            }
+            for validator in self.row_validators
+        ] + [
+            {
+                "validator": validator.__class__.__name__,
+                "field": field_name,
+                "count": validator.fail_count,
+            }
+            for field_name, validators_list in self.validators.items()
+            for validator in validators_list
+        ]
+        return {
+            "vlad": self.__class__.__name__,
+            "source": repr(self.source),
+            "input": self.source.__class__.__name__,
+            "passed": self.passed,
+            "rows": self.line_count,
+            "bytes": self.bytes_read,
+            "elapsed": self.elapsed,
+            "fetch_time": self.fetch_time,
+            "failures": failures,
+        }
+
+    def state(self):
+        """Return the state of every validator, see `Validator.state()`"""
+        return {
+            "line_count": self.line_count,
+            "row_validators": [validator.state() for validator in self.row_validators],
+            "validators": {
+                field_name: [validator.state() for validator in validators_list]
+                for field_name, validators_list in self.validators.items()
+            },
+        }
+
+    def merge(self, other):
+        """Combine the results of another instance of the same Vlad (or its
+        `state()`), e.g. one that validated another part of the same source"""
+        state = other if isinstance(other, dict) else other.state()
+        self.line_count += state["line_count"]
+        for validator, validator_state in zip(
+            self.row_validators, state["row_validators"]
+        ):
+            validator.merge(validator_state)
+        for field_name, states in state["validators"].items():
+            for validator, validator_state in zip(self.validators[field_name], states):
+                validator.merge(validator_state)
+
+    def finish(self):
+        """Check the rows as a whole, once every row has been validated (and
+        merged), see `AggregateValidator`. Returns whether they passed"""
+        passed = True
+        for validator in self.row_validators:
+            finish = getattr(validator, "finish", None)
+            if finish is None:
+                continue
+            try:
+                finish()
+            except ValidationException as e:
+                self.failure_log.add(None, None, validator, e)
+                validator.fail_count += 1
+                passed = False
+        return passed
+
+    def validate(self, finish=True):
+        """Validate the source, and return whether it passed. With
+        `finish=False`, the rows aren't checked as a whole (see `finish()`),
+        e.g. when only validating part of a source"""
+        progress = None
+        if self.progress:
+            progress = Progress(self, self.progress, interval=self.progress_interval)
+        started = time.monotonic()
+        try:
+            if self.sniff:
+                self._sniff_dialect()
+            with self._limit_field_size():
+                self.passed = self._validate(progress, finish)
+            return self.passed
+        except csv.Error as e:
+            if not self.strict:
+                raise
+            self.logger.error("\033[0;31m" + "Malformed CSV: {}".format(e) + "\033[0m")
+            self.passed = False
+            return False
+        finally:
+            self.elapsed = time.monotonic() - started
+            if progress is not None:
+                progress.finish()
+
+    def _exceeds_threshold(self, validator):
+        if (
+            self.file_validation_failure_threshold
+            and self.total_lines > 0
+            and validator.fail_count / self.total_lines
+            > self.file_validation_failure_threshold
+        ):
+            self.logger.error(
+                "  {} failed {} time(s) ({:.1%})".format(
+                    validator.__class__.__name__,
+                    validator.fail_count,
+                    validator.fail_count / self.total_lines,
+                )
+            )
+            return True
+        return False
 
+    def _validate_rows(self, reader, progress):
+        """Validate one row at a time. Returns `False` if validation was
+        stopped early"""
+        # Fields whose validators parse them the same way share the values
+        plans = {
+            field_name: _plan(validators_list)
+            for field_name, validators_list in self.validators.items()
+            if _shares_parsers(validators_list)
+        }
         for line, row in enumerate(reader):
             self.line_count += 1
+            if progress is not None and not self.line_count % progress.check_every:
+                progress.update()
 
             for validator in self.row_validators:
                 try:
                     validator.validate(row)
                 except ValidationException as e:
-                    self.row_failures[line].append(e)
+                    self.failure_log.add(line, None, validator, e)
                     self.invalid_lines.add(self.line_count)
                     validator.fail_count += 1
 
             for field_name, field in row.items():
-                if field_name in self.validators:
+                if field_name in plans:
+                    validator = self._validate_shared(
+                        plans[field_name], field_name, field, row, line
+                    )
+                elif field_name in self.validators:
                     for validator in self.validators[field_name]:
                         try:
                             validator.validate(field, row=row)
                         except ValidationException as e:
-                            self.failures[field_name][line].append(e)
+                            self.failure_log.add(line, field_name, validator, e)
                             self.invalid_lines.add(self.line_count)
                             validator.fail_count += 1
-                if (
-                    self.file_validation_failure_threshold
-                    and self.total_lines > 0
-                    and validator.fail_count / self.total_lines
-                    > self.file_validation_failure_threshold
+                if self.file_validation_failure_threshold and self._exceeds_threshold(
+                    validator
                 ):
+                    return False
+            if self.fail_fast and self.failure_log:
+                return False
+        return True
+
+    def _validate_shared(self, plan, field_name, field, row, line):
+        """Validate a field, sharing the parsed values between its validators,
+        as planned by `_plan`. Returns the last validator"""
+        parsed = {}
+        for validator, parser, sources in plan:
+            try:
+                if parser is None:
+                    validator.validate(field, row=row)
+                    continue
+                for source in sources:
+                    value = parsed.get(source)
+                    if value is not None:
+                        break
+                else:
+                    try:
+                        value = parser(field)
+                    except (TypeError, ValueError):
+                        value = _FAILED
+                    parsed[parser] = value
+                if value is _FAILED:
+                    # Let the validator fail in its own words
+                    validator.validate(field, row=row)
+                else:
+                    validator.validate_parsed(value, field, row)
+            except ValidationException as e:
+                self.failure_log.add(line, field_name, validator, e)
+                self.invalid_lines.add(self.line_count)
+                validator.fail_count += 1
+        return validator
+
+    def _validate_batches(self, reader, progress):
+        """Validate `batch_size` rows at a time, handing each validator a
+        whole column of fields. Returns `False` if validation was stopped
+        early"""
+        rows = iter(reader)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return True
+            first = self.line_count
+            self.line_count += len(batch)
+            if progress is not None:
+                progress.update()
+
+            for validator in self.row_validators:
+                for i, row in enumerate(batch):
+                    try:
+                        validator.validate(row)
+                    except ValidationException as e:
+                        self.failure_log.add(first + i, None, validator, e)
+                        self.invalid_lines.add(first + i + 1)
+                        validator.fail_count += 1
+
+            for field_name, validators_list in self.validators.items():
+                column = [row.get(field_name) for row in batch]
+                for validator in validators_list:
+                    for i, e in validator.validate_batch(column, batch):
+                        self.failure_log.add(first + i, field_name, validator, e)
+                        self.invalid_lines.add(first + i + 1)
+                        validator.fail_count += 1
+                    if self._exceeds_threshold(validator):
+                        return False
+            if self.fail_fast and self.failure_log:
+                return False
+
+    def _validate(self, progress, finish=True):
+        self.logger.info(
+            "\nValidating {}(source={})".format(self.__class__.__name__, self.source)
+        )
+        if self.structure_check:
+            from vladiate import structure
+
+            self.structure = structure.scan(self.source, self._reader_kwargs())
+            if self.structure.error_count:
+                self._log_structure_errors()
+                return False
+
+        lines = None
+        try:
+            if self.sample_size:
+                fieldnames, offset = self._read_header()
+            else:
+                started = time.monotonic()
+                lines = self.source.open()
+                self.fetch_time = time.monotonic() - started
+                reader = csv.DictReader(
+                    self._count_bytes(lines), **self._reader_kwargs()
+                )
+                fieldnames = reader.fieldnames
+
+            if not self._check_fieldnames(fieldnames):
+                return False
+
+            if self.sample_size:
+                reader = self._sample_rows(fieldnames, offset)
+                # Any failure threshold applies to the sample instead
+                self.total_lines = len(reader)
+            elif self.file_validation_failure_threshold:
+                self.total_lines = self._get_total_lines()
+
+            if self.strict:
+                reader = self._locate_errors(reader)
+
+            if self.batch_size:
+                completed = self._validate_batches(reader, progress)
+            else:
+                completed = self._validate_rows(reader, progress)
+            if not completed:
+                if self.fail_fast and self.failure_log:
+                    self.logger.info("\033[0;31m" + "Failed :(" + "\033[0m")
                     self.logger.error(
-                        "  {} failed {} time(s) ({:.1%})".format(
-                            validator.__class__.__name__,
-                            validator.fail_count,
-                            validator.fail_count / self.total_lines,
+                        "  Stopped at the first invalid row, after {} row(s)".format(
+                            self.line_count
                         )
                     )
-                    return False
+                    self._log_validator_failures()
+                return False
 
-        if self.failures or self.row_failures:
-            self.logger.info("\033[0;31m" + "Failed :(" + "\033[0m")
-            self._log_debug_failures()
-            self._log_validator_failures()
-            return False
-        else:
-            self.logger.info("\033[0;32m" + "Passed! :)" + "\033[0m")
-            return True
+            if self.sample_size:
+                self._estimate_failure_rates()
+
+            # Undecodable bytes were replaced, and are reported rather than raised
+            self.read_errors = getattr(lines, "invalid", [])
+            self.read_error_count = getattr(lines, "invalid_count", 0)
+
+            if finish:
+                self.finish()
+
+            if self.failure_log or self.read_error_count:
+                self.logger.info("\033[0;31m" + "Failed :(" + "\033[0m")
+                self._log_debug_failures()
+                self._log_validator_failures()
+                if self.read_error_count:
+                    self._log_read_errors()
+                return False
+            else:
+                self.logger.info("\033[0;32m" + "Passed! :)" + "\033[0m")
+                return True
+        finally:
+            # Stop reading the source, also when validation stopped early
+            close = getattr(lines, "close", None)
+            if close is not None:
+                close()
+
+
+class Plan(object):
+    """A Vlad class compiled for repeated runs, see `Vlad.compile()`
+
+    The validators are set up once (e.g. the sets of `SetValidator`s and the
+    patterns of `RegexValidator`s) and pickled, so each instance only has to
+    unpickle a copy of its own, and no state is shared between runs.
+    Validators which can't be pickled are deep-copied instead. Plans can't be
+    modified, and can be pickled themselves (to send them to other processes)
+    as long as their validators can.
+    """
+
+    __slots__ = ("vlad_class", "options", "prototypes", "snapshot")
+
+    def __init__(self, vlad_class, validators=None, row_validators=None, **options):
+        if validators is None:
+            validators = getattr(vlad_class, "validators", {})
+        if row_validators is None:
+            row_validators = getattr(vlad_class, "row_validators", [])
+        prototypes = (validators, row_validators)
+        import pickle
+
+        try:
+            snapshot = pickle.dumps(prototypes, protocol=pickle.HIGHEST_PROTOCOL)
+            prototypes = None
+        except (pickle.PicklingError, TypeError, AttributeError):
+            snapshot = None
+        _set_plan(
+            self, vlad_class, tuple(sorted(options.items())), prototypes, snapshot
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Plans can't be modified")
+
+    def __delattr__(self, name):
+        raise AttributeError("Plans can't be modified")
+
+    def __reduce__(self):
+        if self.snapshot is None:
+            raise TypeError("The validators of this plan can't be pickled")
+        return _restore_plan, (self.vlad_class, self.options, self.snapshot)
+
+    def __repr__(self):
+        return "Plan({})".format(self.vlad_class.__name__)
+
+    def copy_validators(self):
+        """Return a (validators, row validators) tuple of fresh validators"""
+        if self.snapshot is None:
+            return copy.deepcopy(self.prototypes)
+        import pickle
+
+        return pickle.loads(self.snapshot)
+
+    def vlad(self, source=None, **options):
+        """Return a new instance of the Vlad with validators of its own,
+        reading `source` (that of the class by default). `options` override
+        those of the plan"""
+        validators, row_validators = self.copy_validators()
+        kwargs = dict(self.options, **options)
+        return self.vlad_class(
+            source=source or getattr(self.vlad_class, "source", None),
+            validators=validators,
+            row_validators=row_validators,
+            **kwargs
+        )
+
+    def run(self, source=None, **options):
+        """Validate `source` with a new instance of the Vlad, and return it"""
+        vlad = self.vlad(source, **options)
+        vlad.validate()
+        return vlad
+
+
+def _set_plan(plan, vlad_class, options, prototypes, snapshot):
+    object.__setattr__(plan, "vlad_class", vlad_class)
+    object.__setattr__(plan, "options", options)
+    object.__setattr__(plan, "prototypes", prototypes)
+    object.__setattr__(plan, "snapshot", snapshot)
+
+
+def _restore_plan(vlad_class, options, snapshot):
+    plan = Plan.__new__(Plan)
+    _set_plan(plan, vlad_class, options, None, snapshot)
+    return plan
+
+
+def _preview(items, limit):
+    """Return up to `limit` of `items`, and how many more there are, without
+    copying all of them"""
+    iterator = iter(items)
+    shown = list(islice(iterator, limit))
+    try:
+        hidden = len(items) - len(shown)
+    except TypeError:
+        hidden = sum(1 for _ in iterator)
+    return shown, hidden
+
+
+_FAILED = object()
+
+
+def _shares_parsers(validators):
+    """Whether any of the validators can use the values parsed for another"""
+    parsers = [validator.parser for validator in validators]
+    return any(
+        parser is not None
+        and (
+            parsers.count(parser) > 1
+            or any(other in parsers for other in PARSER_SUBSTITUTES.get(parser, ()))
+        )
+        for parser in parsers
+    )
+
+
+def _plan(validators):
+    """Return a (validator, parser, parsers whose values it can use) tuple for
+    each validator"""
+    return [
+        (
+            validator,
+            validator.parser,
+            (
+                ()
+                if validator.parser is None
+                else (validator.parser,) + PARSER_SUBSTITUTES.get(validator.parser, ())
+            ),
+        )
+        for validator in validators
+    ]